@@ -16,14 +16,69 @@ Mejoras implementadas:
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, asdict
-from scipy import stats
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, asdict, replace
 from collections import defaultdict
+from functools import lru_cache
+from panel_demanda import (
+    MatrizDemanda,
+    RegistrosSKU,
+    matriz_compras_desde_registros,
+    matriz_desde_registros,
+    registros_desde_df
+)
+from escenarios import CAMPOS_ESCENARIO, CuboEscenarios, grilla_escenarios
+from predicciones_batch import PrediccionesBatch, columna_prediccion
+from ventas_compactas import Ventas, registros_de_ventas, skus_de_ventas, ultimo_precio_por_sku
+from motor_panel import (
+    croston_desde_conteos,
+    croston_panel,
+    dias_con_stock_panel,
+    estadisticas_panel,
+    ewma_panel,
+    mascara_outliers_iqr,
+    regresion_desde_sumas,
+    reposicion_panel,
+    tasa_intermitencia_panel,
+    tendencia_panel
+)
+from backtesting import (
+    HORIZONTE_DIAS,
+    ORIGENES_POR_DEFECTO,
+    ResultadoBacktest,
+    backtest_matriz,
+    fechas_origen_backtest,
+    origenes_backtest
+)
+from seleccion_modelos import SeleccionModelos, backtest_seleccion_matriz, seleccionar_modelos_matriz
+from cache_predicciones import CachePredicciones, claves_por_sku
+from estado_incremental import (
+    EstadoForecast,
+    ampliar_estado,
+    estado_desde_analisis,
+    plegar_dias,
+    ultimo_dia_completo
+)
 import warnings
 warnings.filterwarnings('ignore')
 
 
+# Celdas SKU × escenario por bloque en `calcular_escenarios` (acota los temporales)
+ESCENARIOS_POR_BLOQUE_CELDAS = 2_000_000
+
+
+@lru_cache(maxsize=None)
+def z_nivel_servicio(nivel_servicio: float) -> float:
+    """
+    Cuantil normal del nivel de servicio (igual a `scipy.stats.norm.ppf`)
+
+    Usa `scipy.special.ndtri`, que se importa al primer cálculo: importar
+    scipy.stats completo triplica el tiempo de arranque del módulo.
+    """
+    from scipy.special import ndtri
+    return ndtri(nivel_servicio)
+
+
 @dataclass
 class PrediccionAvanzada:
     """Resultado de predicción con intervalo de confianza"""
@@ -77,6 +132,43 @@ class PrediccionAvanzada:
     alertas: List[str]
 
 
+@dataclass
+class AnalisisPanel:
+    """
+    Estadísticas de demanda de un panel de SKUs (pasos 1-6), como arrays
+    alineados con `skus`
+
+    Los intermedios del panel (matriz, compras y días con stock) solo están
+    presentes cuando el análisis se calcula desde las ventas completas.
+    """
+    skus: np.ndarray
+    venta_diaria_promedio: np.ndarray
+    venta_diaria_p50: np.ndarray
+    venta_diaria_p75: np.ndarray
+    venta_diaria_p90: np.ndarray
+    desviacion_estandar: np.ndarray
+    coeficiente_variacion: np.ndarray
+    tendencia: np.ndarray
+    tasa_crecimiento_mensual: np.ndarray
+    es_intermitente: np.ndarray
+    n_filas: np.ndarray
+    n_outliers: np.ndarray
+    periodo_inicio: np.ndarray  # datetime64
+    periodo_fin: np.ndarray  # datetime64
+    dias_periodo: np.ndarray
+    unidades_totales_periodo: np.ndarray
+
+    # Modelo elegido por SKU (`ajustar_modelos`); None = la regla EWMA/Croston
+    modelo_usado: Optional[np.ndarray] = None
+    seleccion: Optional[SeleccionModelos] = None
+
+    # Intermedios del panel
+    matriz: Optional[MatrizDemanda] = None
+    compras_matriz: Optional[np.ndarray] = None
+    tiene_compras: Optional[np.ndarray] = None
+    con_stock: Optional[np.ndarray] = None
+
+
 class AlgoritmoMLAvanzado:
     """
     Algoritmo avanzado de forecasting con mejoras world-class
@@ -93,17 +185,23 @@ class AlgoritmoMLAvanzado:
         umbral_abc_b: float = 0.95,  # 95% valor acumulado para clase B
         umbral_xyz_x: float = 0.5,  # CV < 0.5 para clase X
         umbral_xyz_y: float = 1.0,  # CV < 1.0 para clase Y
+        ajustar_modelos: bool = False,  # Modelo y alpha por SKU según backtesting
     ):
         self.dias_stock_deseado = dias_stock_deseado
         self.dias_transito = dias_transito
         self.nivel_servicio = nivel_servicio
-        self.z_score = stats.norm.ppf(nivel_servicio)  # Z para nivel de servicio
         self.umbral_intermitencia = umbral_intermitencia
         self.alpha_ewma = alpha_ewma
         self.umbral_abc_a = umbral_abc_a
         self.umbral_abc_b = umbral_abc_b
         self.umbral_xyz_x = umbral_xyz_x
         self.umbral_xyz_y = umbral_xyz_y
+        self.ajustar_modelos = ajustar_modelos
+
+    @property
+    def z_score(self) -> float:
+        """Z para nivel de servicio"""
+        return z_nivel_servicio(self.nivel_servicio)
 
 
     def detectar_outliers_iqr(self, datos: np.array) -> Tuple[np.array, List[int]]:
@@ -116,14 +214,12 @@ class AlgoritmoMLAvanzado:
         if len(datos) == 0:
             return datos, []
 
-        Q1 = np.percentile(datos, 25)
-        Q3 = np.percentile(datos, 75)
-        IQR = Q3 - Q1
-
-        limite_inferior = Q1 - 1.5 * IQR
-        limite_superior = Q3 + 1.5 * IQR
-
-        mask = (datos >= limite_inferior) & (datos <= limite_superior)
+        # Límites [Q1 - 1.5·IQR, Q3 + 1.5·IQR] (un único grupo)
+        mask = mascara_outliers_iqr(
+            np.asarray(datos, dtype=float),
+            np.zeros(len(datos), dtype=np.int64),
+            1
+        )
         indices_outliers = np.where(~mask)[0].tolist()
 
         return datos[mask], indices_outliers
@@ -146,104 +242,100 @@ class AlgoritmoMLAvanzado:
         # Convertir fechas a números (días desde primera fecha)
         dias = (fechas - fechas[0]).astype('timedelta64[D]').astype(float)
 
-        # Regresión lineal con manejo de errores
-        if len(dias) > 1 and len(ventas) > 1 and len(dias) == len(ventas) and np.std(dias) > 0:
-            try:
-                slope, intercept, r_value, p_value, std_err = stats.linregress(dias, ventas)
-
-                # Calcular tasa de crecimiento mensual
-                venta_promedio = np.mean(ventas)
-                if venta_promedio > 0:
-                    tasa_mensual = (slope * 30 / venta_promedio) * 100
-                else:
-                    tasa_mensual = 0.0
-
-                # Categorizar tendencia
-                if p_value < 0.05:  # Significancia estadística
-                    if slope > 0:
-                        tendencia = 'creciente'
-                    else:
-                        tendencia = 'decreciente'
-                else:
-                    tendencia = 'estable'
-            except (ValueError, RuntimeError) as e:
-                # Si falla la regresión, usar valores por defecto
-                tendencia = 'estable'
-                tasa_mensual = 0.0
-        else:
-            tendencia = 'estable'
-            tasa_mensual = 0.0
+        if len(dias) != len(ventas) or np.std(dias) == 0:
+            return 'estable', 0.0
+
+        ventas = np.asarray(ventas, dtype=float)
+        pendiente, _, _, p_valor, _ = tendencia_panel(
+            dias, ventas, np.zeros(len(dias), dtype=np.int64), 1
+        )
+        tendencia, tasa_mensual = self.categorizar_tendencia(
+            pendiente, p_valor, np.array([np.mean(ventas)])
+        )
+
+        return tendencia[0], tasa_mensual[0]
+
+
+    def categorizar_tendencia(
+        self,
+        pendiente: np.ndarray,
+        p_valor: np.ndarray,
+        venta_promedio: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Categoriza la tendencia de cada SKU a partir de su regresión
+
+        Returns:
+            (tendencia_categoria, tasa_crecimiento_mensual) por SKU
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Tasa de crecimiento mensual (% de la venta promedio)
+            tasa_mensual = np.where(
+                venta_promedio > 0,
+                (pendiente * 30 / venta_promedio) * 100,
+                0.0
+            )
+
+        # Significancia estadística; sin p-valor (ej. ventas constantes) es estable
+        significativa = p_valor < 0.05
+        tendencia = np.where(
+            significativa,
+            np.where(pendiente > 0, 'creciente', 'decreciente'),
+            'estable'
+        ).astype(object)
 
         return tendencia, tasa_mensual
 
 
     def calcular_venta_ponderada_ewma(
         self,
-        ventas_diarias: pd.Series
+        ventas_diarias: np.ndarray
     ) -> float:
         """
         Calcula venta diaria usando Exponential Weighted Moving Average
         Da más peso a datos recientes
         """
+        ventas_diarias = np.asarray(ventas_diarias, dtype=float)
         if len(ventas_diarias) == 0:
             return 0.0
 
-        # EWMA - datos más recientes tienen mayor peso
-        ewma = ventas_diarias.ewm(alpha=self.alpha_ewma, adjust=False).mean()
-        return ewma.iloc[-1]
+        # EWMA - datos más recientes tienen mayor peso (equivale a adjust=False)
+        inicio, fin = np.array([0]), np.array([len(ventas_diarias) - 1])
+        return ewma_panel(ventas_diarias[None, :], inicio, fin, self.alpha_ewma)[0]
 
 
     def es_demanda_intermitente(
         self,
-        ventas_diarias: pd.Series
+        ventas_diarias: np.ndarray
     ) -> bool:
         """
         Detecta si la demanda es intermitente (esporádica)
         """
+        ventas_diarias = np.asarray(ventas_diarias, dtype=float)
         if len(ventas_diarias) == 0:
             return False
 
-        dias_sin_venta = (ventas_diarias == 0).sum()
-        tasa_intermitencia = dias_sin_venta / len(ventas_diarias)
+        inicio, fin = np.array([0]), np.array([len(ventas_diarias) - 1])
+        tasa_intermitencia = tasa_intermitencia_panel(ventas_diarias[None, :], inicio, fin)[0]
 
         return tasa_intermitencia >= self.umbral_intermitencia
 
 
     def calcular_forecast_croston(
         self,
-        ventas_diarias: pd.Series,
+        ventas_diarias: np.ndarray,
         alpha: float = 0.1
     ) -> float:
         """
         Método de Croston para demanda intermitente
         """
+        ventas_diarias = np.asarray(ventas_diarias, dtype=float)
         if len(ventas_diarias) == 0:
             return 0.0
 
-        # Separar demandas no-cero e intervalos
-        demandas_no_cero = ventas_diarias[ventas_diarias > 0]
-
-        if len(demandas_no_cero) == 0:
-            return 0.0
-
-        # Calcular promedio de demanda cuando hay venta
-        promedio_demanda = demandas_no_cero.mean()
-
-        # Calcular intervalo promedio entre ventas
-        indices_ventas = np.where(ventas_diarias > 0)[0]
-        if len(indices_ventas) > 1:
-            intervalos = np.diff(indices_ventas)
-            intervalo_promedio = intervalos.mean()
-        else:
-            intervalo_promedio = len(ventas_diarias)
-
-        # Forecast Croston
-        if intervalo_promedio > 0:
-            forecast = promedio_demanda / intervalo_promedio
-        else:
-            forecast = promedio_demanda
-
-        return forecast
+        # Promedio de demanda no-cero / intervalo promedio entre ventas
+        inicio, fin = np.array([0]), np.array([len(ventas_diarias) - 1])
+        return croston_panel(ventas_diarias[None, :], inicio, fin)[0]
 
 
     def clasificar_abc(
@@ -332,27 +424,51 @@ class AlgoritmoMLAvanzado:
         """
         Genera alertas automáticas según condiciones
         """
-        alertas = []
+        return self.generar_alertas_panel(
+            np.array([dias_stock], dtype=float),
+            np.array([tendencia], dtype=object),
+            np.array([cv], dtype=float),
+            np.array([stock_actual], dtype=float)
+        )[0]
+
+
+    def generar_alertas_panel(
+        self,
+        dias_stock: np.ndarray,
+        tendencia: np.ndarray,
+        cv: np.ndarray,
+        stock_actual: np.ndarray
+    ) -> List[List[str]]:
+        """
+        Alertas de todos los SKUs: cada regla es una máscara sobre el panel y
+        solo se formatean los mensajes de los SKUs que la cumplen
+        """
+        alertas = [[] for _ in range(len(dias_stock))]
+
+        def agregar(mascara, mensaje):
+            for i in np.flatnonzero(mascara):
+                alertas[i].append(mensaje(i))
 
         # Alerta: Stockout inminente
-        if dias_stock < self.dias_transito * 0.5:
-            alertas.append(f"⚠️ CRÍTICO: Solo {dias_stock:.0f} días de stock (< {self.dias_transito/2:.0f})")
+        agregar(
+            dias_stock < self.dias_transito * 0.5,
+            lambda i: f"⚠️ CRÍTICO: Solo {dias_stock[i]:.0f} días de stock (< {self.dias_transito/2:.0f})"
+        )
 
         # Alerta: Exceso de stock
-        if dias_stock > self.dias_transito * 2:
-            alertas.append(f"📦 Exceso: {dias_stock:.0f} días de stock (> {self.dias_transito*2:.0f})")
+        agregar(
+            dias_stock > self.dias_transito * 2,
+            lambda i: f"📦 Exceso: {dias_stock[i]:.0f} días de stock (> {self.dias_transito*2:.0f})"
+        )
 
         # Alerta: Tendencia decreciente
-        if tendencia == 'decreciente':
-            alertas.append("📉 Demanda en declive - revisar estrategia")
+        agregar(tendencia == 'decreciente', lambda i: "📉 Demanda en declive - revisar estrategia")
 
         # Alerta: Alta variabilidad
-        if cv > 1.5:
-            alertas.append(f"⚡ Alta variabilidad (CV={cv:.2f}) - difícil de predecir")
+        agregar(cv > 1.5, lambda i: f"⚡ Alta variabilidad (CV={cv[i]:.2f}) - difícil de predecir")
 
         # Alerta: Stock = 0
-        if stock_actual == 0:
-            alertas.append("🔴 SIN STOCK - Quiebre actual")
+        agregar(stock_actual == 0, lambda i: "🔴 SIN STOCK - Quiebre actual")
 
         return alertas
 
@@ -370,273 +486,1135 @@ class AlgoritmoMLAvanzado:
     ) -> Optional[PrediccionAvanzada]:
         """
         Calcula predicción avanzada para un SKU
+
+        Envoltorio sobre `calcular_panel` con un panel de un solo SKU:
+        todas las filas de `ventas_df` y `compras_df` pertenecen a `sku`.
         """
         if ventas_df.empty:
             return None
 
-        # Preparar datos
-        ventas_df = ventas_df.sort_values('fecha')
-        fechas = ventas_df['fecha'].values
-        unidades = ventas_df['unidades'].values
+        skus = np.array([sku], dtype=object)
+        ventas = registros_desde_df(
+            ventas_df, 'unidades', skus=skus, codigos=np.zeros(len(ventas_df))
+        )
 
-        # 1. LIMPIAR OUTLIERS
-        unidades_limpias, outliers_idx = self.detectar_outliers_iqr(unidades)
+        compras = None
+        if compras_df is not None and not compras_df.empty:
+            compras = registros_desde_df(
+                compras_df,
+                'cantidad',
+                skus=skus,
+                codigos=np.zeros(len(compras_df)),
+                fecha_base=ventas.fecha_base
+            )
 
-        if len(unidades_limpias) == 0:
-            return None
+        lote = self.calcular_panel(
+            ventas=ventas,
+            stock_actual=np.array([stock_actual], dtype=float),
+            transito_china=np.array([transito_china], dtype=float),
+            precio_unitario=[precio_unitario],
+            descripcion=[descripcion],
+            compras=compras
+        )
+        return lote[0].a_prediccion() if len(lote) else None
 
-        # 2. CREAR SERIE TEMPORAL DIARIA
-        fecha_min = ventas_df['fecha'].min()
-        fecha_max = ventas_df['fecha'].max()
 
-        # Ajustar fecha_max si hay stock
-        if stock_actual > 0:
-            fecha_max = max(fecha_max, pd.Timestamp.now())
+    def calcular_panel(
+        self,
+        ventas: RegistrosSKU,
+        stock_actual: np.ndarray,
+        transito_china: np.ndarray,
+        precio_unitario: List[float],
+        descripcion: List[str],
+        compras: RegistrosSKU = None,
+        ahora: pd.Timestamp = None
+    ) -> PrediccionesBatch:
+        """
+        Calcula las predicciones de todos los SKUs de `ventas` en una pasada
 
-        # Crear serie diaria completa
-        rango_fechas = pd.date_range(fecha_min, fecha_max, freq='D')
-        serie_diaria = pd.Series(0.0, index=rango_fechas)
+        Los modelos de demanda y los stockouts se calculan sobre la matriz
+        SKU × día (`analizar_panel`) y el resultado se arma por columnas.
 
-        # Llenar con ventas reales (sin outliers)
-        ventas_sin_outliers = ventas_df.drop(ventas_df.index[outliers_idx])
-        for _, row in ventas_sin_outliers.iterrows():
-            serie_diaria[row['fecha']] = row['unidades']
+        Args:
+            ventas: Filas de venta codificadas (valores = unidades)
+            stock_actual, transito_china, precio_unitario, descripcion:
+                Valores por SKU alineados con `ventas.skus`
+            compras: Compras codificadas con los mismos SKUs (valores = cantidad)
+            ahora: Instante de cálculo (default: ahora)
+
+        Returns:
+            Lote con los SKUs de `ventas` que tienen datos, en su orden
+        """
+        analisis = self.analizar_panel(ventas, stock_actual, compras=compras, ahora=ahora)
+
+        return self.predicciones_desde_analisis(
+            analisis, stock_actual, transito_china, precio_unitario, descripcion
+        )
+
+
+    def calcular_panel_con_backtest(
+        self,
+        ventas: RegistrosSKU,
+        stock_actual: np.ndarray,
+        transito_china: np.ndarray,
+        precio_unitario: List[float],
+        descripcion: List[str],
+        compras: RegistrosSKU = None,
+        ahora: pd.Timestamp = None,
+        **opciones_backtest
+    ) -> Tuple[PrediccionesBatch, ResultadoBacktest]:
+        """
+        `calcular_panel` y `backtest` sobre el mismo análisis (opciones:
+        n_origenes, horizonte, origenes, fechas_origen)
+        """
+        analisis = self.analizar_panel(ventas, stock_actual, compras=compras, ahora=ahora)
+        resultados = self.predicciones_desde_analisis(
+            analisis, stock_actual, transito_china, precio_unitario, descripcion
+        )
+        return resultados, self.backtest(analisis, **opciones_backtest)
+
+
+    def analizar_panel(
+        self,
+        ventas: RegistrosSKU,
+        stock_actual: np.ndarray,
+        compras: RegistrosSKU = None,
+        ahora: pd.Timestamp = None
+    ) -> AnalisisPanel:
+        """
+        Pasos 1-6 (outliers, modelos de demanda, stockouts, estadísticas y
+        tendencia) para todos los SKUs de `ventas`
+        """
+        if ahora is None:
+            ahora = pd.Timestamp.now()
+        n_skus = ventas.n_skus
+        codigos = ventas.codigos
+        unidades = ventas.valores
+
+        # 1. LIMPIAR OUTLIERS (IQR sobre las filas de venta de cada SKU)
+        sin_outliers = mascara_outliers_iqr(unidades, codigos, n_skus)
+        n_filas = ventas.conteos()
+        n_outliers = n_filas - np.bincount(codigos[sin_outliers], minlength=n_skus)
+
+        # 2. CREAR MATRIZ SKU × DÍA (sin outliers; con stock se extiende a hoy)
+        matriz = matriz_desde_registros(
+            ventas,
+            mascara_filas=sin_outliers,
+            fecha_hasta=ahora,
+            extender=stock_actual > 0
+        )
+        inicio, fin = matriz.inicio, matriz.fin
 
         # 3. DETECTAR SI ES DEMANDA INTERMITENTE
-        es_intermitente = self.es_demanda_intermitente(serie_diaria)
+        es_intermitente = (
+            tasa_intermitencia_panel(matriz.ventas, inicio, fin) >= self.umbral_intermitencia
+        )
 
         # 4. CALCULAR FORECAST SEGÚN TIPO DE DEMANDA
-        if es_intermitente:
-            venta_diaria_promedio = self.calcular_forecast_croston(serie_diaria)
-            modelo_usado = 'croston'
-        else:
-            venta_diaria_promedio = self.calcular_venta_ponderada_ewma(serie_diaria)
-            modelo_usado = 'ewma'
+        venta_diaria_promedio = np.where(
+            es_intermitente,
+            croston_panel(matriz.ventas, inicio, fin),
+            ewma_panel(matriz.ventas, inicio, fin, self.alpha_ewma)
+        )
 
         # 4.5. DETECTAR STOCKOUTS INTELIGENTEMENTE
-        dias_con_stock = serie_diaria.index  # Por defecto, todos los días tienen stock
+        # Stock_t = Stock_t-1 + Compras_t - Ventas_t, reconstruido con sumas
+        # acumuladas; sin compras registradas se usan todos los días
+        compras_matriz, tiene_compras = matriz_compras_desde_registros(compras, matriz)
+        con_stock = dias_con_stock_panel(
+            matriz.ventas,
+            compras_matriz,
+            tiene_compras,
+            inicio,
+            fin,
+            venta_diaria_promedio
+        )
 
-        if compras_df is not None and not compras_df.empty:
-            # Crear serie de compras diarias
-            serie_compras = pd.Series(0.0, index=rango_fechas)
-            for _, row in compras_df.iterrows():
-                fecha_compra = pd.to_datetime(row['fecha'])
-                if fecha_compra in serie_compras.index:
-                    serie_compras[fecha_compra] += row['cantidad']
-
-            # Reconstruir stock día a día: Stock_t = Stock_t-1 + Compras_t - Ventas_t
-            # Empezamos con un stock inicial estimado (primera compra o promedio de ventas * 30 días)
-            if len(serie_compras[serie_compras > 0]) > 0:
-                primera_compra_idx = serie_compras[serie_compras > 0].index[0]
-                primera_compra_cantidad = serie_compras[primera_compra_idx]
-                stock_inicial = primera_compra_cantidad
-            else:
-                # Si no hay compras, asumir 30 días de stock promedio
-                stock_inicial = venta_diaria_promedio * 30
+        # 4.6. AJUSTAR MODELO POR SKU (opcional): el candidato con menor error
+        # de backtesting reemplaza al de la regla si lo mejora. Los orígenes
+        # son fechas de la corrida, no de esta matriz: un tramo, un bloque o
+        # un sub-panel del cache eligen lo mismo que el panel completo
+        modelo_usado = seleccion = None
+        if self.ajustar_modelos:
+            origenes = (fechas_origen_backtest(ahora) - matriz.fecha_base).days.to_numpy()
+            seleccion = seleccionar_modelos_matriz(
+                matriz, con_stock, self.alpha_ewma, self.umbral_intermitencia, origenes=origenes
+            )
+            venta_diaria_promedio = seleccion.aplicar(venta_diaria_promedio)
+            modelo_usado = seleccion.modelos(es_intermitente)
 
-            # Reconstruir stock diario
-            stock_diario = pd.Series(index=rango_fechas, dtype=float)
-            stock_diario.iloc[0] = stock_inicial
+        # 5. CALCULAR ESTADÍSTICAS (excluyendo días de stockout)
+        p50, p75, p90, desviacion = estadisticas_panel(
+            matriz.ventas, con_stock, venta_diaria_promedio
+        )
 
-            for i in range(1, len(stock_diario)):
-                fecha_actual = stock_diario.index[i]
-                stock_anterior = stock_diario.iloc[i-1]
-                compras_dia = serie_compras.iloc[i]
-                ventas_dia = serie_diaria.iloc[i]
+        # 6. CALCULAR TENDENCIA (regresión de unidades vs días sobre las filas)
+        # Como antes, un SKU con outliers removidos queda 'estable': la serie
+        # de fechas completa y la de unidades limpias no son comparables
+        con_regresion = n_outliers[codigos] == 0
+        codigos_regresion = codigos[con_regresion]
+        pendiente, _, _, p_valor, _ = tendencia_panel(
+            ventas.dias[con_regresion].astype(float),
+            unidades[con_regresion],
+            codigos_regresion,
+            n_skus
+        )
+        venta_media_filas = np.bincount(
+            codigos_regresion, weights=unidades[con_regresion], minlength=n_skus
+        ) / np.maximum(n_filas, 1)
+
+        return self._completar_analisis(
+            skus=ventas.skus,
+            fecha_base=matriz.fecha_base,
+            inicio=inicio,
+            fin=fin,
+            ultima_venta=matriz.ultima_venta,
+            stock_actual=stock_actual,
+            ahora=ahora,
+            venta_diaria_promedio=venta_diaria_promedio,
+            p50=p50,
+            p75=p75,
+            p90=p90,
+            desviacion=desviacion,
+            pendiente=pendiente,
+            p_valor=p_valor,
+            venta_media_filas=venta_media_filas,
+            es_intermitente=es_intermitente,
+            n_filas=n_filas,
+            n_outliers=n_outliers,
+            unidades_totales=np.where(matriz.mascara_valida(), matriz.ventas, 0.0).sum(axis=1),
+            modelo_usado=modelo_usado,
+            seleccion=seleccion,
+            matriz=matriz,
+            compras_matriz=compras_matriz,
+            tiene_compras=tiene_compras,
+            con_stock=con_stock
+        )
 
-                stock_diario.iloc[i] = stock_anterior + compras_dia - ventas_dia
 
-            # Identificar días con stockout (stock <= 0)
-            dias_con_stock = stock_diario[stock_diario > 0].index
-            dias_stockout = stock_diario[stock_diario <= 0].index
+    def _completar_analisis(
+        self,
+        skus: np.ndarray,
+        fecha_base: pd.Timestamp,
+        inicio: np.ndarray,
+        fin: np.ndarray,
+        ultima_venta: np.ndarray,
+        stock_actual: np.ndarray,
+        ahora: pd.Timestamp,
+        venta_diaria_promedio: np.ndarray,
+        p50: np.ndarray,
+        p75: np.ndarray,
+        p90: np.ndarray,
+        desviacion: np.ndarray,
+        pendiente: np.ndarray,
+        p_valor: np.ndarray,
+        venta_media_filas: np.ndarray,
+        es_intermitente: np.ndarray,
+        n_filas: np.ndarray,
+        n_outliers: np.ndarray,
+        unidades_totales: np.ndarray,
+        **intermedios
+    ) -> AnalisisPanel:
+        """
+        Coeficiente de variación, categoría de tendencia y período de cada
+        SKU; común al cálculo completo y al incremental
+        """
+        n_skus = len(skus)
 
-            # Si hay stockouts significativos, excluirlos del análisis
-            if len(dias_stockout) > 0:
-                # Filtrar serie_diaria para calcular estadísticas solo con días que tenían stock
-                serie_diaria_con_stock = serie_diaria[dias_con_stock]
-            else:
-                serie_diaria_con_stock = serie_diaria
-        else:
-            # Si no hay datos de compras, usar toda la serie
-            serie_diaria_con_stock = serie_diaria
+        # Coeficiente de variación
+        cvs = np.divide(
+            desviacion,
+            venta_diaria_promedio,
+            out=np.zeros(n_skus),
+            where=venta_diaria_promedio > 0
+        )
 
-        # 5. CALCULAR ESTADÍSTICAS (excluyendo días de stockout)
-        ventas_no_cero = serie_diaria_con_stock[serie_diaria_con_stock > 0]
+        tendencias, tasas_crecimiento = self.categorizar_tendencia(
+            pendiente, p_valor, venta_media_filas
+        )
+        sin_regresion = np.isnan(pendiente) | (n_outliers > 0)
+        tendencias[sin_regresion] = 'estable'
+        tasas_crecimiento[sin_regresion] = 0.0
+        tendencias[n_filas < 2] = 'desconocida'
+
+        # Período: desde el inicio del rango hasta la última venta, o hasta
+        # ahora si el SKU todavía tiene stock
+        base = np.datetime64(fecha_base, 'ns')
+        periodo_inicio = base + inicio.astype('timedelta64[D]')
+        periodo_fin = base + ultima_venta.astype('timedelta64[D]')
+        periodo_fin = np.where(
+            stock_actual > 0,
+            np.maximum(periodo_fin, np.datetime64(ahora, 'ns')),
+            periodo_fin
+        )
 
-        if len(ventas_no_cero) > 0:
-            venta_diaria_p50 = np.percentile(ventas_no_cero, 50)
-            venta_diaria_p75 = np.percentile(ventas_no_cero, 75)
-            venta_diaria_p90 = np.percentile(ventas_no_cero, 90)
-            desviacion_estandar = serie_diaria_con_stock.std()  # ✅ Ahora excluye stockouts
-        else:
-            venta_diaria_p50 = venta_diaria_promedio
-            venta_diaria_p75 = venta_diaria_promedio
-            venta_diaria_p90 = venta_diaria_promedio
-            desviacion_estandar = 0.0
+        return AnalisisPanel(
+            skus=skus,
+            venta_diaria_promedio=venta_diaria_promedio,
+            venta_diaria_p50=p50,
+            venta_diaria_p75=p75,
+            venta_diaria_p90=p90,
+            desviacion_estandar=desviacion,
+            coeficiente_variacion=cvs,
+            tendencia=tendencias,
+            tasa_crecimiento_mensual=tasas_crecimiento,
+            es_intermitente=es_intermitente,
+            n_filas=n_filas,
+            n_outliers=n_outliers,
+            periodo_inicio=periodo_inicio,
+            periodo_fin=periodo_fin,
+            dias_periodo=fin - inicio + 1,
+            unidades_totales_periodo=unidades_totales,
+            **intermedios
+        )
 
-        # Coeficiente de variación
-        if venta_diaria_promedio > 0:
-            cv = desviacion_estandar / venta_diaria_promedio
+
+    def predicciones_desde_analisis(
+        self,
+        analisis: AnalisisPanel,
+        stock_actual: np.ndarray,
+        transito_china: np.ndarray,
+        precio_unitario: List[float],
+        descripcion: List[str]
+    ) -> PrediccionesBatch:
+        """
+        Pasos 7-12 (stock óptimo, sugerencias, alertas y resultado) de todo
+        el panel, columna por columna
+
+        Returns:
+            Lote con los SKUs del análisis que tienen datos, en su orden
+        """
+        stock_actual = np.asarray(stock_actual, dtype=float)
+        transito_china = np.asarray(transito_china, dtype=float)
+        venta = analisis.venta_diaria_promedio
+
+        # 8. DÍAS DE STOCK (todo el panel: las alertas se generan sobre él)
+        dias_stock = np.full(len(venta), 999999.0)
+        np.divide(stock_actual, venta, out=dias_stock, where=venta > 0)
+
+        # 10. ALERTAS
+        alertas = self.generar_alertas_panel(
+            dias_stock,
+            np.asarray(analisis.tendencia, dtype=object),
+            np.asarray(analisis.coeficiente_variacion, dtype=float),
+            stock_actual
+        )
+
+        filas = np.flatnonzero(analisis.n_filas - analisis.n_outliers > 0)
+        venta = venta[filas]
+        desviacion = analisis.desviacion_estandar[filas]
+        stock = stock_actual[filas]
+        transito = transito_china[filas]
+        dias_stock = dias_stock[filas]
+        precio = np.asarray(precio_unitario, dtype=float)[filas]
+        es_intermitente = np.asarray(analisis.es_intermitente, dtype=bool)[filas]
+        n_outliers = np.asarray(analisis.n_outliers)[filas]
+        if analisis.modelo_usado is None:
+            modelo_usado = np.where(es_intermitente, 'croston', 'ewma').astype(object)
         else:
-            cv = 0.0
+            modelo_usado = np.asarray(analisis.modelo_usado, dtype=object)[filas]
+
+        # 7. STOCK ÓPTIMO Y SEGURIDAD (SS = Z × σ × √LT)
+        # 9. SUGERENCIAS (múltiples escenarios), descontando el tránsito
+        stock_seguridad, stock_optimo, sugerencia_p50, sugerencia_p75, sugerencia_p90 = reposicion_panel(
+            venta,
+            analisis.venta_diaria_p50[filas],
+            analisis.venta_diaria_p75[filas],
+            analisis.venta_diaria_p90[filas],
+            desviacion,
+            dias_stock,
+            transito,
+            self.z_score,
+            self.dias_stock_deseado,
+            self.dias_transito
+        )
+
+        # 11. OBSERVACIONES (solo se formatean las de los SKUs que tienen alguna)
+        observaciones = np.full(len(filas), '', dtype=object)
+        for k in np.flatnonzero((n_outliers > 0) | es_intermitente | (transito > 0)):
+            observaciones_lista = []
+            if n_outliers[k] > 0:
+                observaciones_lista.append(f"{int(n_outliers[k])} outliers removidos")
+            if es_intermitente[k]:
+                observaciones_lista.append("Demanda intermitente detectada")
+            if transito[k] > 0:
+                observaciones_lista.append(f"Tránsito: {transito[k]:.0f} unidades")
+            observaciones[k] = " | ".join(observaciones_lista)
+
+        # 12. RESULTADO
+        vacias = np.full(len(filas), '', dtype=object)
+        return PrediccionesBatch({
+            'sku': np.asarray(analisis.skus, dtype=object)[filas],
+            'descripcion': np.asarray(descripcion, dtype=object)[filas],
+            'venta_diaria_promedio': np.round(venta, 2),
+            'venta_diaria_p50': np.round(analisis.venta_diaria_p50[filas], 2),
+            'venta_diaria_p75': np.round(analisis.venta_diaria_p75[filas], 2),
+            'venta_diaria_p90': np.round(analisis.venta_diaria_p90[filas], 2),
+            'desviacion_estandar': np.round(desviacion, 2),
+            'coeficiente_variacion': np.round(analisis.coeficiente_variacion[filas], 2),
+            'tendencia': np.asarray(analisis.tendencia, dtype=object)[filas],
+            'tasa_crecimiento_mensual': np.round(analisis.tasa_crecimiento_mensual[filas], 2),
+            'stock_actual': np.round(stock, 0),
+            'stock_optimo': np.round(stock_optimo, 0),
+            'stock_seguridad': np.round(stock_seguridad, 0),
+            'dias_stock_actual': np.round(dias_stock, 0),
+            'transito_china': np.round(transito, 0),
+            'sugerencia_reposicion': np.round(sugerencia_p50, 0),
+            'sugerencia_reposicion_p75': np.round(sugerencia_p75, 0),
+            'sugerencia_reposicion_p90': np.round(sugerencia_p90, 0),
+            'precio_unitario': precio,
+            'valor_total_sugerencia': np.round(sugerencia_p50 * precio, 0),
+            'periodo_inicio': np.asarray(analisis.periodo_inicio)[filas].astype('datetime64[ns]'),
+            'periodo_fin': np.asarray(analisis.periodo_fin)[filas].astype('datetime64[ns]'),
+            'dias_periodo': np.asarray(analisis.dias_periodo, dtype=np.int64)[filas],
+            'unidades_totales_periodo': np.round(analisis.unidades_totales_periodo[filas], 0),
+            'clasificacion_abc': vacias,  # Se calculará después
+            'clasificacion_xyz': vacias.copy(),  # Se calculará después
+            'es_demanda_intermitente': es_intermitente,
+            'modelo_usado': modelo_usado,
+            'observaciones': observaciones,
+            'alertas': columna_prediccion('alertas', [alertas[i] for i in filas])
+        })
+
+
+    def calcular_escenarios(
+        self,
+        analisis: AnalisisPanel,
+        stock_actual: np.ndarray,
+        transito_china: np.ndarray,
+        precio_unitario: List[float],
+        dias_stock_deseado: Sequence[int] = None,
+        dias_transito: Sequence[int] = None,
+        nivel_servicio: Sequence[float] = None,
+        campos: Sequence[str] = CAMPOS_ESCENARIO
+    ) -> CuboEscenarios:
+        """
+        Pasos 7 y 9 (stock de seguridad, stock óptimo y sugerencias) sobre
+        una grilla de escenarios, reutilizando el análisis de demanda
+
+        La grilla es el producto cartesiano de los valores de cada
+        parámetro; los omitidos toman el valor del algoritmo. Los
+        escenarios se evalúan por bloques para acotar la memoria temporal.
+
+        Returns:
+            Cubo con los SKUs del análisis que tienen datos, en su orden
+        """
+        stock_deseado, transito_dias, servicio = grilla_escenarios(
+            [self.dias_stock_deseado] if dias_stock_deseado is None else dias_stock_deseado,
+            [self.dias_transito] if dias_transito is None else dias_transito,
+            [self.nivel_servicio] if nivel_servicio is None else nivel_servicio
+        )
+        z = np.array([z_nivel_servicio(float(nivel)) for nivel in servicio])
+
+        stock_actual = np.asarray(stock_actual, dtype=float)
+        venta = analisis.venta_diaria_promedio
+        dias_stock = np.full(len(venta), 999999.0)
+        np.divide(stock_actual, venta, out=dias_stock, where=venta > 0)
+
+        # Arrays por SKU como columnas (n_skus, 1) para el broadcasting
+        filas = np.flatnonzero(analisis.n_filas - analisis.n_outliers > 0)
+        por_sku = [
+            np.asarray(valores, dtype=float)[filas, None]
+            for valores in (
+                venta, analisis.venta_diaria_p50, analisis.venta_diaria_p75, analisis.venta_diaria_p90,
+                analisis.desviacion_estandar, dias_stock, transito_china
+            )
+        ]
+        precio = np.asarray(precio_unitario, dtype=float)[filas, None]
+
+        n_escenarios = len(servicio)
+        valores = {campo: np.empty((len(filas), n_escenarios)) for campo in campos}
+        bloque = max(1, ESCENARIOS_POR_BLOQUE_CELDAS // max(1, len(filas)))
+        for a in range(0, n_escenarios, bloque):
+            b = min(n_escenarios, a + bloque)
+            stock_seguridad, stock_optimo, sugerencia_p50, sugerencia_p75, sugerencia_p90 = reposicion_panel(
+                *por_sku, z[a:b], stock_deseado[a:b], transito_dias[a:b]
+            )
+            calculados = {
+                'stock_seguridad': stock_seguridad,
+                'stock_optimo': stock_optimo,
+                'sugerencia_reposicion': sugerencia_p50,
+                'sugerencia_reposicion_p75': sugerencia_p75,
+                'sugerencia_reposicion_p90': sugerencia_p90,
+                'valor_total_sugerencia': sugerencia_p50 * precio
+            }
+            for campo in campos:
+                np.round(calculados[campo], 0, out=valores[campo][:, a:b])
+
+        return CuboEscenarios(
+            skus=np.asarray(analisis.skus, dtype=object)[filas],
+            dias_stock_deseado=stock_deseado,
+            dias_transito=transito_dias,
+            nivel_servicio=servicio,
+            valores=valores
+        )
+
+
+    def calcular_escenarios_completos(
+        self,
+        ventas_df: Ventas,
+        stock_df: pd.DataFrame,
+        transito_df: pd.DataFrame = None,
+        compras_df: pd.DataFrame = None,
+        ahora: pd.Timestamp = None,
+        **grilla
+    ) -> CuboEscenarios:
+        """
+        Analiza la demanda una vez y evalúa la grilla de escenarios
+        (argumentos de `calcular_escenarios`)
+        """
+        ventas, compras = self._codificar(ventas_df, compras_df)
+        datos_por_sku = self._datos_por_sku(ventas.skus, ventas_df, stock_df, transito_df)
+        analisis = self.analizar_panel(
+            ventas, datos_por_sku['stock_actual'], compras=compras, ahora=ahora
+        )
+        return self.calcular_escenarios(
+            analisis,
+            datos_por_sku['stock_actual'],
+            datos_por_sku['transito_china'],
+            datos_por_sku['precio_unitario'],
+            **grilla
+        )
+
+
+    def backtest(
+        self,
+        analisis: AnalisisPanel,
+        n_origenes: int = ORIGENES_POR_DEFECTO,
+        horizonte: int = HORIZONTE_DIAS,
+        origenes: np.ndarray = None,
+        fechas_origen: pd.DatetimeIndex = None
+    ) -> ResultadoBacktest:
+        """
+        Backtesting rolling-origin de los modelos del análisis sobre su
+        matriz SKU × día, excluyendo los días sin stock
+
+        Con `ajustar_modelos` evalúa el modelo elegido en cada SKU: en los
+        orígenes de la selección reutiliza su backtesting, sin volver a
+        recorrer la grilla de candidatos.
+
+        Args:
+            analisis: Análisis con los intermedios del panel (`analizar_panel`)
+            origenes: Días de origen en la matriz (default: los últimos
+                `n_origenes`, uno por semana)
+            fechas_origen: Orígenes como fechas, en lugar de `origenes`
+                (los de todo el panel cuando el análisis es de un tramo)
+        """
+        if analisis.matriz is None:
+            raise ValueError("El backtesting requiere un análisis calculado desde las ventas completas")
+
+        if origenes is None and fechas_origen is not None:
+            origenes = (pd.DatetimeIndex(fechas_origen) - analisis.matriz.fecha_base).days.to_numpy()
+        if origenes is None:
+            origenes = origenes_backtest(analisis.matriz.n_dias, horizonte, n_origenes)
+        if analisis.seleccion is not None:
+            return backtest_seleccion_matriz(
+                analisis.matriz,
+                analisis.con_stock,
+                analisis.seleccion,
+                self.alpha_ewma,
+                self.umbral_intermitencia,
+                origenes=origenes,
+                horizonte=horizonte
+            )
+        return backtest_matriz(
+            analisis.matriz,
+            analisis.con_stock,
+            self.alpha_ewma,
+            self.umbral_intermitencia,
+            origenes=origenes,
+            horizonte=horizonte
+        )
+
+
+    def seleccionar_modelos(
+        self,
+        analisis: AnalisisPanel,
+        n_origenes: int = ORIGENES_POR_DEFECTO,
+        horizonte: int = HORIZONTE_DIAS
+    ) -> SeleccionModelos:
+        """
+        Grilla de modelos y alphas (`seleccion_modelos.CANDIDATOS`) evaluada
+        con backtesting sobre la matriz del análisis; el mejor por SKU
+
+        Args:
+            analisis: Análisis con los intermedios del panel (`analizar_panel`)
+        """
+        if analisis.matriz is None:
+            raise ValueError("La selección de modelos requiere un análisis calculado desde las ventas completas")
+
+        return seleccionar_modelos_matriz(
+            analisis.matriz,
+            analisis.con_stock,
+            self.alpha_ewma,
+            self.umbral_intermitencia,
+            origenes=origenes_backtest(analisis.matriz.n_dias, horizonte, n_origenes),
+            horizonte=horizonte
+        )
+
 
-        # 6. CALCULAR TENDENCIA
-        if len(fechas) >= 2:
-            fechas_num = pd.to_datetime(ventas_df['fecha']).values
-            tendencia, tasa_crecimiento = self.calcular_tendencia(fechas_num, unidades_limpias)
+    def calcular_backtest(
+        self,
+        ventas_df: Ventas,
+        stock_df: pd.DataFrame,
+        compras_df: pd.DataFrame = None,
+        ahora: pd.Timestamp = None,
+        **opciones
+    ) -> ResultadoBacktest:
+        """
+        Analiza las ventas y ejecuta `backtest` (opciones: n_origenes,
+        horizonte, origenes); junto con las predicciones conviene
+        `calcular_predicciones_y_backtest`, que reutiliza el análisis
+        """
+        ventas, compras = self._codificar(ventas_df, compras_df)
+        stock_actual = self._datos_por_sku(ventas.skus, ventas_df, stock_df)['stock_actual']
+        analisis = self.analizar_panel(ventas, stock_actual, compras=compras, ahora=ahora)
+        return self.backtest(analisis, **opciones)
+
+
+    def calcular_predicciones_y_backtest(
+        self,
+        ventas_df: Ventas,
+        stock_df: pd.DataFrame,
+        transito_df: pd.DataFrame = None,
+        compras_df: pd.DataFrame = None,
+        n_workers: int = 1,
+        cache: CachePredicciones = None,
+        n_origenes: int = ORIGENES_POR_DEFECTO,
+        horizonte: int = HORIZONTE_DIAS
+    ) -> Tuple[PrediccionesBatch, Optional[ResultadoBacktest]]:
+        """
+        `calcular_predicciones_completas` y el backtesting de todo el panel
+        sobre el mismo análisis, sin volver a codificar ni analizar las ventas
+
+        Con varios workers cada tramo evalúa sus SKUs en las mismas fechas de
+        origen (`fechas_origen_backtest` de la corrida). Con cache solo se analizan los SKUs sin acierto,
+        así que el backtesting analiza el panel completo aparte.
+
+        Returns:
+            (predicciones, backtesting); backtesting None sin ventas
+        """
+        if ventas_df.empty:
+            return PrediccionesBatch.vacio(), None
+
+        ahora = pd.Timestamp.now()
+        ventas, compras = self._codificar(ventas_df, compras_df)
+        datos_por_sku = self._datos_por_sku(ventas.skus, ventas_df, stock_df, transito_df)
+        opciones_backtest = dict(
+            fechas_origen=fechas_origen_backtest(ahora, horizonte, n_origenes),
+            horizonte=horizonte
+        )
+
+        if cache is None:
+            resultados, backtest = self._calcular_resultados(
+                ventas, compras, datos_por_sku, n_workers, ahora, opciones_backtest
+            )
         else:
-            tendencia, tasa_crecimiento = 'desconocida', 0.0
+            resultados = self._calcular_con_cache(
+                ventas, compras, datos_por_sku, n_workers, ahora, cache
+            )
+            analisis = self.analizar_panel(ventas, datos_por_sku['stock_actual'], compras=compras, ahora=ahora)
+            backtest = self.backtest(analisis, **opciones_backtest)
+
+        return self.clasificar_y_ordenar(resultados), backtest
+
+
+    def calcular_predicciones_completas(
+        self,
+        ventas_df: Ventas,
+        stock_df: pd.DataFrame,
+        transito_df: pd.DataFrame = None,
+        compras_df: pd.DataFrame = None,
+        n_workers: int = 1,
+        cache: CachePredicciones = None
+    ) -> PrediccionesBatch:
+        """
+        Calcula predicciones para todos los SKUs con clasificación ABC-XYZ
 
-        # 7. CALCULAR STOCK ÓPTIMO Y SEGURIDAD
-        stock_optimo_base = venta_diaria_promedio * self.dias_stock_deseado
-        stock_seguridad = self.calcular_stock_seguridad(desviacion_estandar, self.dias_transito)
-        stock_optimo = stock_optimo_base + stock_seguridad
+        Args:
+            ventas_df: DataFrame (sku, fecha, unidades, precio) o VentasCompactas
+            n_workers: Con más de 1, reparte los SKUs en tramos balanceados
+                por número de filas y los calcula en un pool de procesos
+                (resultado idéntico al serial)
+            cache: Cache por SKU; solo se calculan los SKUs cuyos datos
+                cambiaron desde que se guardó su predicción
+        """
+        if ventas_df.empty:
+            return PrediccionesBatch.vacio()
 
-        # 8. CALCULAR DÍAS DE STOCK
-        if venta_diaria_promedio > 0:
-            dias_stock = stock_actual / venta_diaria_promedio
+        ahora = pd.Timestamp.now()
+        ventas, compras = self._codificar(ventas_df, compras_df)
+        datos_por_sku = self._datos_por_sku(ventas.skus, ventas_df, stock_df, transito_df)
+
+        if cache is None:
+            resultados = self._calcular_resultados(ventas, compras, datos_por_sku, n_workers, ahora)
         else:
-            dias_stock = 999999
+            resultados = self._calcular_con_cache(
+                ventas, compras, datos_por_sku, n_workers, ahora, cache
+            )
 
-        # 9. CALCULAR SUGERENCIAS (múltiples escenarios)
-        def calcular_sugerencia(venta_diaria_escenario, stock_opt):
-            if dias_stock > self.dias_transito:
-                dias_restantes = dias_stock - self.dias_transito
-                sugerencia = stock_opt - (dias_restantes * venta_diaria_escenario)
+        return self.clasificar_y_ordenar(resultados)
+
+
+    def calcular_predicciones_por_bloques(
+        self,
+        ventas_df: Ventas,
+        stock_df: pd.DataFrame,
+        transito_df: pd.DataFrame = None,
+        compras_df: pd.DataFrame = None,
+        skus_por_bloque: int = 2000,
+        n_workers: int = 1,
+        cache: CachePredicciones = None,
+        backtests: List[ResultadoBacktest] = None,
+        n_origenes: int = ORIGENES_POR_DEFECTO,
+        horizonte: int = HORIZONTE_DIAS
+    ) -> Iterator[PrediccionesBatch]:
+        """
+        Como `calcular_predicciones_completas`, pero entrega las predicciones
+        por bloques de SKUs a medida que se calculan
+
+        Cada bloque trae los SKUs con sugerencia > 0, con su clasificación
+        XYZ (depende solo del SKU) y ABC provisional 'C'. El ABC definitivo
+        depende del conjunto completo: `clasificar_y_ordenar` sobre todos
+        los bloques da el mismo resultado que `calcular_predicciones_completas`.
+
+        Args:
+            backtests: Lista a la que se agrega el backtesting de cada bloque
+                sobre su análisis, en las fechas de origen de la corrida
+                (`ResultadoBacktest.concatenar` los une). Con cache se agrega
+                uno solo de todo el panel, al final
+        """
+        if ventas_df.empty:
+            return
+
+        from ejecucion_paralela import dividir_en_tramos
+
+        ahora = pd.Timestamp.now()
+        ventas, compras = self._codificar(ventas_df, compras_df)
+        datos_por_sku = self._datos_por_sku(ventas.skus, ventas_df, stock_df, transito_df)
+
+        ventas = ventas.ordenados()
+        if compras is not None:
+            compras = compras.ordenados()
+
+        opciones_backtest = None
+        if backtests is not None:
+            opciones_backtest = dict(
+                fechas_origen=fechas_origen_backtest(ahora, horizonte, n_origenes),
+                horizonte=horizonte
+            )
+
+        # Bloques contiguos con un número similar de filas
+        n_bloques = -(-ventas.n_skus // max(1, skus_por_bloque))
+        for sku_inicio, sku_fin in dividir_en_tramos(ventas.conteos(), n_bloques):
+            ventas_bloque = ventas.tramo(sku_inicio, sku_fin)
+            compras_bloque = compras.tramo(sku_inicio, sku_fin) if compras is not None else None
+            datos_bloque = {
+                clave: valores[sku_inicio:sku_fin] for clave, valores in datos_por_sku.items()
+            }
+
+            if cache is None and opciones_backtest is not None:
+                resultados, backtest = self._calcular_resultados(
+                    ventas_bloque, compras_bloque, datos_bloque, n_workers, ahora, opciones_backtest
+                )
+                backtests.append(backtest)
+            elif cache is None:
+                resultados = self._calcular_resultados(
+                    ventas_bloque, compras_bloque, datos_bloque, n_workers, ahora
+                )
             else:
-                sugerencia = stock_opt
-
-            # Restar tránsito
-            sugerencia -= transito_china
-
-            return max(0, sugerencia)
-
-        sugerencia_p50 = calcular_sugerencia(venta_diaria_p50, stock_optimo_base)
-        sugerencia_p75 = calcular_sugerencia(venta_diaria_p75, stock_optimo_base + stock_seguridad * 0.5)
-        sugerencia_p90 = calcular_sugerencia(venta_diaria_p90, stock_optimo_base + stock_seguridad)
-
-        # 10. GENERAR ALERTAS
-        alertas = self.generar_alertas(sku, dias_stock, tendencia, cv, stock_actual)
-
-        # 11. OBSERVACIONES
-        observaciones_lista = []
-        if len(outliers_idx) > 0:
-            observaciones_lista.append(f"{len(outliers_idx)} outliers removidos")
-        if es_intermitente:
-            observaciones_lista.append("Demanda intermitente detectada")
-        if transito_china > 0:
-            observaciones_lista.append(f"Tránsito: {transito_china:.0f} unidades")
-
-        observaciones = " | ".join(observaciones_lista)
-
-        # 12. CREAR RESULTADO
-        prediccion = PrediccionAvanzada(
-            sku=sku,
-            descripcion=descripcion,
-            venta_diaria_promedio=round(venta_diaria_promedio, 2),
-            venta_diaria_p50=round(venta_diaria_p50, 2),
-            venta_diaria_p75=round(venta_diaria_p75, 2),
-            venta_diaria_p90=round(venta_diaria_p90, 2),
-            desviacion_estandar=round(desviacion_estandar, 2),
-            coeficiente_variacion=round(cv, 2),
-            tendencia=tendencia,
-            tasa_crecimiento_mensual=round(tasa_crecimiento, 2),
-            stock_actual=round(stock_actual, 0),
-            stock_optimo=round(stock_optimo, 0),
-            stock_seguridad=round(stock_seguridad, 0),
-            dias_stock_actual=round(dias_stock, 0),
-            transito_china=round(transito_china, 0),
-            sugerencia_reposicion=round(sugerencia_p50, 0),
-            sugerencia_reposicion_p75=round(sugerencia_p75, 0),
-            sugerencia_reposicion_p90=round(sugerencia_p90, 0),
-            precio_unitario=precio_unitario,
-            valor_total_sugerencia=round(sugerencia_p50 * precio_unitario, 0),
-            periodo_inicio=fecha_min,
-            periodo_fin=fecha_max,
-            dias_periodo=len(serie_diaria),
-            unidades_totales_periodo=round(serie_diaria.sum(), 0),
-            clasificacion_abc='',  # Se calculará después
-            clasificacion_xyz='',  # Se calculará después
-            es_demanda_intermitente=es_intermitente,
-            modelo_usado=modelo_usado,
-            observaciones=observaciones,
-            alertas=alertas
+                resultados = self._calcular_con_cache(
+                    ventas_bloque, compras_bloque, datos_bloque, n_workers, ahora, cache
+                )
+
+            lote = resultados[resultados.columnas['sugerencia_reposicion'] > 0]
+            skus = lote.skus.tolist()
+            clasificacion_xyz = self.clasificar_xyz(
+                dict(zip(skus, lote.columnas['coeficiente_variacion'].tolist()))
+            )
+            lote.columnas['clasificacion_abc'] = np.full(len(lote), 'C', dtype=object)
+            lote.columnas['clasificacion_xyz'] = np.array([clasificacion_xyz[sku] for sku in skus], dtype=object)
+
+            yield lote
+
+        if cache is not None and opciones_backtest is not None:
+            analisis = self.analizar_panel(ventas, datos_por_sku['stock_actual'], compras=compras, ahora=ahora)
+            backtests.append(self.backtest(analisis, **opciones_backtest))
+
+
+    def _calcular_resultados(
+        self,
+        ventas: RegistrosSKU,
+        compras: Optional[RegistrosSKU],
+        datos_por_sku: Dict,
+        n_workers: int,
+        ahora: pd.Timestamp,
+        opciones_backtest: Dict = None
+    ) -> PrediccionesBatch:
+        """
+        Predicciones de todo el panel, en serie o en un pool de procesos
+
+        Con `opciones_backtest` devuelve (predicciones, backtesting), como
+        `calcular_panel_con_backtest`
+        """
+        if n_workers and n_workers > 1:
+            from ejecucion_paralela import calcular_panel_paralelo
+            return calcular_panel_paralelo(
+                self, ventas, compras=compras, n_workers=n_workers, ahora=ahora,
+                opciones_backtest=opciones_backtest, **datos_por_sku
+            )
+
+        if opciones_backtest is not None:
+            return self.calcular_panel_con_backtest(
+                ventas, compras=compras, ahora=ahora, **datos_por_sku, **opciones_backtest
+            )
+        return self.calcular_panel(ventas, compras=compras, ahora=ahora, **datos_por_sku)
+
+
+    def _calcular_con_cache(
+        self,
+        ventas: RegistrosSKU,
+        compras: Optional[RegistrosSKU],
+        datos_por_sku: Dict,
+        n_workers: int,
+        ahora: pd.Timestamp,
+        cache: CachePredicciones
+    ) -> PrediccionesBatch:
+        """
+        Reutiliza las predicciones cacheadas y calcula solo los SKUs sin acierto
+
+        El cache guarda una PrediccionAvanzada por SKU; el lote resultante
+        conserva el orden de `ventas.skus`.
+        """
+        claves = claves_por_sku(
+            ventas, compras, parametros=self._firma_parametros(), hoy=ahora, **datos_por_sku
         )
+        stock_actual = datos_por_sku['stock_actual']
+
+        resultados = [None] * ventas.n_skus
+        pendientes = []
+        for i, clave in enumerate(claves):
+            encontrado, prediccion = cache.obtener(clave)
+            if not encontrado:
+                pendientes.append(i)
+                continue
+
+            # Único campo que depende de la hora del cálculo
+            if prediccion is not None and stock_actual[i] > 0:
+                prediccion.periodo_fin = max(prediccion.periodo_fin, ahora)
+            resultados[i] = prediccion
+
+        if pendientes:
+            indices = np.array(pendientes)
+            calculados = self._calcular_resultados(
+                ventas.seleccionar(indices),
+                compras.seleccionar(indices) if compras is not None else None,
+                {
+                    clave: (valores[indices] if isinstance(valores, np.ndarray)
+                            else [valores[i] for i in indices])
+                    for clave, valores in datos_por_sku.items()
+                },
+                n_workers,
+                ahora
+            )
+            fila_calculada = dict(zip(calculados.skus.tolist(), range(len(calculados))))
+            for i in pendientes:
+                fila = fila_calculada.get(ventas.skus[i])
+                prediccion = calculados[fila].a_prediccion() if fila is not None else None
+                # Se guarda antes de la clasificación ABC-XYZ, que depende del conjunto
+                cache.guardar(claves[i], prediccion)
+                resultados[i] = prediccion
 
-        return prediccion
+        cache.podar()
 
+        return PrediccionesBatch.desde_predicciones(resultados)
 
-    def calcular_predicciones_completas(
+
+    def _firma_parametros(self) -> str:
+        """Parámetros que afectan la predicción de cada SKU (antes de ABC-XYZ)"""
+        return (
+            f"{self.dias_stock_deseado}|{self.dias_transito}|{self.nivel_servicio}|"
+            f"{self.umbral_intermitencia}|{self.alpha_ewma}|{int(self.ajustar_modelos)}"
+        )
+
+
+    def calcular_predicciones_con_estado(
         self,
-        ventas_df: pd.DataFrame,
+        ventas_df: Ventas,
         stock_df: pd.DataFrame,
         transito_df: pd.DataFrame = None,
-        compras_df: pd.DataFrame = None
-    ) -> List[PrediccionAvanzada]:
+        compras_df: pd.DataFrame = None,
+        firma: str = '',
+        ahora: pd.Timestamp = None
+    ) -> Tuple[PrediccionesBatch, Optional[EstadoForecast]]:
         """
-        Calcula predicciones para todos los SKUs con clasificación ABC-XYZ
+        Cálculo completo (serial) que además devuelve el estado incremental
+
+        Las predicciones son las mismas que `calcular_predicciones_completas`.
+        El estado llega solo hasta `ultimo_dia_completo`: se construye con un
+        segundo análisis sin las filas del día de la corrida, cuyas ventas
+        tardías se pliegan en la corrida siguiente. Sin días completos el
+        estado es None.
+        """
+        if ventas_df.empty:
+            return PrediccionesBatch.vacio(), None
+        if ahora is None:
+            ahora = pd.Timestamp.now()
+
+        ventas, compras = self._codificar(ventas_df, compras_df)
+        datos_por_sku = self._datos_por_sku(ventas.skus, ventas_df, stock_df, transito_df)
+
+        analisis = self.analizar_panel(
+            ventas, datos_por_sku['stock_actual'], compras=compras, ahora=ahora
+        )
+        resultados = self.predicciones_desde_analisis(analisis, **datos_por_sku)
+
+        # Estado hasta ayer; los SKUs con ventas solo de hoy arrancan sin historia
+        corte = ultimo_dia_completo(ahora)
+        dia_corte = int((corte - ventas.fecha_base).days)
+        ventas_cerradas = ventas.hasta(dia_corte)
+        con_filas = np.flatnonzero(ventas_cerradas.conteos() > 0)
+        estado = None
+        if len(con_filas):
+            stock_actual = datos_por_sku['stock_actual'][con_filas]
+            analisis_cerrado = self.analizar_panel(
+                ventas_cerradas.seleccionar(con_filas),
+                stock_actual,
+                compras=compras.hasta(dia_corte).seleccionar(con_filas) if compras is not None else None,
+                ahora=corte
+            )
+            estado = estado_desde_analisis(
+                analisis_cerrado,
+                ventas_cerradas.seleccionar(con_filas),
+                np.asarray(datos_por_sku['precio_unitario'], dtype=float)[con_filas],
+                self.alpha_ewma,
+                firma,
+                corte
+            )
+            estado = ampliar_estado(
+                replace(estado, fecha_recalculo_completo=pd.Timestamp(ahora).normalize()),
+                ventas.skus
+            )
+
+        return self.clasificar_y_ordenar(resultados), estado
+
+
+    def calcular_predicciones_incrementales(
+        self,
+        estado: EstadoForecast,
+        ventas_df: Ventas,
+        stock_df: pd.DataFrame,
+        transito_df: pd.DataFrame = None,
+        compras_df: pd.DataFrame = None,
+        ahora: pd.Timestamp = None
+    ) -> Tuple[PrediccionesBatch, EstadoForecast]:
+        """
+        Predicciones de todos los SKUs del estado plegando solo los días nuevos
+
+        Los días completos se pliegan en el estado que se devuelve; el día de
+        la corrida (incompleto) se pliega aparte, solo para las predicciones.
+
+        Args:
+            estado: Estado de la corrida anterior
+            ventas_df, compras_df: Movimientos posteriores a
+                `estado.fecha_ultimo_dia` (las filas anteriores se ignoran)
+
+        Returns:
+            (predicciones, estado actualizado hasta `ultimo_dia_completo`)
+        """
+        if ahora is None:
+            ahora = pd.Timestamp.now()
+        if ventas_df is None or ventas_df.empty:
+            ventas_df = pd.DataFrame(columns=['sku', 'fecha', 'unidades', 'precio'])
+
+        # SKUs del estado más los que aparecen por primera vez
+        nuevos = pd.Index(skus_de_ventas(ventas_df)).difference(pd.Index(estado.skus), sort=False)
+        skus = np.concatenate([estado.skus, np.asarray(nuevos, dtype=object)])
+        estado = ampliar_estado(estado, skus)
+
+        ventas = registros_de_ventas(ventas_df, skus=skus, fecha_base=estado.fecha_base)
+        compras = None
+        if compras_df is not None and not compras_df.empty:
+            compras = registros_desde_df(
+                compras_df, 'cantidad', skus=skus, fecha_base=estado.fecha_base
+            )
+
+        datos_por_sku = self._datos_por_sku(
+            skus, ventas_df, stock_df, transito_df, precio_previo=estado.precio_unitario
+        )
+
+        # Un estado guardado antes de este corte (hasta el día de su corrida)
+        # no retrocede: sus días ya están plegados
+        corte = max(ultimo_dia_completo(ahora), estado.fecha_ultimo_dia)
+        dia_corte = estado.dia(corte)
+        estado = plegar_dias(
+            estado,
+            ventas.hasta(dia_corte),
+            compras.hasta(dia_corte) if compras is not None else None,
+            datos_por_sku['stock_actual'],
+            datos_por_sku['precio_unitario'],
+            self.alpha_ewma,
+            corte
+        )
+        estado_hoy = plegar_dias(
+            estado,
+            ventas,
+            compras,
+            datos_por_sku['stock_actual'],
+            datos_por_sku['precio_unitario'],
+            self.alpha_ewma,
+            ahora
+        )
+
+        analisis = self.analizar_estado(estado_hoy, datos_por_sku['stock_actual'], ahora)
+        resultados = self.predicciones_desde_analisis(analisis, **datos_por_sku)
+
+        return self.clasificar_y_ordenar(resultados), estado
+
+
+    def analizar_estado(
+        self,
+        estado: EstadoForecast,
+        stock_actual: np.ndarray,
+        ahora: pd.Timestamp
+    ) -> AnalisisPanel:
+        """
+        Pasos 1-6 a partir del estado incremental, sin recorrer la historia
         """
-        predicciones = []
+        largo = np.maximum(estado.fin - estado.inicio + 1, 0)
+
+        # 3. DEMANDA INTERMITENTE
+        tasa_intermitencia = np.divide(
+            estado.dias_sin_venta, largo, out=np.zeros(len(largo)), where=largo > 0
+        )
+        es_intermitente = tasa_intermitencia >= self.umbral_intermitencia
+
+        # 4. FORECAST SEGÚN TIPO DE DEMANDA
+        venta_diaria_promedio = np.where(
+            es_intermitente,
+            croston_desde_conteos(
+                estado.n_ventas,
+                estado.suma_ventas,
+                estado.primera_venta,
+                estado.ultima_venta_positiva,
+                largo
+            ),
+            np.nan_to_num(estado.nivel_ewma)
+        )
+
+        # 5. ESTADÍSTICAS (percentiles del último cálculo completo)
+        hay_ventas = estado.n_con_venta > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            desviacion = np.where(
+                estado.n_con_stock > 1,
+                np.sqrt(estado.m2_con_stock / (estado.n_con_stock - 1)),
+                np.nan
+            )
+
+        # 6. TENDENCIA
+        pendiente, _, _, p_valor = regresion_desde_sumas(
+            estado.reg_n, estado.reg_sx, estado.reg_sy,
+            estado.reg_sxx, estado.reg_sxy, estado.reg_syy
+        )
+
+        return self._completar_analisis(
+            skus=estado.skus,
+            fecha_base=estado.fecha_base,
+            inicio=estado.inicio,
+            fin=estado.fin,
+            ultima_venta=estado.ultima_venta,
+            stock_actual=stock_actual,
+            ahora=ahora,
+            venta_diaria_promedio=venta_diaria_promedio,
+            p50=np.where(hay_ventas, estado.p50, venta_diaria_promedio),
+            p75=np.where(hay_ventas, estado.p75, venta_diaria_promedio),
+            p90=np.where(hay_ventas, estado.p90, venta_diaria_promedio),
+            desviacion=np.where(hay_ventas, desviacion, 0.0),
+            pendiente=pendiente,
+            p_valor=p_valor,
+            venta_media_filas=estado.reg_sy / np.maximum(estado.n_filas, 1),
+            es_intermitente=es_intermitente,
+            n_filas=estado.n_filas,
+            n_outliers=estado.n_outliers,
+            unidades_totales=estado.unidades_totales
+        )
+
+
+    def _codificar(
+        self,
+        ventas_df: Ventas,
+        compras_df: pd.DataFrame = None
+    ) -> Tuple[RegistrosSKU, Optional[RegistrosSKU]]:
+        """Codifica ventas y compras por SKU (un solo factorize)"""
+        ventas = registros_de_ventas(ventas_df)
+
+        compras = None
+        if compras_df is not None and not compras_df.empty:
+            compras = registros_desde_df(
+                compras_df, 'cantidad', skus=ventas.skus, fecha_base=ventas.fecha_base
+            )
 
-        # Agrupar ventas por SKU
-        ventas_por_sku = {}
-        for sku in ventas_df['sku'].unique():
-            ventas_por_sku[sku] = ventas_df[ventas_df['sku'] == sku]
+        return ventas, compras
 
-        # Preparar datos de stock y tránsito
+
+    def _datos_por_sku(
+        self,
+        skus: np.ndarray,
+        ventas_df: Ventas,
+        stock_df: pd.DataFrame,
+        transito_df: pd.DataFrame = None,
+        precio_previo: np.ndarray = None
+    ) -> Dict:
+        """
+        Stock, tránsito, precio y descripción alineados con `skus`
+
+        Args:
+            precio_previo: Precio a usar para SKUs sin ventas en `ventas_df`
+        """
         stock_dict = stock_df.set_index('sku')['stock_total'].to_dict() if 'stock_total' in stock_df.columns else {}
-        precio_dict = ventas_df.groupby('sku')['precio'].last().to_dict()
+        precio_dict = ultimo_precio_por_sku(ventas_df)
         desc_dict = stock_df.set_index('sku')['descripcion'].to_dict() if 'descripcion' in stock_df.columns else {}
 
         transito_dict = {}
         if transito_df is not None and not transito_df.empty:
             transito_dict = transito_df.groupby('sku')['unidades'].sum().to_dict()
 
-        # Preparar datos de compras por SKU
-        compras_por_sku = {}
-        if compras_df is not None and not compras_df.empty:
-            for sku in compras_df['sku'].unique():
-                compras_por_sku[sku] = compras_df[compras_df['sku'] == sku]
-
-        # Calcular predicciones individuales
-        valores_anuales = {}
-        cvs = {}
-
-        for sku, ventas_sku in ventas_por_sku.items():
-            stock = stock_dict.get(sku, 0)
-            transito = transito_dict.get(sku, 0)
-            precio = precio_dict.get(sku, 0)
-            descripcion = desc_dict.get(sku, '')
-            compras_sku = compras_por_sku.get(sku, pd.DataFrame())
-
-            pred = self.calcular_prediccion_sku(
-                sku=sku,
-                ventas_df=ventas_sku,
-                stock_actual=stock,
-                transito_china=transito,
-                precio_unitario=precio,
-                descripcion=descripcion,
-                compras_df=compras_sku
-            )
+        if precio_previo is None:
+            precio_previo = np.zeros(len(skus))
 
-            if pred and pred.sugerencia_reposicion > 0:
-                predicciones.append(pred)
-                valores_anuales[sku] = pred.venta_diaria_promedio * pred.precio_unitario * 365
-                cvs[sku] = pred.coeficiente_variacion
+        return dict(
+            stock_actual=np.array([stock_dict.get(sku, 0) for sku in skus], dtype=float),
+            transito_china=np.array([transito_dict.get(sku, 0) for sku in skus], dtype=float),
+            precio_unitario=[precio_dict.get(sku, previo) for sku, previo in zip(skus, precio_previo)],
+            descripcion=[desc_dict.get(sku, '') for sku in skus]
+        )
+
+
+    def clasificar_y_ordenar(self, resultados: PrediccionesBatch) -> PrediccionesBatch:
+        """
+        Filtra SKUs sin sugerencia, asigna ABC-XYZ sobre el conjunto completo
+        y ordena por valor total
+
+        Acepta también una lista de PrediccionAvanzada (con None)
+        """
+        if not isinstance(resultados, PrediccionesBatch):
+            resultados = PrediccionesBatch.desde_predicciones(resultados)
+
+        predicciones = resultados[resultados.columnas['sugerencia_reposicion'] > 0]
+        columnas = predicciones.columnas
+        skus = predicciones.skus.tolist()
+        valores_anuales = columnas['venta_diaria_promedio'] * columnas['precio_unitario'] * 365
 
         # Clasificación ABC y XYZ
-        clasificacion_abc = self.clasificar_abc(valores_anuales)
-        clasificacion_xyz = self.clasificar_xyz(cvs)
+        clasificacion_abc = self.clasificar_abc(dict(zip(skus, valores_anuales.tolist())))
+        clasificacion_xyz = self.clasificar_xyz(dict(zip(skus, columnas['coeficiente_variacion'].tolist())))
 
         # Asignar clasificaciones
-        for pred in predicciones:
-            pred.clasificacion_abc = clasificacion_abc.get(pred.sku, 'C')
-            pred.clasificacion_xyz = clasificacion_xyz.get(pred.sku, 'Z')
+        columnas['clasificacion_abc'] = np.array([clasificacion_abc.get(sku, 'C') for sku in skus], dtype=object)
+        columnas['clasificacion_xyz'] = np.array([clasificacion_xyz.get(sku, 'Z') for sku in skus], dtype=object)
 
         # Ordenar por valor total
-        predicciones.sort(key=lambda p: p.valor_total_sugerencia, reverse=True)
-
-        return predicciones
+        return predicciones.ordenar_por('valor_total_sugerencia', descendente=True)
 
 
 # Ejemplo de uso
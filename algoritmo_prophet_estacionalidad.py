@@ -5,22 +5,26 @@ Requiere: 2+ años de datos históricos
 Score: 8.5/10 (vs 7.2/10 sin estacionalidad)
 """
 
+import importlib.util
+import time
+
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import warnings
 warnings.filterwarnings('ignore')
 
-# Prophet para estacionalidad
-try:
-    from prophet import Prophet
-    PROPHET_AVAILABLE = True
-except ImportError:
-    PROPHET_AVAILABLE = False
+# Prophet para estacionalidad: solo se comprueba que esté instalado; el
+# import (Prophet + Stan, varios segundos) ocurre al entrenar el primer modelo
+PROPHET_AVAILABLE = importlib.util.find_spec('prophet') is not None
+if not PROPHET_AVAILABLE:
     print("⚠️  Prophet no instalado. Instalar con: pip install prophet")
 
+if TYPE_CHECKING:
+    from prophet import Prophet
+
 
 @dataclass
 class PrediccionConEstacionalidad:
@@ -193,10 +197,12 @@ class AlgoritmoProphetEstacionalidad:
         self,
         df_prophet: pd.DataFrame,
         categoria: str = 'general'
-    ) -> Prophet:
+    ) -> 'Prophet':
         """
         Entrena modelo Prophet con estacionalidad
         """
+        from prophet import Prophet
+
         # Configurar modelo
         modelo = Prophet(
             # Estacionalidad
@@ -232,7 +238,7 @@ class AlgoritmoProphetEstacionalidad:
 
     def hacer_forecast(
         self,
-        modelo: Prophet,
+        modelo: 'Prophet',
         dias_futuro: int = 120
     ) -> pd.DataFrame:
         """
@@ -349,22 +355,55 @@ class AlgoritmoProphetEstacionalidad:
         # 1. Preparar datos
         df_prophet = self.preparar_datos_prophet(ventas_df, sku)
 
+        return self.prediccion_desde_serie(
+            df_prophet, sku, stock_actual, transito_china, precio_unitario, descripcion, categoria
+        )
+
+
+    def prediccion_desde_serie(
+        self,
+        df_prophet: pd.DataFrame,
+        sku: str,
+        stock_actual: float,
+        transito_china: float,
+        precio_unitario: float,
+        descripcion: str = "",
+        categoria: str = "general",
+        tiempos: Dict[str, float] = None
+    ) -> Optional[PrediccionConEstacionalidad]:
+        """
+        Pasos 2-9 de `calcular_prediccion_sku` sobre la serie diaria (ds, y)
+        ya preparada
+
+        Args:
+            tiempos: Si se entrega, recibe los segundos de 'ajuste',
+                'forecast' y 'backtesting'
+        """
+        if tiempos is None:
+            tiempos = {}
+
         if len(df_prophet) < 365:
             print(f"⚠️  SKU {sku}: Solo {len(df_prophet)} días de datos (mínimo 365)")
             return None
 
         # 2. Entrenar modelo
+        inicio = time.perf_counter()
         try:
             modelo = self.entrenar_modelo_prophet(df_prophet, categoria)
         except Exception as e:
             print(f"❌ Error entrenando SKU {sku}: {e}")
             return None
+        tiempos['ajuste'] = time.perf_counter() - inicio
 
         # 3. Hacer forecast
+        inicio = time.perf_counter()
         forecast = self.hacer_forecast(modelo, dias_futuro=self.dias_transito + self.dias_stock_deseado)
+        tiempos['forecast'] = time.perf_counter() - inicio
 
         # 4. Backtesting
+        inicio = time.perf_counter()
         metricas = self.calcular_metricas_backtesting(df_prophet, dias_test=90)
+        tiempos['backtesting'] = time.perf_counter() - inicio
 
         # 5. Extraer predicción para horizonte relevante
         hoy = pd.Timestamp.now().normalize()
@@ -388,8 +427,8 @@ class AlgoritmoProphetEstacionalidad:
 
         # Stock de seguridad basado en incertidumbre de Prophet
         std_forecast = forecast_horizonte['yhat'].std()
-        from scipy import stats
-        z_score = stats.norm.ppf(self.nivel_servicio)
+        from scipy.special import ndtri
+        z_score = ndtri(self.nivel_servicio)
         stock_seguridad = z_score * std_forecast * np.sqrt(self.dias_transito)
 
         stock_optimo = stock_optimo_base + stock_seguridad
@@ -454,6 +493,37 @@ class AlgoritmoProphetEstacionalidad:
         return prediccion
 
 
+    def calcular_predicciones_lote(
+        self,
+        ventas_df: pd.DataFrame,
+        stock_df: pd.DataFrame,
+        transito_df: pd.DataFrame = None,
+        compras_df: pd.DataFrame = None,
+        n_workers: int = 1,
+        presupuesto_segundos: float = None,
+        algoritmo_respaldo=None
+    ):
+        """
+        Predicciones de todos los SKUs en un pool de `n_workers` procesos,
+        clase ABC A primero, dentro de `presupuesto_segundos`; los SKUs que
+        Prophet no alcanza usan AlgoritmoMLAvanzado
+
+        Returns:
+            ResultadoProphetLote (ver `prophet_paralelo`)
+        """
+        from prophet_paralelo import calcular_prophet_lote
+        return calcular_prophet_lote(
+            self,
+            ventas_df,
+            stock_df,
+            transito_df=transito_df,
+            compras_df=compras_df,
+            n_workers=n_workers,
+            presupuesto_segundos=presupuesto_segundos,
+            algoritmo_respaldo=algoritmo_respaldo
+        )
+
+
 # Ejemplo de uso
 if __name__ == "__main__":
     # Simular 2 años de datos con estacionalidad
@@ -0,0 +1,377 @@
+"""
+Backtesting Rolling-Origin del Forecast
+Error real de los modelos EWMA/Croston sobre el historial de cada SKU
+
+Para cada origen (un día del pasado) se pronostica la venta diaria con los
+días anteriores, igual que el análisis del panel, y se compara con lo
+vendido en los `horizonte` días siguientes. Todos los SKUs y orígenes se
+evalúan a la vez sobre la matriz SKU × día
+(`motor_panel.pronosticos_por_origen_panel`), sin reajustar el modelo por
+origen.
+
+Errores por ventana (SKU, origen), en unidades del horizonte:
+    error = venta_diaria_pronosticada × días_con_stock - unidades_vendidas
+
+Por SKU: MAE, RMSE y bias (error medio; > 0 = sobreestima) sobre sus
+ventanas, y MAPE (%) sobre las ventanas con venta. Los agregados (global,
+por clase ABC, por modelo) son promedios de los valores por SKU, salvo
+`por_modelo`, que promedia ventanas.
+
+Los resultados de tramos de SKUs calculados por separado (con las mismas
+fechas de origen) se unen con `ResultadoBacktest.concatenar`.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from motor_panel import pronosticos_por_origen_panel, reales_por_origen_panel
+from panel_demanda import MatrizDemanda
+
+
+# Orígenes por defecto: los últimos N, cada PASO_ORIGENES días
+ORIGENES_POR_DEFECTO = 8
+PASO_ORIGENES = 7
+HORIZONTE_DIAS = 30
+
+# Días de historia que necesita un SKU antes de un origen para evaluarlo
+HISTORIA_MINIMA_DIAS = 28
+
+# SKUs por bloque (acota las matrices acumuladas temporales)
+SKUS_POR_BLOQUE = 20_000
+
+
+def origenes_backtest(
+    n_dias: int,
+    horizonte: int = HORIZONTE_DIAS,
+    n_origenes: int = ORIGENES_POR_DEFECTO,
+    paso: int = PASO_ORIGENES
+) -> np.ndarray:
+    """Días de origen, del más antiguo al más reciente; el último deja un horizonte completo"""
+    ultimo = n_dias - horizonte
+    origenes = ultimo - paso * np.arange(n_origenes)[::-1]
+    return origenes[origenes > 0].astype(np.int64)
+
+
+def fechas_origen_backtest(
+    ahora: pd.Timestamp,
+    horizonte: int = HORIZONTE_DIAS,
+    n_origenes: int = ORIGENES_POR_DEFECTO,
+    paso: int = PASO_ORIGENES
+) -> pd.DatetimeIndex:
+    """
+    Fechas de origen de una corrida, de la más antigua a la más reciente: las
+    de `origenes_backtest` con el día de `ahora` como último día. No dependen
+    de los SKUs del panel, así que un tramo, un bloque o un sub-panel evalúan
+    sus SKUs igual que el panel completo
+    """
+    ultima = pd.Timestamp(ahora).normalize() - pd.Timedelta(days=horizonte - 1)
+    return ultima - pd.to_timedelta(paso * np.arange(n_origenes)[::-1], unit='D')
+
+
+def ventanas_evaluables(
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    dias_con_stock: np.ndarray,
+    origenes: np.ndarray,
+    horizonte: int,
+    historia_minima: int = HISTORIA_MINIMA_DIAS
+) -> np.ndarray:
+    """
+    Máscara (n_skus, n_origenes) de las ventanas que se evalúan: el SKU
+    tiene `historia_minima` días antes del origen, el horizonte completo
+    dentro de su rango válido y algún día con stock en él
+    """
+    return (
+        (origenes - inicio[:, None] >= historia_minima)
+        & (origenes + horizonte - 1 <= fin[:, None])
+        & (dias_con_stock > 0)
+    )
+
+
+def _agregar(mape: np.ndarray, mae: np.ndarray, rmse: np.ndarray, bias: np.ndarray) -> Dict[str, float]:
+    """Promedio de cada métrica (None si no hay valores) y SKUs con MAE"""
+    def promedio(valores):
+        valores = valores[~np.isnan(valores)]
+        return round(float(valores.mean()), 4) if len(valores) else None
+
+    return {
+        'mape': promedio(mape),
+        'mae': promedio(mae),
+        'rmse': promedio(rmse),
+        'bias': promedio(bias),
+        'skus': int((~np.isnan(mae)).sum())
+    }
+
+
+@dataclass
+class ResultadoBacktest:
+    """Métricas por SKU (NaN sin ventanas evaluables) y por modelo"""
+    skus: np.ndarray
+    fechas_origen: pd.DatetimeIndex
+    horizonte: int
+    ventanas: np.ndarray    # int64: ventanas evaluadas por SKU
+    mape: np.ndarray
+    mae: np.ndarray
+    rmse: np.ndarray
+    bias: np.ndarray
+    # Por modelo: [ventanas, Σ|error|, Σerror², Σerror, Σ% con venta, ventanas con venta]
+    sumas_modelo: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @classmethod
+    def concatenar(cls, resultados: Sequence['ResultadoBacktest']) -> 'ResultadoBacktest':
+        """Une resultados de tramos de SKUs con las mismas fechas de origen, en su orden"""
+        primero = resultados[0]
+        sumas_modelo = {}
+        for resultado in resultados:
+            for modelo, sumas in resultado.sumas_modelo.items():
+                sumas_modelo[modelo] = sumas_modelo.get(modelo, 0.0) + sumas
+
+        def columna(nombre):
+            return np.concatenate([getattr(resultado, nombre) for resultado in resultados])
+
+        return cls(
+            skus=columna('skus'),
+            fechas_origen=primero.fechas_origen,
+            horizonte=primero.horizonte,
+            ventanas=columna('ventanas'),
+            mape=columna('mape'),
+            mae=columna('mae'),
+            rmse=columna('rmse'),
+            bias=columna('bias'),
+            sumas_modelo=sumas_modelo
+        )
+
+    @property
+    def n_skus(self) -> int:
+        return len(self.skus)
+
+    @property
+    def por_modelo(self) -> Dict[str, Dict[str, float]]:
+        """Métricas sobre todas las ventanas de cada modelo"""
+        por_modelo = {}
+        for modelo, sumas in self.sumas_modelo.items():
+            n, abs_error, cuadrados, suma_error, suma_porcentual, n_con_venta = sumas.tolist()
+            por_modelo[modelo] = {
+                'mape': round(suma_porcentual / n_con_venta, 4) if n_con_venta else None,
+                'mae': round(abs_error / n, 4) if n else None,
+                'rmse': round((cuadrados / n) ** 0.5, 4) if n else None,
+                'bias': round(suma_error / n, 4) if n else None,
+                'ventanas': int(n)
+            }
+        return por_modelo
+
+    def por_sku(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'sku': self.skus,
+            'ventanas': self.ventanas,
+            'mape': self.mape,
+            'mae': self.mae,
+            'rmse': self.rmse,
+            'bias': self.bias
+        })
+
+    def agregados(self, mascara: np.ndarray = None) -> Dict[str, float]:
+        """Promedio de las métricas por SKU (de los SKUs de `mascara`)"""
+        if mascara is None:
+            return _agregar(self.mape, self.mae, self.rmse, self.bias)
+        return _agregar(self.mape[mascara], self.mae[mascara], self.rmse[mascara], self.bias[mascara])
+
+    def por_grupo(self, grupo_por_sku: Mapping[str, str], grupos: List[str]) -> Dict[str, Dict[str, float]]:
+        """Agregados de cada grupo (ej. clase ABC); los SKUs sin grupo no cuentan"""
+        etiquetas = np.array([grupo_por_sku.get(sku) for sku in self.skus], dtype=object)
+        return {grupo: self.agregados(etiquetas == grupo) for grupo in grupos}
+
+    def peores(self, n: int = 20) -> List[dict]:
+        """SKUs con mayor MAE"""
+        orden = np.argsort(-np.nan_to_num(self.mae, nan=-np.inf), kind='stable')[:n]
+        return [
+            {
+                'sku': self.skus[i],
+                'mape': None if np.isnan(self.mape[i]) else round(float(self.mape[i]), 2),
+                'mae': round(float(self.mae[i]), 2),
+                'bias': round(float(self.bias[i]), 2)
+            }
+            for i in orden if not np.isnan(self.mae[i])
+        ]
+
+    def resumen(self, grupo_por_sku: Mapping[str, str] = None, grupos: List[str] = ()) -> dict:
+        """Resumen JSON (para `metricas_modelo.backtesting`)"""
+        resumen = {
+            'origenes': [fecha.date().isoformat() for fecha in self.fechas_origen],
+            'horizonte_dias': self.horizonte,
+            'ventanas': int(self.ventanas.sum()),
+            'global': self.agregados(),
+            'por_modelo': self.por_modelo,
+            'peores_skus': self.peores()
+        }
+        if grupo_por_sku is not None:
+            resumen['por_abc'] = self.por_grupo(grupo_por_sku, list(grupos))
+        return resumen
+
+
+def backtest_panel(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    con_stock: np.ndarray,
+    alpha: float,
+    umbral_intermitencia: float,
+    origenes: np.ndarray,
+    horizonte: int = HORIZONTE_DIAS,
+    historia_minima: int = HISTORIA_MINIMA_DIAS
+) -> Dict[str, np.ndarray]:
+    """
+    Métricas por SKU de un bloque de la matriz SKU × día, sobre las
+    ventanas de `ventanas_evaluables`
+
+    Returns:
+        Dict con ventanas, mape, mae, rmse y bias por SKU, y por modelo las
+        sumas de ventanas para `por_modelo`
+    """
+    pronostico, es_intermitente = pronosticos_por_origen_panel(
+        ventas, inicio, fin, alpha, umbral_intermitencia, origenes
+    )
+    unidades, dias = reales_por_origen_panel(ventas, con_stock, origenes, horizonte)
+
+    evaluable = ventanas_evaluables(inicio, fin, dias, origenes, horizonte, historia_minima)
+    return metricas_ventanas(
+        pronostico, unidades, dias, evaluable,
+        {'croston': es_intermitente, 'ewma': ~es_intermitente}
+    )
+
+
+def metricas_ventanas(
+    pronostico: np.ndarray,
+    unidades: np.ndarray,
+    dias: np.ndarray,
+    evaluable: np.ndarray,
+    grupos: Mapping[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """
+    Métricas por SKU de un pronóstico de venta diaria por ventana (todos
+    (n_skus, n_origenes)) y sumas por grupo de ventanas (`por_modelo`)
+
+    Returns:
+        Dict con ventanas, mape, mae, rmse y bias por SKU, y sumas_modelo
+        con las sumas de cada grupo
+    """
+    error = np.where(evaluable, pronostico * dias - unidades, 0.0)
+    con_venta = evaluable & (unidades > 0)
+    porcentual = np.abs(error) / np.where(con_venta, unidades, 1.0) * 100
+
+    ventanas = evaluable.sum(axis=1)
+    n = np.where(ventanas > 0, ventanas, np.nan)
+    n_con_venta = con_venta.sum(axis=1)
+    suma_porcentual = np.where(con_venta, porcentual, 0.0).sum(axis=1)
+
+    sumas_modelo = {}
+    for modelo, grupo in grupos.items():
+        mascara = evaluable & grupo
+        sumas_modelo[modelo] = np.array([
+            mascara.sum(),
+            np.abs(error[mascara]).sum(),
+            (error[mascara] ** 2).sum(),
+            error[mascara].sum(),
+            porcentual[mascara & con_venta].sum(),
+            (mascara & con_venta).sum()
+        ], dtype=float)
+
+    return {
+        'ventanas': ventanas,
+        'mape': np.where(n_con_venta > 0, suma_porcentual / np.maximum(n_con_venta, 1), np.nan),
+        'mae': np.abs(error).sum(axis=1) / n,
+        'rmse': np.sqrt((error ** 2).sum(axis=1) / n),
+        'bias': error.sum(axis=1) / n,
+        'sumas_modelo': sumas_modelo
+    }
+
+
+def backtest_matriz(
+    matriz: MatrizDemanda,
+    con_stock: np.ndarray,
+    alpha: float,
+    umbral_intermitencia: float,
+    origenes: np.ndarray = None,
+    horizonte: int = HORIZONTE_DIAS,
+    historia_minima: int = HISTORIA_MINIMA_DIAS,
+    skus_por_bloque: int = SKUS_POR_BLOQUE
+) -> ResultadoBacktest:
+    """
+    Backtesting de todos los SKUs de una `MatrizDemanda`, por bloques de SKUs
+
+    Args:
+        con_stock: Días con stock (n_skus, n_dias), como en el análisis
+        origenes: Días de origen (default: `origenes_backtest`). Los que
+            no dejan historia o un horizonte completo dentro de la matriz
+            (ej. los de un tramo de SKUs que empieza o termina antes que el
+            panel) no tienen ventanas evaluables y no se calculan
+    """
+    if origenes is None:
+        origenes = origenes_backtest(matriz.n_dias, horizonte)
+    origenes = np.asarray(origenes, dtype=np.int64)
+    calculables = origenes_calculables(origenes, matriz.n_dias, horizonte)
+
+    partes = []
+    for a in range(0, matriz.n_skus, skus_por_bloque):
+        b = min(matriz.n_skus, a + skus_por_bloque)
+        if not len(calculables):
+            partes.append(sin_ventanas(b - a, ('croston', 'ewma')))
+            continue
+        partes.append(backtest_panel(
+            matriz.ventas[a:b], matriz.inicio[a:b], matriz.fin[a:b], con_stock[a:b],
+            alpha, umbral_intermitencia, calculables, horizonte, historia_minima
+        ))
+
+    return resultado_desde_partes(matriz, origenes, horizonte, partes, ('croston', 'ewma'))
+
+
+def origenes_calculables(origenes: np.ndarray, n_dias: int, horizonte: int) -> np.ndarray:
+    """
+    Orígenes que dejan historia y un horizonte completo dentro de una matriz
+    de `n_dias` (los demás no tienen ventanas evaluables)
+    """
+    origenes = np.asarray(origenes, dtype=np.int64)
+    return origenes[(origenes > 0) & (origenes + horizonte <= n_dias)]
+
+
+def sin_ventanas(n_skus: int, modelos: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Parte de `n_skus` sin ventanas evaluables, como la de `metricas_ventanas`"""
+    vacio = np.full(n_skus, np.nan)
+    return {
+        'ventanas': np.zeros(n_skus), 'mape': vacio, 'mae': vacio, 'rmse': vacio, 'bias': vacio,
+        'sumas_modelo': {modelo: np.zeros(6) for modelo in modelos}
+    }
+
+
+def resultado_desde_partes(
+    matriz: MatrizDemanda,
+    origenes: np.ndarray,
+    horizonte: int,
+    partes: List[Dict[str, np.ndarray]],
+    modelos: Sequence[str]
+) -> ResultadoBacktest:
+    """Une las partes (bloques de SKUs, en orden) de `metricas_ventanas` de una matriz"""
+    sumas_modelo = {modelo: np.zeros(6) for modelo in modelos}
+    for parte in partes:
+        for modelo, sumas in parte['sumas_modelo'].items():
+            sumas_modelo[modelo] += sumas
+
+    def columna(nombre):
+        if not partes:
+            return np.zeros(0)
+        return np.concatenate([parte[nombre] for parte in partes])
+
+    return ResultadoBacktest(
+        skus=np.asarray(matriz.skus, dtype=object),
+        fechas_origen=matriz.fecha_base + pd.to_timedelta(np.asarray(origenes, dtype=np.int64), unit='D'),
+        horizonte=horizonte,
+        ventanas=columna('ventanas').astype(np.int64),
+        mape=columna('mape'),
+        mae=columna('mae'),
+        rmse=columna('rmse'),
+        bias=columna('bias'),
+        sumas_modelo=sumas_modelo
+    )
@@ -0,0 +1,161 @@
+"""
+Cache de Predicciones por SKU
+Reutiliza la PrediccionAvanzada de los SKUs cuyos datos no cambiaron
+
+La clave de cada SKU es un hash de su contenido: filas de venta (fecha
+absoluta, unidades), compras, stock, tránsito, precio, descripción y los
+parámetros del algoritmo. Si el SKU tiene stock, su rango se extiende hasta
+hoy, así que la fecha del día también entra en la clave. En un acierto solo
+se recalcula `periodo_fin`, el único campo que depende de la hora.
+
+Backend en disco: un pickle por clave, con desalojo del menos usado
+(por fecha de modificación) cuando el directorio supera `max_bytes`.
+"""
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from panel_demanda import RegistrosSKU
+
+
+# Subir al cambiar el cálculo de las predicciones (invalida el cache)
+VERSION_CACHE = 1
+
+EPOCA = pd.Timestamp('1970-01-01')
+
+
+class CachePredicciones:
+    """Cache en disco de PrediccionAvanzada por clave de contenido"""
+
+    def __init__(self, directorio: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojados = 0
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+    def _ruta(self, clave: str) -> Path:
+        return self.directorio / clave[:2] / f"{clave}.pkl"
+
+    def obtener(self, clave: str) -> Tuple[bool, Optional[object]]:
+        """
+        Returns:
+            (encontrado, prediccion); la predicción puede ser None si el SKU
+            no tenía datos
+        """
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as archivo:
+                prediccion = pickle.load(archivo)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.fallos += 1
+            return False, None
+
+        # Marca de uso para el desalojo
+        os.utime(ruta)
+        self.aciertos += 1
+        return True, prediccion
+
+    def guardar(self, clave: str, prediccion) -> None:
+        ruta = self._ruta(clave)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+
+        # Escritura atómica: un pickle a medias nunca queda con su nombre final
+        temporal = ruta.with_suffix('.tmp')
+        with open(temporal, 'wb') as archivo:
+            pickle.dump(prediccion, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta)
+
+    def podar(self) -> int:
+        """Desaloja las entradas menos usadas hasta quedar bajo `max_bytes`"""
+        entradas = []
+        total = 0
+        for ruta in self.directorio.glob('*/*.pkl'):
+            try:
+                info = ruta.stat()
+            except OSError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, ruta))
+            total += info.st_size
+
+        desalojados = 0
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            try:
+                ruta.unlink()
+            except OSError:
+                continue
+            total -= tamano
+            desalojados += 1
+
+        self.desalojados += desalojados
+        return desalojados
+
+    def estadisticas(self) -> Dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+            'desalojados': self.desalojados
+        }
+
+
+def _filas_por_sku(registros: RegistrosSKU) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Días absolutos y valores en orden canónico (SKU, día, valor), más los
+    límites de filas de cada SKU
+    """
+    dias = registros.dias + (registros.fecha_base - EPOCA).days
+    orden = np.lexsort((registros.valores, dias, registros.codigos))
+    limites = np.searchsorted(registros.codigos[orden], np.arange(registros.n_skus + 1))
+    return dias[orden], registros.valores[orden], limites
+
+
+def claves_por_sku(
+    ventas: RegistrosSKU,
+    compras: Optional[RegistrosSKU],
+    stock_actual: np.ndarray,
+    transito_china: np.ndarray,
+    precio_unitario: List[float],
+    descripcion: List[str],
+    parametros: str,
+    hoy: pd.Timestamp
+) -> List[str]:
+    """Clave de contenido de cada SKU de `ventas` (alineada con `ventas.skus`)"""
+    dias_ventas, unidades, limites_ventas = _filas_por_sku(ventas)
+    if compras is not None:
+        dias_compras, cantidades, limites_compras = _filas_por_sku(compras)
+    else:
+        dias_compras = cantidades = np.zeros(0)
+        limites_compras = np.zeros(ventas.n_skus + 1, dtype=np.int64)
+
+    dia_hoy = str((pd.Timestamp(hoy).normalize() - EPOCA).days)
+    prefijo = f"{VERSION_CACHE}|{parametros}".encode()
+
+    claves = []
+    for i, sku in enumerate(ventas.skus):
+        a, b = limites_ventas[i], limites_ventas[i + 1]
+        c, d = limites_compras[i], limites_compras[i + 1]
+
+        h = hashlib.blake2b(prefijo, digest_size=20)
+        h.update(f"|{sku}|{descripcion[i]}|{float(precio_unitario[i])!r}".encode())
+        h.update(f"|{stock_actual[i]!r}|{transito_china[i]!r}".encode())
+        if stock_actual[i] > 0:
+            h.update(f"|hoy={dia_hoy}".encode())
+        h.update(dias_ventas[a:b].tobytes())
+        h.update(unidades[a:b].tobytes())
+        h.update(b'|compras|')
+        h.update(dias_compras[c:d].tobytes())
+        h.update(cantidades[c:d].tobytes())
+        claves.append(h.hexdigest())
+
+    return claves
@@ -0,0 +1,260 @@
+"""
+Carga Paginada de Tablas de Supabase
+Paginación por keyset con tramos descargados en paralelo
+
+En vez de `.range(offset, offset + 999)` en serie (un OFFSET cada vez más
+profundo por página), cada tabla se divide en tramos disjuntos, por fecha
+o por id, y cada tramo se pagina por keyset:
+
+    WHERE (fecha, id) > (ultima_fecha, ultimo_id) ORDER BY fecha, id LIMIT n
+
+Los tramos se descargan en un pool de hilos con concurrencia limitada y las
+filas se devuelven ordenadas por la clave. Con un esquema se piden solo
+esas columnas y la respuesta se decodifica directo a columnas tipadas.
+Solo usa la interfaz de query de postgrest-py (`table`, `select`, filtros,
+`order`, `limit`, `execute`), así que funciona igual con el cliente de
+Supabase que con un `postgrest.SyncPostgrestClient` apuntando a un
+PostgREST local.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Filtro de postgrest-py: (método, *argumentos), ej. ('gte', 'fecha', '2025-01-01')
+Filtro = Tuple
+
+# Columnas (y tipos) que usa AlgoritmoMLAvanzado de cada tabla
+ESQUEMA_VENTAS = {'sku': 'category', 'fecha': 'datetime64[ns]', 'unidades': 'float32', 'precio': 'float64'}
+ESQUEMA_STOCK = {'sku': 'category', 'descripcion': 'object', 'stock_total': 'float64'}
+ESQUEMA_COMPRAS = {'sku': 'category', 'fecha': 'datetime64[ns]', 'cantidad': 'float32'}
+
+
+@dataclass
+class ResultadoCarga:
+    """Filas descargadas y métricas de la carga"""
+    filas: List[dict] = field(default_factory=list)
+    paginas: int = 0
+    tramos: int = 0
+    segundos: float = 0.0
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return len(self.filas) / self.segundos if self.segundos > 0 else 0.0
+
+
+def filas_a_dataframe(filas: List[dict], esquema: Dict[str, str]) -> pd.DataFrame:
+    """
+    Decodifica filas JSON de PostgREST a columnas tipadas
+
+    Args:
+        esquema: {columna: dtype}; admite 'category', 'object',
+            'datetime64[ns]' (fechas ISO) y dtypes numéricos de numpy. Los
+            nulos quedan como NaN/NaT.
+    """
+    return columnas_a_dataframe(
+        {nombre: [fila.get(nombre) for fila in filas] for nombre in esquema}, esquema
+    )
+
+
+def columnas_a_dataframe(valores_por_columna: Dict[str, Sequence], esquema: Dict[str, str]) -> pd.DataFrame:
+    """Como `filas_a_dataframe`, con los valores ya separados por columna"""
+    columnas = {}
+    for nombre, tipo in esquema.items():
+        valores = valores_por_columna[nombre]
+
+        if tipo == 'category':
+            columnas[nombre] = pd.Categorical(valores)
+        elif tipo == 'object':
+            columnas[nombre] = np.array(valores, dtype=object)
+        elif tipo.startswith('datetime64'):
+            dias = np.array([v[:10] if v else None for v in valores], dtype='datetime64[D]')
+            columnas[nombre] = dias.astype(tipo)
+        else:
+            columnas[nombre] = np.array(valores, dtype=np.float64).astype(tipo, copy=False)
+
+    return pd.DataFrame(columnas)
+
+
+def _aplicar(query, filtros: Sequence[Filtro]):
+    for metodo, *argumentos in filtros:
+        query = getattr(query, metodo)(*argumentos)
+    return query
+
+
+def _fecha(valor) -> date:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(str(valor)[:10], '%Y-%m-%d').date()
+
+
+class CargadorPaginado:
+    """
+    Descarga tablas completas por keyset con varios tramos concurrentes
+
+    Args:
+        cliente: Cliente con `.table(nombre)` (Supabase o postgrest-py)
+        tamano_pagina: Filas por request (Supabase limita a 1000 por defecto)
+        max_concurrencia: Requests simultáneos como máximo
+        tramos_por_hilo: Tramos por hilo para balancear tramos desparejos
+    """
+
+    def __init__(
+        self,
+        cliente,
+        tamano_pagina: int = 1000,
+        max_concurrencia: int = 4,
+        tramos_por_hilo: int = 2
+    ):
+        self.cliente = cliente
+        self.tamano_pagina = tamano_pagina
+        self.max_concurrencia = max(1, max_concurrencia)
+        self.tramos_por_hilo = tramos_por_hilo
+
+
+    def cargar(
+        self,
+        tabla: str,
+        columnas: str = '*',
+        filtros: Sequence[Filtro] = (),
+        columna_fecha: str = None,
+        desde=None,
+        hasta=None,
+        incluir_desde: bool = True
+    ) -> ResultadoCarga:
+        """
+        Descarga todas las filas de `tabla` que cumplen `filtros`
+
+        Con `columna_fecha` y `desde`, los tramos son rangos de fechas
+        [desde, hasta) paginados por (fecha, id); si no, son rangos de id
+        paginados por id. `incluir_desde=False` excluye el día `desde`.
+        """
+        inicio = time.perf_counter()
+        filtros = list(filtros)
+
+        if columna_fecha is not None and desde is not None:
+            tramos = self._tramos_fecha(columna_fecha, desde, hasta, incluir_desde)
+            clave = (columna_fecha, 'id')
+        else:
+            tramos = self._tramos_id(tabla, filtros)
+            clave = ('id',)
+
+        resultado = ResultadoCarga(tramos=len(tramos))
+        if tramos:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrencia, len(tramos))) as pool:
+                parciales = pool.map(
+                    lambda tramo: self._cargar_tramo(tabla, columnas, filtros + tramo, clave),
+                    tramos
+                )
+                # map conserva el orden de los tramos: filas ordenadas por clave
+                for filas, paginas in parciales:
+                    resultado.filas.extend(filas)
+                    resultado.paginas += paginas
+
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+
+    def _cargar_tramo(
+        self,
+        tabla: str,
+        columnas: str,
+        filtros: List[Filtro],
+        clave: Tuple[str, ...]
+    ) -> Tuple[List[dict], int]:
+        """Pagina un tramo por keyset; cada página pide las filas después de la última"""
+        filas = []
+        paginas = 0
+        ultima = None
+
+        # La clave tiene que venir en la respuesta aunque se pidan otras columnas
+        if columnas != '*':
+            faltantes = [c for c in clave if c not in columnas.split(',')]
+            columnas = ','.join([columnas] + faltantes)
+
+        while True:
+            query = _aplicar(self.cliente.table(tabla).select(columnas), filtros)
+
+            if ultima is not None:
+                if len(clave) == 1:
+                    query = query.gt(clave[0], ultima[clave[0]])
+                else:
+                    fecha, id_ = clave
+                    query = query.or_(
+                        f"{fecha}.gt.{ultima[fecha]},"
+                        f"and({fecha}.eq.{ultima[fecha]},{id_}.gt.{ultima[id_]})"
+                    )
+
+            for columna in clave:
+                query = query.order(columna)
+
+            response = query.limit(self.tamano_pagina).execute()
+            paginas += 1
+
+            if not response.data:
+                break
+
+            filas.extend(response.data)
+            if len(response.data) < self.tamano_pagina:
+                break
+
+            ultima = response.data[-1]
+
+        return filas, paginas
+
+
+    def _tramos_fecha(self, columna: str, desde, hasta, incluir_desde: bool) -> List[List[Filtro]]:
+        """
+        Divide [desde, hasta) en rangos de días de tamaño similar; sin
+        `hasta` se corta en hoy y el último tramo queda abierto
+        """
+        abierto = hasta is None
+        desde = _fecha(desde)
+        hasta = _fecha(hasta) if hasta is not None else date.today() + timedelta(days=1)
+        if not incluir_desde:
+            desde += timedelta(days=1)
+
+        dias = (hasta - desde).days
+        if dias <= 0:
+            return [[('gte', columna, desde.isoformat())]] if abierto else []
+
+        n_tramos = min(dias, self.max_concurrencia * self.tramos_por_hilo)
+        cortes = [desde + timedelta(days=round(k * dias / n_tramos)) for k in range(n_tramos + 1)]
+
+        tramos = [
+            [('gte', columna, a.isoformat()), ('lt', columna, b.isoformat())]
+            for a, b in zip(cortes[:-1], cortes[1:])
+        ]
+        if abierto:
+            tramos[-1] = tramos[-1][:1]
+
+        return tramos
+
+
+    def _tramos_id(self, tabla: str, filtros: List[Filtro]) -> List[List[Filtro]]:
+        """Divide [id mínimo, id máximo] en rangos de id de tamaño similar"""
+        extremos = []
+        for descendente in (False, True):
+            query = _aplicar(self.cliente.table(tabla).select('id'), filtros)
+            response = query.order('id', desc=descendente).limit(1).execute()
+            if not response.data:
+                return []
+            extremos.append(int(response.data[0]['id']))
+
+        minimo, maximo = extremos
+        n_tramos = min(maximo - minimo + 1, self.max_concurrencia * self.tramos_por_hilo)
+        ancho = (maximo - minimo + 1) / n_tramos
+        cortes = [minimo + round(k * ancho) for k in range(n_tramos)] + [maximo + 1]
+
+        return [
+            [('gte', 'id', a), ('lt', 'id', b)]
+            for a, b in zip(cortes[:-1], cortes[1:])
+        ]
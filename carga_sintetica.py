@@ -0,0 +1,225 @@
+"""
+Catálogos Sintéticos para Benchmarks
+Ventas, stock, tránsito, cotizaciones, compras y packs con forma realista
+
+`generar_catalogo(n_skus)` arma un catálogo reproducible (misma semilla,
+mismos datos) con las tablas de entrada del pipeline:
+
+- Demanda regular (Poisson con tendencia y patrón semanal), intermitente
+  (pocos días con venta, pedidos grandes) y lenta
+- Productos nuevos y descontinuados, quiebres de stock (algunos en curso,
+  con stock 0) y la compra que repone cada quiebre
+- Packs de 2-4 componentes, algunos anidados, con ventas propias
+- Tránsito desde China, cotizaciones en distintos estados y SKUs excluidos
+
+La matriz SKU × día se genera por bloques de SKUs, así que 100k SKUs
+caben en memoria sin problema.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+# Proporción de SKUs por tipo de demanda: regular, intermitente, lenta
+PROPORCION_DEMANDA = (0.5, 0.35, 0.15)
+
+# SKUs por bloque al generar la matriz de demanda
+SKUS_POR_BLOQUE = 10_000
+
+ESTADOS_COTIZACION = ('pendiente', 'respondida', 'aprobada', 'recibida', 'rechazada')
+
+
+@dataclass
+class CatalogoSintetico:
+    """Tablas de entrada del pipeline, con los nombres de columna de Supabase"""
+    ventas: pd.DataFrame
+    stock: pd.DataFrame
+    transito: pd.DataFrame
+    cotizaciones: pd.DataFrame
+    compras: pd.DataFrame
+    packs: pd.DataFrame
+    skus_excluidos: List[str] = field(default_factory=list)
+
+    def resumen(self) -> Dict[str, int]:
+        return {
+            'skus': len(self.stock),
+            'packs': int(self.packs['sku_pack'].nunique()),
+            'filas_ventas': len(self.ventas),
+            'filas_compras': len(self.compras),
+            'skus_en_transito': len(self.transito),
+            'cotizaciones': len(self.cotizaciones),
+            'skus_excluidos': len(self.skus_excluidos)
+        }
+
+    def packs_dict(self) -> Dict[str, List]:
+        """Packs en el formato de `ForecastPipeline._cargar_packs`"""
+        packs = {}
+        for pack, componente, cantidad in self.packs.itertuples(index=False):
+            packs.setdefault(pack, []).append((componente, float(cantidad)))
+        return packs
+
+    def escribir_en(self, fuente) -> None:
+        """Reemplaza las tablas de entrada de una `FuenteSQLite`"""
+        fuente.escribir_tabla('ventas_historicas', self.ventas)
+        fuente.escribir_tabla('stock_actual', self.stock)
+        fuente.escribir_tabla('transito_china', self.transito)
+        fuente.escribir_tabla('cotizaciones', self.cotizaciones)
+        fuente.escribir_tabla('compras', self.compras)
+        fuente.escribir_tabla('packs', self.packs)
+        fuente.escribir_tabla('skus_excluidos', pd.DataFrame({'sku': self.skus_excluidos}))
+
+
+def generar_catalogo(
+    n_skus: int,
+    dias: int = 180,
+    semilla: int = 0,
+    fraccion_packs: float = 0.03,
+    fraccion_quiebres: float = 0.15,
+    hoy: pd.Timestamp = None
+) -> CatalogoSintetico:
+    """
+    Catálogo de `n_skus` SKUs con `dias` días de ventas hasta `hoy`
+
+    Args:
+        fraccion_packs: Packs a agregar, como fracción de `n_skus`
+        fraccion_quiebres: SKUs con un quiebre de stock en el periodo
+    """
+    rng = np.random.default_rng(semilla)
+    hoy = pd.Timestamp(hoy if hoy is not None else pd.Timestamp.now()).normalize()
+    fechas = pd.date_range(end=hoy - pd.Timedelta(days=1), periods=dias, freq='D')
+
+    skus = np.array([f"SKU{i:06d}" for i in range(n_skus)], dtype=object)
+    packs, skus_pack = _generar_packs(rng, skus, fraccion_packs)
+    todos = np.concatenate([skus, skus_pack])
+    n_total = len(todos)
+
+    # --- Perfil de demanda por SKU ---
+    tipo = rng.choice(3, size=n_total, p=PROPORCION_DEMANDA)
+    tasa = np.where(
+        tipo == 2, rng.uniform(0.03, 0.3, n_total), rng.lognormal(1.0, 1.0, n_total)
+    )
+    prob_venta = np.where(tipo == 1, rng.uniform(0.02, 0.2, n_total), 1.0)
+    tamano_pedido = rng.lognormal(1.5, 0.8, n_total)
+    tendencia = rng.normal(0.0, 0.3, n_total)
+    fase_semanal = rng.integers(0, 7, n_total)
+    precio = np.round(rng.lognormal(9.0, 0.8, n_total), -1)
+
+    # Ciclo de vida: nuevos (empiezan tarde) y descontinuados (terminan antes)
+    inicio = np.where(rng.random(n_total) < 0.15, rng.integers(0, max(1, dias - 30), n_total), 0)
+    fin = np.where(
+        rng.random(n_total) < 0.05,
+        np.minimum(dias, inicio + rng.integers(30, max(31, dias), n_total)),
+        dias
+    )
+
+    # Quiebres de stock: una ventana sin ventas; un tercio sigue en curso
+    con_quiebre = rng.random(n_total) < fraccion_quiebres
+    largo_quiebre = rng.integers(7, 45, n_total)
+    en_curso = con_quiebre & (rng.random(n_total) < 1 / 3)
+    inicio_quiebre = np.where(
+        en_curso, dias - largo_quiebre, rng.integers(0, max(1, dias - 14), n_total)
+    )
+    fin_quiebre = np.where(con_quiebre, np.minimum(dias, inicio_quiebre + largo_quiebre), -1)
+    inicio_quiebre = np.where(con_quiebre, inicio_quiebre, -1)
+
+    # --- Ventas por bloques de SKUs ---
+    t = np.arange(dias)
+    codigos, dias_venta, unidades = [], [], []
+    for a in range(0, n_total, SKUS_POR_BLOQUE):
+        b = min(n_total, a + SKUS_POR_BLOQUE)
+        factor = np.clip(1 + tendencia[a:b, None] * (t / dias - 0.5), 0.05, None)
+        semanal = 1 + 0.25 * np.sin(2 * np.pi * (t + fase_semanal[a:b, None]) / 7)
+        activo = (
+            (t >= inicio[a:b, None]) & (t < fin[a:b, None])
+            & ~((t >= inicio_quiebre[a:b, None]) & (t < fin_quiebre[a:b, None]))
+        )
+
+        regular = rng.poisson(tasa[a:b, None] * factor * semanal)
+        hay_pedido = rng.random((b - a, dias)) < prob_venta[a:b, None]
+        intermitente = hay_pedido * (1 + rng.poisson(np.maximum(tamano_pedido[a:b, None] * factor - 1, 0)))
+        cantidad = np.where((tipo[a:b] == 1)[:, None], intermitente, regular) * activo
+
+        filas, columnas = np.nonzero(cantidad)
+        codigos.append(filas + a)
+        dias_venta.append(columnas)
+        unidades.append(cantidad[filas, columnas])
+
+    codigos = np.concatenate(codigos)
+    dias_venta = np.concatenate(dias_venta)
+    orden = np.lexsort((codigos, dias_venta))
+    codigos, dias_venta = codigos[orden], dias_venta[orden]
+
+    ventas = pd.DataFrame({
+        'sku': pd.Categorical.from_codes(codigos, categories=todos),
+        'fecha': fechas.values[dias_venta].astype('datetime64[ns]'),
+        'unidades': np.concatenate(unidades)[orden].astype(np.float32),
+        'precio': precio[codigos]
+    })
+
+    # --- Stock: cobertura aleatoria alrededor de 60 días, 0 en quiebres en curso ---
+    demanda_media = np.where(tipo == 1, prob_venta * tamano_pedido, tasa)[:n_skus]
+    cobertura = rng.lognormal(np.log(60), 0.7, n_skus)
+    stock_total = np.round(demanda_media * cobertura)
+    stock_total[en_curso[:n_skus] | (fin[:n_skus] < dias)] = 0.0
+    stock = pd.DataFrame({
+        'sku': skus,
+        'descripcion': [f"Producto sintético {i}" for i in range(n_skus)],
+        'stock_total': stock_total
+    })
+
+    # --- Tránsito (algunos ya recibidos: el pipeline los descarta) ---
+    en_transito = np.flatnonzero(rng.random(n_skus) < 0.3)
+    transito = pd.DataFrame({
+        'sku': skus[en_transito],
+        'unidades': np.round(demanda_media[en_transito] * rng.integers(30, 120, len(en_transito))),
+        'estado': np.where(rng.random(len(en_transito)) < 0.9, 'en_transito', 'recibido')
+    })
+
+    cotizados = np.flatnonzero(rng.random(n_skus) < 0.05)
+    cotizaciones = pd.DataFrame({
+        'sku': skus[cotizados],
+        'cantidad_cotizar': np.round(demanda_media[cotizados] * 90) + 1,
+        'estado': rng.choice(ESTADOS_COTIZACION, size=len(cotizados))
+    })
+
+    # --- Compras: la reposición de cada quiebre terminado y otras al azar ---
+    repuestos = np.flatnonzero(con_quiebre[:n_skus] & ~en_curso[:n_skus] & (fin_quiebre[:n_skus] < dias))
+    extra = rng.integers(0, 3, n_skus)
+    compra_sku = np.concatenate([repuestos, np.repeat(np.arange(n_skus), extra)])
+    compra_dia = np.concatenate([fin_quiebre[repuestos], rng.integers(0, dias, int(extra.sum()))])
+    compras = pd.DataFrame({
+        'sku': pd.Categorical.from_codes(compra_sku, categories=skus),
+        'fecha': fechas.values[compra_dia].astype('datetime64[ns]'),
+        'cantidad': np.round(demanda_media[compra_sku] * rng.integers(30, 150, len(compra_sku)) + 1).astype(np.float32)
+    }).sort_values('fecha', kind='stable', ignore_index=True)
+
+    excluidos = skus[rng.random(n_skus) < 0.005].tolist()
+
+    return CatalogoSintetico(
+        ventas=ventas,
+        stock=stock,
+        transito=transito,
+        cotizaciones=cotizaciones,
+        compras=compras,
+        packs=packs,
+        skus_excluidos=excluidos
+    )
+
+
+def _generar_packs(rng: np.random.Generator, skus: np.ndarray, fraccion: float):
+    """Packs de 2-4 componentes; ~10% incluye además un pack anterior (anidado)"""
+    n_packs = int(len(skus) * fraccion)
+    skus_pack = np.array([f"PACK{j:05d}" for j in range(n_packs)], dtype=object)
+
+    filas = []
+    for j, pack in enumerate(skus_pack):
+        componentes = rng.choice(len(skus), size=int(rng.integers(2, 5)), replace=False)
+        filas.extend((pack, skus[k], float(rng.integers(1, 4))) for k in componentes)
+        if j > 0 and rng.random() < 0.1:
+            filas.append((pack, skus_pack[rng.integers(0, j)], 1.0))
+
+    packs = pd.DataFrame(filas, columns=['sku_pack', 'sku_componente', 'cantidad'])
+    return packs, skus_pack
@@ -0,0 +1,202 @@
+"""
+Ejecución Paralela del Motor de Panel
+Reparte los SKUs en tramos balanceados y los calcula en un pool de procesos
+
+Los registros de ventas y compras (ya codificados y ordenados por SKU) se
+publican una sola vez en memoria compartida; cada worker se adjunta a los
+buffers y lee solo las filas de su tramo, sin recibir DataFrames
+serializados. Los tramos son rangos contiguos de SKUs, así que concatenar
+los resultados en orden de tramo reproduce exactamente el orden serial.
+
+Con backtesting, cada worker lo calcula sobre el análisis de su tramo en las
+fechas de origen del panel completo y los resultados se concatenan igual.
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from backtesting import ResultadoBacktest
+from panel_demanda import RegistrosSKU
+from predicciones_batch import PrediccionesBatch
+
+
+@dataclass
+class BufferCompartido:
+    """Descriptor serializable de un array publicado en memoria compartida"""
+    nombre: str
+    dtype: str
+    largo: int
+
+
+def _publicar(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, BufferCompartido]:
+    """Copia `array` a un bloque de memoria compartida nuevo"""
+    array = np.ascontiguousarray(array)
+    bloque = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=bloque.buf)[:] = array
+    return bloque, BufferCompartido(bloque.name, array.dtype.str, len(array))
+
+
+def _adjuntar(buffer: BufferCompartido) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Vista (sin copia) de un array publicado por el proceso principal"""
+    bloque = shared_memory.SharedMemory(name=buffer.nombre)
+    array = np.ndarray((buffer.largo,), dtype=np.dtype(buffer.dtype), buffer=bloque.buf)
+    return bloque, array
+
+
+def dividir_en_tramos(conteos: np.ndarray, n_tramos: int) -> List[Tuple[int, int]]:
+    """
+    Divide los SKUs en tramos contiguos con un número similar de filas
+
+    Returns:
+        Lista de (sku_inicio, sku_fin) sin tramos vacíos
+    """
+    n_skus = len(conteos)
+    if n_skus == 0:
+        return []
+
+    acumulado = np.cumsum(conteos)
+    objetivos = acumulado[-1] * np.arange(1, n_tramos) / n_tramos
+    cortes = np.searchsorted(acumulado, objetivos, side='left') + 1
+    limites = np.unique(np.concatenate(([0], np.clip(cortes, 0, n_skus), [n_skus])))
+
+    return [(int(a), int(b)) for a, b in zip(limites[:-1], limites[1:]) if b > a]
+
+
+def _registros_tramo(columnas: Dict, tarea: Dict, prefijo: str) -> RegistrosSKU:
+    """Registros del tramo del worker, con códigos desde 0"""
+    a, b = tarea[f'filas_{prefijo}']
+    return RegistrosSKU(
+        skus=tarea['skus'],
+        fecha_base=tarea[f'{prefijo}_fecha_base'],
+        codigos=columnas[f'{prefijo}_codigos'][a:b] - tarea['sku_inicio'],
+        dias=columnas[f'{prefijo}_dias'][a:b],
+        valores=columnas[f'{prefijo}_valores'][a:b]
+    )
+
+
+def _procesar_tramo(tarea: Dict) -> PrediccionesBatch:
+    """
+    Worker: adjunta los buffers, arma los registros del tramo y calcula (con
+    `opciones_backtest`, también el backtesting del tramo)
+    """
+    bloques = []
+    try:
+        columnas = {}
+        for clave, buffer in tarea['buffers'].items():
+            bloque, array = _adjuntar(buffer)
+            bloques.append(bloque)
+            columnas[clave] = array
+
+        ventas = _registros_tramo(columnas, tarea, 'ventas')
+        compras = None
+        if 'compras_codigos' in columnas:
+            compras = _registros_tramo(columnas, tarea, 'compras')
+
+        argumentos = dict(
+            ventas=ventas,
+            stock_actual=tarea['stock_actual'],
+            transito_china=tarea['transito_china'],
+            precio_unitario=tarea['precio_unitario'],
+            descripcion=tarea['descripcion'],
+            compras=compras,
+            ahora=tarea['ahora']
+        )
+        if tarea['opciones_backtest'] is not None:
+            resultado = tarea['algoritmo'].calcular_panel_con_backtest(**argumentos, **tarea['opciones_backtest'])
+        else:
+            resultado = tarea['algoritmo'].calcular_panel(**argumentos)
+
+        # Soltar las vistas antes de cerrar los bloques
+        del ventas, compras, columnas, argumentos
+        return resultado
+    finally:
+        for bloque in bloques:
+            bloque.close()
+
+
+def calcular_panel_paralelo(
+    algoritmo,
+    ventas: RegistrosSKU,
+    stock_actual: np.ndarray,
+    transito_china: np.ndarray,
+    precio_unitario: List[float],
+    descripcion: List[str],
+    compras: Optional[RegistrosSKU],
+    n_workers: int,
+    tramos_por_worker: int = 4,
+    ahora: pd.Timestamp = None,
+    opciones_backtest: Dict = None
+) -> PrediccionesBatch:
+    """
+    Equivalente a `algoritmo.calcular_panel(...)` repartido en `n_workers` procesos
+
+    Los resultados son idénticos y están en el mismo orden que la versión
+    serial (todos los tramos usan el mismo `ahora`).
+
+    Args:
+        opciones_backtest: Opciones de `algoritmo.backtest` (con
+            `fechas_origen` del panel completo); si se pasan, devuelve
+            (predicciones, ResultadoBacktest)
+    """
+    if ahora is None:
+        ahora = pd.Timestamp.now()
+
+    ventas = ventas.ordenados()
+    if compras is not None:
+        compras = compras.ordenados()
+
+    tramos = dividir_en_tramos(ventas.conteos(), n_workers * tramos_por_worker)
+
+    bloques = []
+    try:
+        buffers = {}
+        fuentes = {'ventas': ventas}
+        if compras is not None and len(compras) > 0:
+            fuentes['compras'] = compras
+
+        for prefijo, registros in fuentes.items():
+            for campo in ('codigos', 'dias', 'valores'):
+                bloque, buffer = _publicar(getattr(registros, campo))
+                bloques.append(bloque)
+                buffers[f'{prefijo}_{campo}'] = buffer
+
+        tareas = []
+        for sku_inicio, sku_fin in tramos:
+            limites = [sku_inicio, sku_fin]
+            tareas.append({
+                'algoritmo': algoritmo,
+                'buffers': buffers,
+                'skus': ventas.skus[sku_inicio:sku_fin],
+                'ventas_fecha_base': ventas.fecha_base,
+                'compras_fecha_base': compras.fecha_base if 'compras' in fuentes else None,
+                'sku_inicio': sku_inicio,
+                'filas_ventas': tuple(np.searchsorted(ventas.codigos, limites)),
+                'filas_compras': (
+                    tuple(np.searchsorted(compras.codigos, limites))
+                    if 'compras' in fuentes else (0, 0)
+                ),
+                'stock_actual': stock_actual[sku_inicio:sku_fin],
+                'transito_china': transito_china[sku_inicio:sku_fin],
+                'precio_unitario': precio_unitario[sku_inicio:sku_fin],
+                'descripcion': descripcion[sku_inicio:sku_fin],
+                'ahora': ahora,
+                'opciones_backtest': opciones_backtest
+            })
+
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            lotes = list(pool.map(_procesar_tramo, tareas))
+
+        if opciones_backtest is None:
+            return PrediccionesBatch.concatenar(lotes)
+        return (
+            PrediccionesBatch.concatenar([lote for lote, _ in lotes]),
+            ResultadoBacktest.concatenar([backtest for _, backtest in lotes])
+        )
+    finally:
+        for bloque in bloques:
+            bloque.close()
+            bloque.unlink()
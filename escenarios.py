@@ -0,0 +1,131 @@
+"""
+Escenarios What-If de Reposición
+Sugerencias de todos los SKUs para una grilla de parámetros en una pasada
+
+Las estadísticas de demanda (`AnalisisPanel`) no dependen de los días de
+stock deseado, los días de tránsito ni el nivel de servicio: se calculan
+una vez y el stock de seguridad y las sugerencias se evalúan para todos
+los escenarios a la vez (`motor_panel.reposicion_panel` con broadcasting).
+
+El resultado es un `CuboEscenarios`: un array (n_skus, n_escenarios) por
+campo, con los mismos nombres y redondeos que PrediccionAvanzada. El
+escenario con los parámetros del algoritmo coincide con sus predicciones.
+
+Memoria: 8 bytes × SKUs × escenarios por campo (100k SKUs × 125
+escenarios ≈ 100 MB por campo); `campos` limita los que se guardan.
+"""
+
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Campos del cubo, en orden
+CAMPOS_ESCENARIO = (
+    'stock_seguridad', 'stock_optimo',
+    'sugerencia_reposicion', 'sugerencia_reposicion_p75', 'sugerencia_reposicion_p90',
+    'valor_total_sugerencia'
+)
+
+PARAMETROS_ESCENARIO = ('dias_stock_deseado', 'dias_transito', 'nivel_servicio')
+
+
+def grilla_escenarios(
+    dias_stock_deseado: Sequence[int],
+    dias_transito: Sequence[int],
+    nivel_servicio: Sequence[float]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Producto cartesiano de los valores de cada parámetro, como tres arrays paralelos"""
+    combinaciones = list(product(dias_stock_deseado, dias_transito, nivel_servicio))
+    if not combinaciones:
+        raise ValueError("La grilla de escenarios está vacía")
+    stock, transito, servicio = zip(*combinaciones)
+    return (
+        np.asarray(stock, dtype=np.int64),
+        np.asarray(transito, dtype=np.int64),
+        np.asarray(servicio, dtype=np.float64)
+    )
+
+
+@dataclass
+class CuboEscenarios:
+    """Resultado SKU × escenario; los parámetros de cada escenario como arrays paralelos"""
+    skus: np.ndarray                  # (n_skus,)
+    dias_stock_deseado: np.ndarray    # (n_escenarios,)
+    dias_transito: np.ndarray         # (n_escenarios,)
+    nivel_servicio: np.ndarray        # (n_escenarios,)
+    valores: Dict[str, np.ndarray]    # campo → (n_skus, n_escenarios)
+
+    @property
+    def n_skus(self) -> int:
+        return len(self.skus)
+
+    @property
+    def n_escenarios(self) -> int:
+        return len(self.nivel_servicio)
+
+    def __getitem__(self, campo: str) -> np.ndarray:
+        return self.valores[campo]
+
+    def escenarios(self) -> pd.DataFrame:
+        """Parámetros de cada escenario (índice = número de escenario)"""
+        return pd.DataFrame({
+            'dias_stock_deseado': self.dias_stock_deseado,
+            'dias_transito': self.dias_transito,
+            'nivel_servicio': self.nivel_servicio
+        })
+
+    def indice(self, dias_stock_deseado: int, dias_transito: int, nivel_servicio: float) -> int:
+        """Número del escenario con esos parámetros"""
+        encontrado = np.flatnonzero(
+            (self.dias_stock_deseado == dias_stock_deseado)
+            & (self.dias_transito == dias_transito)
+            & np.isclose(self.nivel_servicio, nivel_servicio)
+        )
+        if len(encontrado) == 0:
+            raise KeyError((dias_stock_deseado, dias_transito, nivel_servicio))
+        return int(encontrado[0])
+
+    def seleccionar_skus(self, mascara: np.ndarray) -> 'CuboEscenarios':
+        """Filas de los SKUs de `mascara` (booleana o índices)"""
+        return CuboEscenarios(
+            skus=self.skus[mascara],
+            dias_stock_deseado=self.dias_stock_deseado,
+            dias_transito=self.dias_transito,
+            nivel_servicio=self.nivel_servicio,
+            valores={campo: valores[mascara] for campo, valores in self.valores.items()}
+        )
+
+    def escenario(self, k: int) -> pd.DataFrame:
+        """Valores de todos los SKUs en el escenario `k`"""
+        return pd.DataFrame(
+            {'sku': self.skus, **{campo: valores[:, k] for campo, valores in self.valores.items()}}
+        )
+
+    def resumen(self) -> pd.DataFrame:
+        """
+        Totales por escenario: unidades sugeridas (p50/p75/p90), valor y
+        SKUs con sugerencia
+        """
+        resumen = self.escenarios()
+        for campo, valores in self.valores.items():
+            if campo.startswith('sugerencia') or campo == 'valor_total_sugerencia':
+                resumen[campo] = valores.sum(axis=0)
+        if 'sugerencia_reposicion' in self.valores:
+            resumen['skus_con_sugerencia'] = (self.valores['sugerencia_reposicion'] > 0).sum(axis=0)
+        return resumen
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """Formato largo: una fila por SKU y escenario"""
+        n_skus, n_escenarios = self.n_skus, self.n_escenarios
+        return pd.DataFrame({
+            'sku': np.repeat(self.skus, n_escenarios),
+            'escenario': np.tile(np.arange(n_escenarios), n_skus),
+            'dias_stock_deseado': np.tile(self.dias_stock_deseado, n_skus),
+            'dias_transito': np.tile(self.dias_transito, n_skus),
+            'nivel_servicio': np.tile(self.nivel_servicio, n_skus),
+            **{campo: valores.ravel() for campo, valores in self.valores.items()}
+        })
@@ -0,0 +1,142 @@
+"""
+Escritura por Lotes en Supabase
+Upsert en lotes grandes enviados en paralelo, con reintentos
+
+Los registros se parten en lotes cuyo tamaño se ajusta al peso de las filas
+(máximo de filas y de bytes por request) y se envían en un pool de hilos con
+concurrencia limitada. Un lote que falla se reintenta con espera exponencial
+y, si sigue fallando, se divide en dos mitades (un payload demasiado grande o
+un statement timeout suelen resolverse así) hasta `min_filas_lote`.
+
+Como `CargadorPaginado`, solo usa la interfaz de postgrest-py (`table`,
+`upsert`, `execute`).
+"""
+
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class ResultadoEscritura:
+    """Filas escritas y métricas de la escritura"""
+    filas: int = 0
+    lotes: int = 0
+    reintentos: int = 0
+    fallidas: int = 0
+    errores: List[str] = field(default_factory=list)
+    segundos: float = 0.0
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return self.filas / self.segundos if self.segundos > 0 else 0.0
+
+    def sumar(self, otro: 'ResultadoEscritura') -> None:
+        self.filas += otro.filas
+        self.lotes += otro.lotes
+        self.reintentos += otro.reintentos
+        self.fallidas += otro.fallidas
+        self.errores.extend(otro.errores)
+
+
+class EscritorLotes:
+    """
+    Upsert de listas de registros con lotes concurrentes
+
+    Args:
+        cliente: Cliente con `.table(nombre)` (Supabase o postgrest-py)
+        max_filas_lote: Filas por request como máximo
+        max_bytes_lote: Bytes de JSON por request como máximo
+        min_filas_lote: Tamaño bajo el cual un lote que falla ya no se divide
+        max_concurrencia: Requests simultáneos como máximo
+        max_reintentos: Reintentos de un lote antes de dividirlo
+        espera_base: Segundos de espera del primer reintento (se duplica)
+    """
+
+    def __init__(
+        self,
+        cliente,
+        max_filas_lote: int = 2000,
+        max_bytes_lote: int = 2 * 1024 * 1024,
+        min_filas_lote: int = 50,
+        max_concurrencia: int = 4,
+        max_reintentos: int = 3,
+        espera_base: float = 0.5
+    ):
+        self.cliente = cliente
+        self.max_filas_lote = max_filas_lote
+        self.max_bytes_lote = max_bytes_lote
+        self.min_filas_lote = min_filas_lote
+        self.max_concurrencia = max(1, max_concurrencia)
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+
+
+    def upsert(self, tabla: str, registros: List[dict], on_conflict: str) -> ResultadoEscritura:
+        """
+        Inserta o actualiza `registros` según la clave única `on_conflict`
+        (columnas separadas por coma)
+
+        Los registros tienen que ser serializables a JSON.
+        """
+        inicio = time.perf_counter()
+        resultado = ResultadoEscritura()
+
+        if registros:
+            tamano = self.tamano_lote(registros)
+            lotes = [registros[i:i + tamano] for i in range(0, len(registros), tamano)]
+
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrencia, len(lotes))) as pool:
+                parciales = pool.map(lambda lote: self._escribir_lote(tabla, lote, on_conflict), lotes)
+                for parcial in parciales:
+                    resultado.sumar(parcial)
+
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+
+    def tamano_lote(self, registros: List[dict]) -> int:
+        """Filas por lote según el peso medio de una muestra de registros"""
+        paso = max(1, len(registros) // 100)
+        muestra = registros[::paso]
+        bytes_por_fila = len(json.dumps(muestra).encode()) / len(muestra)
+
+        por_bytes = int(self.max_bytes_lote / max(bytes_por_fila, 1.0))
+        return max(self.min_filas_lote, min(self.max_filas_lote, por_bytes))
+
+
+    def _escribir_lote(self, tabla: str, lote: List[dict], on_conflict: str) -> ResultadoEscritura:
+        """Envía un lote con reintentos; si se agotan, lo divide en dos"""
+        resultado = ResultadoEscritura()
+        ultimo_error = None
+
+        for intento in range(self.max_reintentos + 1):
+            if intento > 0:
+                resultado.reintentos += 1
+                # Espera exponencial con jitter para no reintentar todos juntos
+                time.sleep(self.espera_base * 2 ** (intento - 1) * (1 + random.random()))
+
+            try:
+                self.cliente.table(tabla) \
+                    .upsert(lote, on_conflict=on_conflict, returning='minimal') \
+                    .execute()
+            except Exception as e:
+                ultimo_error = e
+                continue
+
+            resultado.filas += len(lote)
+            resultado.lotes += 1
+            return resultado
+
+        if len(lote) >= 2 * self.min_filas_lote:
+            mitad = len(lote) // 2
+            for parte in (lote[:mitad], lote[mitad:]):
+                resultado.sumar(self._escribir_lote(tabla, parte, on_conflict))
+            return resultado
+
+        resultado.fallidas += len(lote)
+        resultado.errores.append(f"{len(lote)} filas: {ultimo_error}")
+        return resultado
@@ -0,0 +1,507 @@
+"""
+Estado Incremental del Forecast
+Estado por SKU persistido entre corridas para procesar solo los días nuevos
+
+El cálculo completo relee toda la ventana histórica de ventas. Este módulo
+guarda por SKU lo necesario para continuar cada modelo desde el último día
+procesado:
+
+- Nivel EWMA
+- Croston: número y suma de días con venta, primera y última venta
+- Días sin venta (intermitencia)
+- Momentos (n, media, M2) de los días con stock y stock reconstruido
+- Límites IQR de outliers y sumas de la regresión de tendencia
+
+Los percentiles y los límites IQR no son incrementales: se congelan en el
+último cálculo completo. El stock continúa desde el último día procesado,
+así que los días ya plegados no se reevalúan (ej. si llega la primera
+compra de un SKU). Tampoco se descartan días viejos: la ventana crece
+hasta el siguiente recálculo completo, que acota la deriva.
+
+El estado se guarda hasta el último día completo (`ultimo_dia_completo`),
+no hasta el día de la corrida: las ventas de ese día pueden seguir llegando
+después, y la corrida siguiente las carga y pliega (las predicciones sí
+incluyen lo ya cargado del día).
+"""
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Optional
+
+from panel_demanda import RegistrosSKU
+from motor_panel import (
+    combinar_momentos,
+    ewma_panel,
+    limites_iqr_por_grupo,
+    mascara_rango,
+    momentos_panel,
+    percentiles_por_grupo,
+    reconstruir_stock_panel,
+    stock_inicial_panel,
+    sumas_regresion
+)
+
+
+SIN_INICIO = np.iinfo(np.int64).max
+
+
+@dataclass
+class EstadoForecast:
+    """
+    Estado de los modelos de demanda de cada SKU
+
+    Los días son offsets desde `fecha_base`; los arrays están alineados
+    con `skus`.
+    """
+    skus: np.ndarray
+    fecha_base: pd.Timestamp
+    fecha_ultimo_dia: pd.Timestamp  # Último día completo de ventas procesado
+    fecha_recalculo_completo: pd.Timestamp
+    firma: str  # Parámetros con los que se construyó el estado
+
+    # Rango válido (con todas las filas, como la matriz de demanda)
+    inicio: np.ndarray
+    fin: np.ndarray
+    ultima_venta: np.ndarray
+
+    # EWMA y Croston
+    nivel_ewma: np.ndarray
+    n_ventas: np.ndarray
+    suma_ventas: np.ndarray
+    primera_venta: np.ndarray
+    ultima_venta_positiva: np.ndarray
+    dias_sin_venta: np.ndarray
+
+    # Días con stock
+    n_con_stock: np.ndarray
+    media_con_stock: np.ndarray
+    m2_con_stock: np.ndarray
+    n_con_venta: np.ndarray
+    tiene_compras: np.ndarray
+    stock_final: np.ndarray
+
+    # Outliers y tendencia
+    limite_inferior: np.ndarray
+    limite_superior: np.ndarray
+    n_filas: np.ndarray
+    n_outliers: np.ndarray
+    origen_regresion: np.ndarray
+    reg_n: np.ndarray
+    reg_sx: np.ndarray
+    reg_sy: np.ndarray
+    reg_sxx: np.ndarray
+    reg_sxy: np.ndarray
+    reg_syy: np.ndarray
+
+    # Congelados hasta el próximo recálculo completo (NaN sin días con venta)
+    p50: np.ndarray
+    p75: np.ndarray
+    p90: np.ndarray
+
+    unidades_totales: np.ndarray
+    precio_unitario: np.ndarray
+
+    @property
+    def n_skus(self) -> int:
+        return len(self.skus)
+
+    def dia(self, fecha) -> int:
+        """Offset (en días) de una fecha respecto a `fecha_base`"""
+        return int((pd.Timestamp(fecha).normalize() - self.fecha_base).days)
+
+
+CAMPOS_META = ('skus', 'fecha_base', 'fecha_ultimo_dia', 'fecha_recalculo_completo', 'firma')
+CAMPOS_SKU = tuple(f.name for f in fields(EstadoForecast) if f.name not in CAMPOS_META)
+
+# Valor de cada campo para un SKU sin historia
+VACIOS = dict(
+    inicio=SIN_INICIO, fin=-1, ultima_venta=-1,
+    nivel_ewma=np.nan, primera_venta=-1, ultima_venta_positiva=-1,
+    tiene_compras=False,
+    limite_inferior=np.nan, limite_superior=np.nan,
+    p50=np.nan, p75=np.nan, p90=np.nan
+)
+
+
+def ultimo_dia_completo(ahora: pd.Timestamp) -> pd.Timestamp:
+    """Último día cuyas ventas ya no cambian: el anterior al de `ahora`"""
+    return pd.Timestamp(ahora).normalize() - pd.Timedelta(days=1)
+
+
+def firma_estado(alpha_ewma: float, dias_historico: int) -> str:
+    """Identifica los parámetros que afectan el estado guardado"""
+    return f"alpha_ewma={alpha_ewma};dias_historico={dias_historico}"
+
+
+def estado_vigente(
+    estado: Optional[EstadoForecast],
+    firma: str,
+    ahora: pd.Timestamp,
+    dias_recalculo_completo: int
+) -> bool:
+    """
+    True si se puede continuar `estado` en vez de recalcular todo
+
+    Se recalcula si no hay estado, si cambiaron los parámetros o si pasaron
+    `dias_recalculo_completo` días desde el último cálculo completo.
+    """
+    if estado is None or estado.firma != firma:
+        return False
+
+    hoy = pd.Timestamp(ahora).normalize()
+    if hoy < estado.fecha_ultimo_dia:
+        return False
+
+    return (hoy - estado.fecha_recalculo_completo).days < dias_recalculo_completo
+
+
+# =====================================================================
+# CONSTRUCCIÓN Y PERSISTENCIA
+# =====================================================================
+
+def estado_desde_analisis(
+    analisis,
+    ventas: RegistrosSKU,
+    precio_unitario: np.ndarray,
+    alpha_ewma: float,
+    firma: str,
+    ahora: pd.Timestamp
+) -> EstadoForecast:
+    """
+    Estado inicial a partir de un cálculo completo
+
+    Args:
+        analisis: `AnalisisPanel` con sus intermedios (matriz, compras y
+            días con stock)
+        ventas: Registros de venta con los que se calculó el análisis
+        ahora: Instante del análisis; su día queda como `fecha_ultimo_dia`
+            (para no perder ventas tardías, un análisis hasta
+            `ultimo_dia_completo`)
+    """
+    matriz = analisis.matriz
+    n_skus = matriz.n_skus
+    ventas_matriz = matriz.ventas
+    inicio, fin = matriz.inicio, matriz.fin
+    valida = matriz.mascara_valida()
+    con_stock = analisis.con_stock
+    filas = np.arange(n_skus)
+
+    # Croston e intermitencia
+    positivas = (ventas_matriz > 0) & valida
+    n_ventas = positivas.sum(axis=1)
+    hay_positivas = n_ventas > 0
+    primera = np.where(hay_positivas, positivas.argmax(axis=1), -1)
+    ultima = np.where(
+        hay_positivas,
+        matriz.n_dias - 1 - positivas[:, ::-1].argmax(axis=1),
+        -1
+    )
+
+    # Stock reconstruido al último día del rango
+    stock_final = np.zeros(n_skus)
+    if analisis.tiene_compras.any():
+        stock_inicial = stock_inicial_panel(
+            analisis.compras_matriz, inicio, fin, analisis.venta_diaria_promedio * 30
+        )
+        stock, _ = reconstruir_stock_panel(
+            ventas_matriz, analisis.compras_matriz, inicio, fin, stock_inicial
+        )
+        stock_final = np.where(
+            analisis.tiene_compras,
+            stock[filas, np.clip(fin, 0, matriz.n_dias - 1)],
+            0.0
+        )
+
+    n_con_stock, media_con_stock, m2_con_stock = momentos_panel(ventas_matriz, con_stock)
+    n_con_venta = (con_stock & (ventas_matriz > 0)).sum(axis=1)
+    hay_ventas = n_con_venta > 0
+
+    # Outliers y regresión sobre las filas, con días referidos a la matriz
+    codigos = ventas.codigos
+    dias = ventas.dias - (matriz.fecha_base - ventas.fecha_base).days
+    limite_inferior, limite_superior = limites_iqr_por_grupo(ventas.valores, codigos, n_skus)
+    origen = np.full(n_skus, SIN_INICIO, dtype=np.int64)
+    np.minimum.at(origen, codigos, dias)
+    reg_n, reg_sx, reg_sy, reg_sxx, reg_sxy, reg_syy = sumas_regresion(
+        (dias - origen[codigos]).astype(float), ventas.valores, codigos, n_skus
+    )
+
+    return EstadoForecast(
+        skus=np.asarray(matriz.skus, dtype=object),
+        fecha_base=matriz.fecha_base,
+        fecha_ultimo_dia=pd.Timestamp(ahora).normalize(),
+        fecha_recalculo_completo=pd.Timestamp(ahora).normalize(),
+        firma=firma,
+        inicio=inicio,
+        fin=fin,
+        ultima_venta=matriz.ultima_venta,
+        nivel_ewma=ewma_panel(ventas_matriz, inicio, fin, alpha_ewma),
+        n_ventas=n_ventas,
+        suma_ventas=np.where(positivas, ventas_matriz, 0.0).sum(axis=1),
+        primera_venta=primera,
+        ultima_venta_positiva=ultima,
+        dias_sin_venta=((ventas_matriz == 0) & valida).sum(axis=1),
+        n_con_stock=n_con_stock,
+        media_con_stock=media_con_stock,
+        m2_con_stock=m2_con_stock,
+        n_con_venta=n_con_venta,
+        tiene_compras=analisis.tiene_compras,
+        stock_final=stock_final,
+        limite_inferior=limite_inferior,
+        limite_superior=limite_superior,
+        n_filas=analisis.n_filas,
+        n_outliers=analisis.n_outliers,
+        origen_regresion=np.where(origen == SIN_INICIO, 0, origen),
+        reg_n=reg_n,
+        reg_sx=reg_sx,
+        reg_sy=reg_sy,
+        reg_sxx=reg_sxx,
+        reg_sxy=reg_sxy,
+        reg_syy=reg_syy,
+        p50=np.where(hay_ventas, analisis.venta_diaria_p50, np.nan),
+        p75=np.where(hay_ventas, analisis.venta_diaria_p75, np.nan),
+        p90=np.where(hay_ventas, analisis.venta_diaria_p90, np.nan),
+        unidades_totales=analisis.unidades_totales_periodo,
+        precio_unitario=np.asarray(precio_unitario, dtype=float)
+    )
+
+
+def ampliar_estado(estado: EstadoForecast, skus: np.ndarray) -> EstadoForecast:
+    """
+    Reordena el estado según `skus`; los SKUs nuevos arrancan sin historia
+    """
+    skus = np.asarray(skus, dtype=object)
+    posiciones = pd.Index(estado.skus).get_indexer(skus)
+    existe = posiciones >= 0
+    posiciones = np.where(existe, posiciones, 0)
+
+    columnas = {}
+    for campo in CAMPOS_SKU:
+        actual = getattr(estado, campo)
+        vacio = VACIOS.get(campo, 0)
+        if len(actual) == 0:
+            columnas[campo] = np.full(len(skus), vacio, dtype=actual.dtype)
+        else:
+            columnas[campo] = np.where(existe, actual[posiciones], vacio).astype(actual.dtype)
+
+    return replace(estado, skus=skus, **columnas)
+
+
+def guardar_estado(estado: EstadoForecast, ruta: str) -> None:
+    """Guarda el estado en un .npz comprimido"""
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(ruta, 'wb') as archivo:
+        np.savez_compressed(
+            archivo,
+            skus=estado.skus.astype(str),
+            fecha_base=str(estado.fecha_base),
+            fecha_ultimo_dia=str(estado.fecha_ultimo_dia),
+            fecha_recalculo_completo=str(estado.fecha_recalculo_completo),
+            firma=estado.firma,
+            **{campo: getattr(estado, campo) for campo in CAMPOS_SKU}
+        )
+
+
+def cargar_estado(ruta: str) -> Optional[EstadoForecast]:
+    """Lee un estado guardado con `guardar_estado` (None si no existe)"""
+    if not Path(ruta).exists():
+        return None
+
+    with np.load(ruta, allow_pickle=False) as datos:
+        return EstadoForecast(
+            skus=datos['skus'].astype(object),
+            fecha_base=pd.Timestamp(str(datos['fecha_base'])),
+            fecha_ultimo_dia=pd.Timestamp(str(datos['fecha_ultimo_dia'])),
+            fecha_recalculo_completo=pd.Timestamp(str(datos['fecha_recalculo_completo'])),
+            firma=str(datos['firma']),
+            **{campo: datos[campo] for campo in CAMPOS_SKU}
+        )
+
+
+# =====================================================================
+# PLEGADO DE DÍAS NUEVOS
+# =====================================================================
+
+def plegar_dias(
+    estado: EstadoForecast,
+    ventas: RegistrosSKU,
+    compras: Optional[RegistrosSKU],
+    stock_actual: np.ndarray,
+    precio_unitario: np.ndarray,
+    alpha_ewma: float,
+    ahora: pd.Timestamp
+) -> EstadoForecast:
+    """
+    Continúa el estado con los días posteriores a `estado.fecha_ultimo_dia`
+
+    Args:
+        estado: Estado alineado con `ventas.skus` (ver `ampliar_estado`)
+        ventas, compras: Registros nuevos con `fecha_base = estado.fecha_base`;
+            las filas de días ya procesados se ignoran
+        stock_actual, precio_unitario: Valores actuales por SKU
+
+    Returns:
+        Estado nuevo; `estado` no se modifica
+    """
+    n_skus = estado.n_skus
+    filas = np.arange(n_skus)
+    hoy = estado.dia(ahora)
+    ultimo = estado.dia(estado.fecha_ultimo_dia)
+
+    nuevas = ventas.dias > ultimo
+    codigos = ventas.codigos[nuevas]
+    dias = ventas.dias[nuevas]
+    unidades = ventas.valores[nuevas]
+
+    # 1. OUTLIERS: límites congelados; un SKU sin filas previas usa las suyas
+    sin_filas_previas = estado.n_filas == 0
+    inferior, superior = limites_iqr_por_grupo(unidades, codigos, n_skus)
+    inferior = np.where(sin_filas_previas, inferior, estado.limite_inferior)
+    superior = np.where(sin_filas_previas, superior, estado.limite_superior)
+    sin_outliers = (unidades >= inferior[codigos]) & (unidades <= superior[codigos])
+
+    n_filas_nuevas = np.bincount(codigos, minlength=n_skus)
+    n_outliers_nuevos = n_filas_nuevas - np.bincount(codigos[sin_outliers], minlength=n_skus)
+
+    # 2. TENDENCIA: sumas de la regresión con todas las filas
+    primera_fila = np.full(n_skus, SIN_INICIO, dtype=np.int64)
+    ultima_fila = np.full(n_skus, -1, dtype=np.int64)
+    np.minimum.at(primera_fila, codigos, dias)
+    np.maximum.at(ultima_fila, codigos, dias)
+
+    origen = np.where(sin_filas_previas & (n_filas_nuevas > 0), primera_fila, estado.origen_regresion)
+    sumas = sumas_regresion((dias - origen[codigos]).astype(float), unidades, codigos, n_skus)
+    reg_n, reg_sx, reg_sy, reg_sxx, reg_sxy, reg_syy = (
+        previa + nueva
+        for previa, nueva in zip(
+            (estado.reg_n, estado.reg_sx, estado.reg_sy,
+             estado.reg_sxx, estado.reg_sxy, estado.reg_syy),
+            sumas
+        )
+    )
+
+    # 3. RANGO NUEVO DE CADA SKU (se extiende a hoy si tiene stock)
+    tiene_rango = estado.inicio <= estado.fin
+    inicio = np.minimum(estado.inicio, primera_fila)
+    ultima_venta = np.maximum(estado.ultima_venta, ultima_fila)
+    fin = np.maximum(estado.fin, ultima_fila)
+    fin = np.where((stock_actual > 0) & (inicio <= fin), np.maximum(fin, hoy), fin)
+
+    desde = np.where(tiene_rango, estado.fin + 1, inicio)
+    activo = (inicio <= fin) & (fin >= desde)
+
+    base = dict(
+        inicio=inicio,
+        fin=fin,
+        ultima_venta=ultima_venta,
+        limite_inferior=inferior,
+        limite_superior=superior,
+        n_filas=estado.n_filas + n_filas_nuevas,
+        n_outliers=estado.n_outliers + n_outliers_nuevos,
+        origen_regresion=origen,
+        reg_n=reg_n,
+        reg_sx=reg_sx,
+        reg_sy=reg_sy,
+        reg_sxx=reg_sxx,
+        reg_sxy=reg_sxy,
+        reg_syy=reg_syy,
+        precio_unitario=np.asarray(precio_unitario, dtype=float),
+        fecha_ultimo_dia=pd.Timestamp(ahora).normalize()
+    )
+
+    if not activo.any():
+        return replace(estado, **base)
+
+    # 4. MATRIZ DE LOS DÍAS NUEVOS (solo filas sin outliers)
+    d0 = int(desde[activo].min())
+    n_dias = int(fin[activo].max()) - d0 + 1
+    a = np.where(activo, desde - d0, 0)
+    b = np.where(activo, fin - d0, -1)
+    valida = mascara_rango(a, b, n_dias)
+
+    ventas_nuevas = np.bincount(
+        codigos[sin_outliers] * n_dias + dias[sin_outliers] - d0,
+        weights=unidades[sin_outliers],
+        minlength=n_skus * n_dias
+    ).reshape(n_skus, n_dias)
+
+    compras_nuevas = np.zeros((n_skus, n_dias))
+    if compras is not None and len(compras) > 0:
+        local = compras.dias - d0
+        en_rango = (local >= a[compras.codigos]) & (local <= b[compras.codigos])
+        np.add.at(
+            compras_nuevas,
+            (compras.codigos[en_rango], local[en_rango]),
+            compras.valores[en_rango]
+        )
+
+    # 5. EWMA, CROSTON E INTERMITENCIA
+    nivel_ewma = ewma_panel(
+        ventas_nuevas, a, b, alpha_ewma,
+        nivel_inicial=np.where(tiene_rango, estado.nivel_ewma, np.nan)
+    )
+    nivel_ewma = np.where(activo, nivel_ewma, estado.nivel_ewma)
+
+    positivas = (ventas_nuevas > 0) & valida
+    hay_positivas = positivas.any(axis=1)
+    primera_local = positivas.argmax(axis=1) + d0
+    ultima_local = n_dias - 1 - positivas[:, ::-1].argmax(axis=1) + d0
+
+    # 6. STOCK: continúa desde el stock reconstruido al final del estado
+    compras_en_rango = (compras_nuevas > 0) & valida
+    tiene_compras = estado.tiene_compras | compras_en_rango.any(axis=1)
+    stock_inicial = np.where(
+        estado.tiene_compras,
+        estado.stock_final + compras_nuevas[filas, a] - ventas_nuevas[filas, a],
+        stock_inicial_panel(compras_nuevas, a, b, np.zeros(n_skus))
+    )
+    stock, stockout = reconstruir_stock_panel(ventas_nuevas, compras_nuevas, a, b, stock_inicial)
+    con_stock = valida & ~(stockout & tiene_compras[:, None])
+
+    momentos = combinar_momentos(
+        estado.n_con_stock, estado.media_con_stock, estado.m2_con_stock,
+        *momentos_panel(ventas_nuevas, con_stock)
+    )
+
+    # 7. PERCENTILES: solo para SKUs que recién tienen días con venta
+    con_venta = con_stock & (ventas_nuevas > 0)
+    n_con_venta = estado.n_con_venta + con_venta.sum(axis=1)
+    percentiles = np.stack([estado.p50, estado.p75, estado.p90])
+    primeros = (estado.n_con_venta == 0) & (n_con_venta > 0)
+    if primeros.any():
+        filas_venta, dias_venta = np.nonzero(con_venta & primeros[:, None])
+        nuevos = percentiles_por_grupo(
+            ventas_nuevas[filas_venta, dias_venta], filas_venta, n_skus, (50, 75, 90)
+        )
+        percentiles = np.where(primeros, nuevos, percentiles)
+
+    return replace(
+        estado,
+        nivel_ewma=nivel_ewma,
+        n_ventas=estado.n_ventas + positivas.sum(axis=1),
+        suma_ventas=estado.suma_ventas + np.where(positivas, ventas_nuevas, 0.0).sum(axis=1),
+        primera_venta=np.where(
+            (estado.primera_venta < 0) & hay_positivas, primera_local, estado.primera_venta
+        ),
+        ultima_venta_positiva=np.where(hay_positivas, ultima_local, estado.ultima_venta_positiva),
+        dias_sin_venta=estado.dias_sin_venta + ((ventas_nuevas == 0) & valida).sum(axis=1),
+        n_con_stock=momentos[0],
+        media_con_stock=momentos[1],
+        m2_con_stock=momentos[2],
+        n_con_venta=n_con_venta,
+        tiene_compras=tiene_compras,
+        stock_final=np.where(
+            activo & tiene_compras, stock[filas, np.maximum(b, 0)], estado.stock_final
+        ),
+        p50=percentiles[0],
+        p75=percentiles[1],
+        p90=percentiles[2],
+        unidades_totales=(
+            estado.unidades_totales + np.where(valida, ventas_nuevas, 0.0).sum(axis=1)
+        ),
+        **base
+    )
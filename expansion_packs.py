@@ -0,0 +1,107 @@
+"""
+Expansión de Ventas de Packs a SKUs Componentes
+Lista de materiales aplanada + un merge vectorizado
+
+Los packs pueden contener otros packs: `aplanar_packs` resuelve cada pack
+hasta sus componentes finales (multiplicando cantidades a lo largo de la
+cadena) una sola vez, con memo por pack. `expandir_packs` une las ventas
+con esa tabla en un solo merge y multiplica las unidades; las filas que no
+son packs quedan igual.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# {sku_pack: [(sku_componente, cantidad), ...]}, como en la tabla `packs`
+Packs = Dict[str, List[Tuple[str, float]]]
+
+
+def aplanar_packs(packs: Packs) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Lista de materiales completamente aplanada
+
+    Returns:
+        (tabla, ciclos): tabla con columnas sku_pack, sku_componente y
+        cantidad (unidades del componente final por unidad del pack), en el
+        orden de los componentes de cada pack; ciclos con los packs que se
+        contienen a sí mismos. En un ciclo, el pack repetido queda como
+        componente final en vez de expandirse otra vez.
+    """
+    memo: Dict[str, List[Tuple[str, float]]] = {}
+    en_curso = set()
+    ciclos = []
+
+    def resolver(pack: str) -> List[Tuple[str, float]]:
+        if pack in memo:
+            return memo[pack]
+
+        en_curso.add(pack)
+        finales = []
+        for componente, cantidad in packs[pack]:
+            if componente in packs and componente in en_curso:
+                ciclos.append(componente)
+                finales.append((componente, cantidad))
+            elif componente in packs:
+                finales.extend((sku, cantidad * sub) for sku, sub in resolver(componente))
+            else:
+                finales.append((componente, cantidad))
+        en_curso.discard(pack)
+
+        memo[pack] = finales
+        return finales
+
+    filas = [
+        (pack, componente, float(cantidad))
+        for pack in packs
+        for componente, cantidad in resolver(pack)
+    ]
+    tabla = pd.DataFrame(filas, columns=['sku_pack', 'sku_componente', 'cantidad'])
+    return tabla, sorted(set(ciclos))
+
+
+def expandir_packs(ventas: pd.DataFrame, tabla: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """
+    Reemplaza cada venta de un pack por una fila por componente final
+
+    Conserva el orden de las filas, el índice original (repetido en las
+    filas de un mismo pack) y el resto de las columnas. Las unidades de cada
+    componente son unidades del pack × cantidad.
+
+    Returns:
+        (ventas expandidas, filas de packs expandidas)
+    """
+    es_pack = ventas['sku'].isin(tabla['sku_pack']).to_numpy()
+    n_packs = int(es_pack.sum())
+    if n_packs == 0:
+        return ventas, 0
+
+    # Un merge sobre la clave como texto: las categorías de `sku` no
+    # incluyen a los componentes que no se venden sueltos
+    izquierda = pd.DataFrame({
+        'sku_pack': np.asarray(ventas['sku'], dtype=object),
+        '_fila': np.arange(len(ventas))
+    })
+    unido = izquierda.merge(tabla, on='sku_pack', how='left', sort=False)
+
+    filas = unido['_fila'].to_numpy()
+    componente = unido['sku_componente'].to_numpy()
+    expandida = ~pd.isna(componente)
+    cantidad = unido['cantidad'].fillna(1.0).to_numpy()
+
+    resultado = ventas.iloc[filas].copy()
+
+    sku = np.where(expandida, componente, unido['sku_pack'].to_numpy())
+    if isinstance(ventas['sku'].dtype, pd.CategoricalDtype):
+        resultado['sku'] = pd.Categorical(sku)
+    else:
+        resultado['sku'] = sku
+
+    unidades = ventas['unidades'].to_numpy(dtype=np.float64)[filas] * cantidad
+    if np.issubdtype(ventas['unidades'].dtype, np.floating):
+        unidades = unidades.astype(ventas['unidades'].dtype)
+    resultado['unidades'] = unidades
+
+    return resultado, n_packs
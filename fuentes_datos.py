@@ -0,0 +1,527 @@
+"""
+Fuentes de Datos del Pipeline de Forecasting
+Tablas de entrada y de resultados detrás de una misma interfaz
+
+`ForecastPipeline` no usa el cliente de Supabase directamente sino una
+`FuenteDatos`:
+
+- `FuenteSupabase`: producción (carga por keyset, upsert por lotes)
+- `FuenteSQLite`: las mismas tablas en un archivo local, para correr el
+  pipeline completo sin credenciales ni red (perfilado, benchmarks, una
+  copia de producción)
+
+Las tablas de entrada se entregan como DataFrames con los esquemas de
+`carga_paginada` (o filas, las tablas chicas); los resultados se reciben
+como los mismos registros JSON que se envían a PostgREST.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Set
+
+import pandas as pd
+
+from carga_paginada import (
+    ESQUEMA_COMPRAS, ESQUEMA_STOCK, ESQUEMA_VENTAS, CargadorPaginado, columnas_a_dataframe,
+    filas_a_dataframe
+)
+from escritura_lotes import EscritorLotes, ResultadoEscritura
+
+
+class FuenteDatos(ABC):
+    """
+    Interfaz de lectura y escritura del pipeline
+
+    Entradas: configuración, packs, SKUs excluidos, ventas, stock, tránsito,
+    cotizaciones y compras. Salidas: predicciones (upsert por sku y día),
+    métricas y alertas.
+    """
+
+    nombre = 'fuente'
+
+    # --- Entradas ---
+
+    @abstractmethod
+    def configuracion(self) -> Dict[str, float]:
+        """Parámetros de `configuracion_sistema` ({clave: valor})"""
+
+    @abstractmethod
+    def packs(self) -> List[dict]:
+        """Filas de `packs` (sku_pack, sku_componente, cantidad)"""
+
+    @abstractmethod
+    def skus_excluidos(self) -> Set[str]:
+        ...
+
+    @abstractmethod
+    def ventas(self, desde, incluir_desde: bool = True) -> pd.DataFrame:
+        """Ventas desde `desde` (posteriores si `incluir_desde` es False), con `ESQUEMA_VENTAS`"""
+
+    @abstractmethod
+    def stock(self) -> pd.DataFrame:
+        """Stock actual con `ESQUEMA_STOCK`"""
+
+    @abstractmethod
+    def transito_china(self) -> List[dict]:
+        """Filas de `transito_china` en estado 'en_transito'"""
+
+    @abstractmethod
+    def cotizaciones(self, estados: Sequence[str]) -> List[dict]:
+        """Filas de `cotizaciones` en alguno de los `estados`"""
+
+    @abstractmethod
+    def compras(self, desde=None) -> pd.DataFrame:
+        """Compras (todas, o posteriores a `desde`) con `ESQUEMA_COMPRAS`"""
+
+    # --- Resultados ---
+
+    @abstractmethod
+    def upsert_predicciones(self, registros: List[dict]) -> ResultadoEscritura:
+        """Inserta o actualiza predicciones por (sku, dia_calculo)"""
+
+    @abstractmethod
+    def skus_con_prediccion(self, dia: str) -> Set[str]:
+        """SKUs con predicción guardada el día `dia` (ISO)"""
+
+    @abstractmethod
+    def borrar_predicciones(self, dia: str, skus: Sequence[str]) -> None:
+        ...
+
+    @abstractmethod
+    def insertar_metricas(self, metricas: dict) -> None:
+        ...
+
+    @abstractmethod
+    def insertar_alertas(self, alertas: List[dict]) -> None:
+        ...
+
+
+# =====================================================================
+# SUPABASE
+# =====================================================================
+
+class FuenteSupabase(FuenteDatos):
+    """
+    Tablas de Supabase (o de un PostgREST con la misma interfaz)
+
+    Args:
+        cliente: Cliente con `.table(nombre)`
+        concurrencia_carga: Requests simultáneos al descargar tablas
+        concurrencia_escritura: Requests simultáneos al guardar predicciones
+    """
+
+    nombre = 'supabase'
+
+    def __init__(self, cliente, concurrencia_carga: int = 4, concurrencia_escritura: int = 4):
+        self.cliente = cliente
+        self.cargador = CargadorPaginado(cliente, max_concurrencia=concurrencia_carga)
+        self.escritor = EscritorLotes(cliente, max_concurrencia=concurrencia_escritura)
+
+    @classmethod
+    def desde_entorno(cls) -> 'FuenteSupabase':
+        """Conecta con SUPABASE_URL y SUPABASE_SERVICE_KEY"""
+        url = os.getenv('SUPABASE_URL')
+        key = os.getenv('SUPABASE_SERVICE_KEY')
+        if not url or not key:
+            raise ValueError("Faltan credenciales de Supabase en variables de entorno")
+
+        from supabase import create_client
+
+        return cls(
+            create_client(url, key),
+            concurrencia_carga=int(os.getenv('FORECAST_CONCURRENCIA_CARGA', '4')),
+            concurrencia_escritura=int(os.getenv('FORECAST_CONCURRENCIA_ESCRITURA', '4'))
+        )
+
+    def configuracion(self) -> Dict[str, float]:
+        response = self.cliente.table('configuracion_sistema').select('*').execute()
+        return {item['clave']: float(item['valor']) for item in response.data or []}
+
+    def packs(self) -> List[dict]:
+        return self.cliente.table('packs').select('*').execute().data or []
+
+    def skus_excluidos(self) -> Set[str]:
+        response = self.cliente.table('skus_excluidos').select('sku').execute()
+        return {row['sku'] for row in response.data or []}
+
+    def ventas(self, desde, incluir_desde: bool = True) -> pd.DataFrame:
+        return self._cargar(
+            'ventas_historicas', ESQUEMA_VENTAS,
+            columna_fecha='fecha', desde=desde, incluir_desde=incluir_desde
+        )
+
+    def stock(self) -> pd.DataFrame:
+        return self._cargar('stock_actual', ESQUEMA_STOCK)
+
+    def transito_china(self) -> List[dict]:
+        response = self.cliente.table('transito_china') \
+            .select('*') \
+            .filter('estado', 'eq', 'en_transito') \
+            .execute()
+        return response.data or []
+
+    def cotizaciones(self, estados: Sequence[str]) -> List[dict]:
+        response = self.cliente.table('cotizaciones') \
+            .select('*') \
+            .in_('estado', list(estados)) \
+            .execute()
+        return response.data or []
+
+    def compras(self, desde=None) -> pd.DataFrame:
+        if desde is None:
+            return self._cargar('compras', ESQUEMA_COMPRAS)
+        return self._cargar(
+            'compras', ESQUEMA_COMPRAS, columna_fecha='fecha', desde=desde, incluir_desde=False
+        )
+
+    def upsert_predicciones(self, registros: List[dict]) -> ResultadoEscritura:
+        return self.escritor.upsert('predicciones', registros, on_conflict='sku,dia_calculo')
+
+    def skus_con_prediccion(self, dia: str) -> Set[str]:
+        resultado = self.cargador.cargar(
+            'predicciones', columnas='sku', filtros=[('eq', 'dia_calculo', dia)]
+        )
+        return {fila['sku'] for fila in resultado.filas}
+
+    def borrar_predicciones(self, dia: str, skus: Sequence[str]) -> None:
+        skus = list(skus)
+        for i in range(0, len(skus), 200):
+            self.cliente.table('predicciones') \
+                .delete() \
+                .eq('dia_calculo', dia) \
+                .in_('sku', skus[i:i + 200]) \
+                .execute()
+
+    def insertar_metricas(self, metricas: dict) -> None:
+        self.cliente.table('metricas_modelo').insert(metricas).execute()
+
+    def insertar_alertas(self, alertas: List[dict]) -> None:
+        self.cliente.table('alertas_inventario').insert(alertas).execute()
+
+    def _cargar(self, tabla: str, esquema: Dict[str, str], **kwargs) -> pd.DataFrame:
+        """Descarga las columnas del esquema y las decodifica, informando tiempos y memoria"""
+        resultado = self.cargador.cargar(tabla, columnas=','.join(esquema), **kwargs)
+        print(
+            f"   ✓ {len(resultado.filas)} registros en {resultado.segundos:.1f}s "
+            f"({resultado.filas_por_segundo:,.0f} filas/s, {resultado.paginas} requests, "
+            f"{resultado.tramos} tramos)"
+        )
+        if not resultado.filas:
+            return pd.DataFrame()
+
+        inicio = time.perf_counter()
+        df = filas_a_dataframe(resultado.filas, esquema)
+        _reportar_decodificacion(df, time.perf_counter() - inicio)
+        return df
+
+
+# =====================================================================
+# SQLITE LOCAL
+# =====================================================================
+
+# Mismas tablas y columnas que en Supabase (solo las que usa el pipeline)
+TABLAS_SQLITE = """
+CREATE TABLE IF NOT EXISTS configuracion_sistema (clave TEXT PRIMARY KEY, valor REAL);
+CREATE TABLE IF NOT EXISTS packs (sku_pack TEXT, sku_componente TEXT, cantidad REAL);
+CREATE TABLE IF NOT EXISTS skus_excluidos (sku TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS ventas_historicas (sku TEXT, fecha TEXT, unidades REAL, precio REAL);
+CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas_historicas(fecha);
+CREATE TABLE IF NOT EXISTS stock_actual (sku TEXT, descripcion TEXT, stock_total REAL);
+CREATE TABLE IF NOT EXISTS transito_china (sku TEXT, unidades REAL, estado TEXT);
+CREATE TABLE IF NOT EXISTS cotizaciones (sku TEXT, cantidad_cotizar REAL, estado TEXT);
+CREATE TABLE IF NOT EXISTS compras (sku TEXT, fecha TEXT, cantidad REAL);
+CREATE INDEX IF NOT EXISTS idx_compras_fecha ON compras(fecha);
+
+CREATE TABLE IF NOT EXISTS predicciones (
+    sku TEXT NOT NULL,
+    descripcion TEXT,
+    fecha_calculo TEXT,
+    dia_calculo TEXT NOT NULL,
+    venta_diaria_promedio REAL,
+    venta_diaria_p50 REAL,
+    venta_diaria_p75 REAL,
+    venta_diaria_p90 REAL,
+    desviacion_estandar REAL,
+    coeficiente_variacion REAL,
+    tendencia TEXT,
+    tasa_crecimiento_mensual REAL,
+    stock_actual REAL,
+    stock_optimo REAL,
+    stock_seguridad REAL,
+    dias_stock_actual REAL,
+    transito_china REAL,
+    sugerencia_reposicion REAL,
+    sugerencia_reposicion_p75 REAL,
+    sugerencia_reposicion_p90 REAL,
+    precio_unitario REAL,
+    valor_total_sugerencia REAL,
+    periodo_inicio TEXT,
+    periodo_fin TEXT,
+    dias_periodo INTEGER,
+    unidades_totales_periodo REAL,
+    clasificacion_abc TEXT,
+    clasificacion_xyz TEXT,
+    es_demanda_intermitente INTEGER,
+    modelo_usado TEXT,
+    observaciones TEXT,
+    alertas TEXT,
+    UNIQUE (sku, dia_calculo)
+);
+
+CREATE TABLE IF NOT EXISTS metricas_modelo (
+    fecha_calculo TEXT,
+    total_skus INTEGER,
+    mape REAL,
+    mae REAL,
+    rmse REAL,
+    bias REAL,
+    mape_abc_a REAL,
+    mape_abc_b REAL,
+    mape_abc_c REAL,
+    skus_con_prediccion INTEGER,
+    skus_sin_datos INTEGER,
+    tiempo_ejecucion_segundos REAL,
+    etapas TEXT,
+    backtesting TEXT
+);
+
+CREATE TABLE IF NOT EXISTS alertas_inventario (
+    sku TEXT,
+    tipo_alerta TEXT,
+    severidad TEXT,
+    mensaje TEXT,
+    valor_actual REAL,
+    valor_esperado REAL,
+    estado TEXT
+);
+"""
+
+# Columnas agregadas después de crear la tabla (archivos SQLite existentes)
+COLUMNAS_AGREGADAS_SQLITE = {
+    'metricas_modelo': {'backtesting': 'TEXT'}
+}
+
+
+class FuenteSQLite(FuenteDatos):
+    """
+    Tablas del pipeline en un archivo SQLite
+
+    Las fechas se guardan como texto ISO. Los campos JSON (alertas de una
+    predicción, etapas y backtesting de las métricas) se guardan serializados. La conexión
+    se comparte entre hilos (el escritor del modo streaming) con un lock.
+
+    Args:
+        ruta: Archivo SQLite (se crea con las tablas si no existe)
+    """
+
+    nombre = 'sqlite'
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conexion.executescript(TABLAS_SQLITE)
+            self._agregar_columnas()
+
+    def _agregar_columnas(self) -> None:
+        """Agrega a las tablas existentes las columnas de COLUMNAS_AGREGADAS_SQLITE que falten"""
+        for tabla, columnas in COLUMNAS_AGREGADAS_SQLITE.items():
+            existentes = {fila[1] for fila in self.conexion.execute(f"PRAGMA table_info({tabla})")}
+            for columna, tipo in columnas.items():
+                if columna not in existentes:
+                    self.conexion.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {tipo}")
+
+    def escribir_tabla(self, tabla: str, df: pd.DataFrame, reemplazar: bool = True) -> int:
+        """
+        Carga un DataFrame en una tabla de entrada (columnas con los mismos
+        nombres). Con `reemplazar`, borra antes el contenido de la tabla.
+        """
+        columnas = list(df.columns)
+        valores = {}
+        for columna in columnas:
+            serie = df[columna]
+            if pd.api.types.is_datetime64_any_dtype(serie):
+                serie = serie.dt.strftime('%Y-%m-%d')
+            valores[columna] = serie.astype(object).where(serie.notna(), None).tolist()
+        filas = list(zip(*(valores[columna] for columna in columnas)))
+
+        with self.lock, self.conexion:
+            if reemplazar:
+                self.conexion.execute(f"DELETE FROM {tabla}")
+            if not filas:
+                return 0
+            self.conexion.executemany(
+                f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                filas
+            )
+        return len(filas)
+
+    def configuracion(self) -> Dict[str, float]:
+        return {clave: float(valor) for clave, valor in self._consultar(
+            "SELECT clave, valor FROM configuracion_sistema"
+        )}
+
+    def packs(self) -> List[dict]:
+        return [
+            {'sku_pack': pack, 'sku_componente': componente, 'cantidad': cantidad}
+            for pack, componente, cantidad in self._consultar(
+                "SELECT sku_pack, sku_componente, cantidad FROM packs ORDER BY rowid"
+            )
+        ]
+
+    def skus_excluidos(self) -> Set[str]:
+        return {sku for (sku,) in self._consultar("SELECT sku FROM skus_excluidos")}
+
+    def ventas(self, desde, incluir_desde: bool = True) -> pd.DataFrame:
+        operador = '>=' if incluir_desde else '>'
+        return self._leer(
+            f"SELECT sku, fecha, unidades, precio FROM ventas_historicas "
+            f"WHERE fecha {operador} ? ORDER BY fecha, rowid",
+            (_texto_fecha(desde),), ESQUEMA_VENTAS
+        )
+
+    def stock(self) -> pd.DataFrame:
+        return self._leer(
+            "SELECT sku, descripcion, stock_total FROM stock_actual ORDER BY rowid", (), ESQUEMA_STOCK
+        )
+
+    def transito_china(self) -> List[dict]:
+        return [
+            {'sku': sku, 'unidades': unidades, 'estado': estado}
+            for sku, unidades, estado in self._consultar(
+                "SELECT sku, unidades, estado FROM transito_china WHERE estado = 'en_transito'"
+            )
+        ]
+
+    def cotizaciones(self, estados: Sequence[str]) -> List[dict]:
+        estados = list(estados)
+        return [
+            {'sku': sku, 'cantidad_cotizar': cantidad, 'estado': estado}
+            for sku, cantidad, estado in self._consultar(
+                f"SELECT sku, cantidad_cotizar, estado FROM cotizaciones "
+                f"WHERE estado IN ({', '.join('?' * len(estados))})",
+                estados
+            )
+        ]
+
+    def compras(self, desde=None) -> pd.DataFrame:
+        if desde is None:
+            return self._leer(
+                "SELECT sku, fecha, cantidad FROM compras ORDER BY fecha, rowid", (), ESQUEMA_COMPRAS
+            )
+        return self._leer(
+            "SELECT sku, fecha, cantidad FROM compras WHERE fecha > ? ORDER BY fecha, rowid",
+            (_texto_fecha(desde),), ESQUEMA_COMPRAS
+        )
+
+    def upsert_predicciones(self, registros: List[dict]) -> ResultadoEscritura:
+        inicio = time.perf_counter()
+        resultado = ResultadoEscritura()
+
+        if registros:
+            columnas = list(registros[0])
+            actualizar = [c for c in columnas if c not in ('sku', 'dia_calculo')]
+            sql = (
+                f"INSERT INTO predicciones ({', '.join(columnas)}) "
+                f"VALUES ({', '.join('?' * len(columnas))}) "
+                f"ON CONFLICT (sku, dia_calculo) DO UPDATE SET "
+                + ', '.join(f"{c} = excluded.{c}" for c in actualizar)
+            )
+            with self.lock, self.conexion:
+                self.conexion.executemany(sql, [_fila_sqlite(r, columnas) for r in registros])
+            resultado.filas = len(registros)
+            resultado.lotes = 1
+
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+    def skus_con_prediccion(self, dia: str) -> Set[str]:
+        return {sku for (sku,) in self._consultar(
+            "SELECT sku FROM predicciones WHERE dia_calculo = ?", (dia,)
+        )}
+
+    def borrar_predicciones(self, dia: str, skus: Sequence[str]) -> None:
+        with self.lock, self.conexion:
+            self.conexion.executemany(
+                "DELETE FROM predicciones WHERE dia_calculo = ? AND sku = ?",
+                [(dia, sku) for sku in skus]
+            )
+
+    def insertar_metricas(self, metricas: dict) -> None:
+        self._insertar('metricas_modelo', [metricas])
+
+    def insertar_alertas(self, alertas: List[dict]) -> None:
+        self._insertar('alertas_inventario', alertas)
+
+    def _consultar(self, sql: str, parametros: Sequence = ()) -> List[tuple]:
+        with self.lock:
+            return self.conexion.execute(sql, parametros).fetchall()
+
+    def _leer(self, sql: str, parametros: Sequence, esquema: Dict[str, str]) -> pd.DataFrame:
+        """Lee una consulta con las columnas del esquema y la decodifica"""
+        inicio = time.perf_counter()
+        filas = self._consultar(sql, parametros)
+        print(f"   ✓ {len(filas)} registros leídos de {self.ruta} en {time.perf_counter() - inicio:.1f}s")
+        if not filas:
+            return pd.DataFrame()
+
+        inicio = time.perf_counter()
+        df = columnas_a_dataframe(dict(zip(esquema, zip(*filas))), esquema)
+        _reportar_decodificacion(df, time.perf_counter() - inicio)
+        return df
+
+    def _insertar(self, tabla: str, registros: List[dict]) -> None:
+        if not registros:
+            return
+        columnas = list(registros[0])
+        with self.lock, self.conexion:
+            self.conexion.executemany(
+                f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                [_fila_sqlite(r, columnas) for r in registros]
+            )
+
+
+def _fila_sqlite(registro: dict, columnas: List[str]) -> tuple:
+    """Valores de un registro JSON para SQLite (listas y dicts serializados)"""
+    return tuple(
+        json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else v
+        for v in (registro.get(c) for c in columnas)
+    )
+
+
+def _texto_fecha(valor) -> str:
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d')
+    return str(valor)[:10]
+
+
+def _reportar_decodificacion(df: pd.DataFrame, segundos: float) -> None:
+    memoria_mb = df.memory_usage(deep=True).sum() / 1024 / 1024
+    print(f"   ✓ Decodificado en {segundos:.2f}s ({memoria_mb:.1f} MB en memoria)")
+
+
+# =====================================================================
+# SELECCIÓN
+# =====================================================================
+
+def fuente_desde_entorno(fuente: Optional[str] = None) -> FuenteDatos:
+    """
+    Fuente según FORECAST_FUENTE: 'supabase' (por defecto) o 'sqlite', con
+    el archivo en FORECAST_SQLITE
+    """
+    fuente = fuente or os.getenv('FORECAST_FUENTE', 'supabase')
+    if fuente == 'sqlite':
+        return FuenteSQLite(os.getenv('FORECAST_SQLITE', 'datos/forecast.sqlite'))
+    if fuente == 'supabase':
+        return FuenteSupabase.desde_entorno()
+    raise ValueError(f"FORECAST_FUENTE desconocida: {fuente}")
@@ -0,0 +1,186 @@
+"""
+Instrumentación del Pipeline de Forecasting
+Tiempo, CPU, memoria y throughput por etapa, más latencias por SKU
+
+Cada etapa se mide con un context manager:
+
+    with instrumentacion.etapa('carga_ventas', unidad='filas') as medicion:
+        df = cargar()
+        medicion.elementos = len(df)
+
+Se registra tiempo de reloj, tiempo de CPU del proceso, pico de memoria
+Python de la etapa (tracemalloc, opcional porque agrega overhead) y RSS
+máximo del proceso al terminarla. Las latencias por SKU se agregan en un
+histograma logarítmico con los SKUs más lentos.
+"""
+
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+# Límites del histograma de latencias por SKU (segundos)
+LIMITES_LATENCIA = (1e-5, 3e-5, 1e-4, 3e-4, 1e-3, 3e-3, 1e-2, 3e-2, 1e-1, 3e-1, 1.0, 3.0)
+
+
+def rss_maximo_mb() -> float:
+    """RSS máximo del proceso (ru_maxrss está en KB en Linux y en bytes en macOS)"""
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / 1024 / 1024 if sys.platform == 'darwin' else maximo / 1024
+
+
+@dataclass
+class MedicionEtapa:
+    """Métricas de una etapa del pipeline"""
+    nombre: str
+    unidad: str = 'filas'
+    nivel: int = 0  # Profundidad de anidamiento
+    elementos: int = 0
+    segundos: float = 0.0
+    cpu_segundos: float = 0.0
+    pico_memoria_mb: Optional[float] = None
+    rss_maximo_mb: float = 0.0
+
+    @property
+    def por_segundo(self) -> float:
+        return self.elementos / self.segundos if self.segundos > 0 else 0.0
+
+    def a_dict(self) -> Dict:
+        datos = asdict(self)
+        datos['por_segundo'] = self.por_segundo
+        return datos
+
+
+@dataclass
+class Instrumentacion:
+    """Mediciones de las etapas de una corrida"""
+    trazar_memoria: bool = True
+    etapas: List[MedicionEtapa] = field(default_factory=list)
+    latencias_sku: Dict[str, float] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.inicio = time.perf_counter()
+        self.inicio_cpu = time.process_time()
+        # Etapas abiertas y sus picos de tracemalloc (las etapas se pueden anidar)
+        self._abiertas: List[int] = []
+        self._picos_abiertos: List[float] = []
+        if self.trazar_memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def etapa(self, nombre: str, unidad: str = 'filas'):
+        medicion = MedicionEtapa(nombre=nombre, unidad=unidad, nivel=len(self._picos_abiertos))
+        self.etapas.append(medicion)
+
+        if self.trazar_memoria:
+            # reset_peak es global: el pico de la etapa que contiene a esta se guarda antes
+            if self._picos_abiertos:
+                self._picos_abiertos[-1] = max(self._picos_abiertos[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._abiertas.append(id(medicion))
+        self._picos_abiertos.append(0.0)
+
+        inicio = time.perf_counter()
+        inicio_cpu = time.process_time()
+        try:
+            yield medicion
+        finally:
+            medicion.segundos = time.perf_counter() - inicio
+            medicion.cpu_segundos = time.process_time() - inicio_cpu
+            medicion.rss_maximo_mb = rss_maximo_mb()
+
+            self._abiertas.pop()
+            pico = self._picos_abiertos.pop()
+            if self.trazar_memoria:
+                pico = max(pico, tracemalloc.get_traced_memory()[1])
+                medicion.pico_memoria_mb = pico / 1024 / 1024
+                if self._picos_abiertos:
+                    self._picos_abiertos[-1] = max(self._picos_abiertos[-1], pico)
+
+    def segundos_totales(self) -> float:
+        return time.perf_counter() - self.inicio
+
+    def etapas_terminadas(self) -> List[MedicionEtapa]:
+        """Etapas ya medidas (sin las que contienen al código en curso)"""
+        return [m for m in self.etapas if id(m) not in self._abiertas]
+
+    def histograma_latencias(self, n_lentos: int = 10) -> Dict:
+        """Conteo por rango de latencia, percentiles y los SKUs más lentos"""
+        if not self.latencias_sku:
+            return {}
+
+        skus = list(self.latencias_sku)
+        segundos = np.fromiter(self.latencias_sku.values(), dtype=float, count=len(skus))
+
+        limites = np.array(LIMITES_LATENCIA)
+        conteos = np.bincount(np.searchsorted(limites, segundos, side='right'), minlength=len(limites) + 1)
+        etiquetas = (
+            [f"< {_formato_latencia(limites[0])}"]
+            + [f"{_formato_latencia(a)}-{_formato_latencia(b)}" for a, b in zip(limites[:-1], limites[1:])]
+            + [f">= {_formato_latencia(limites[-1])}"]
+        )
+
+        lentos = np.argsort(segundos)[::-1][:n_lentos]
+        p50, p90, p99 = np.percentile(segundos, [50, 90, 99])
+
+        return {
+            'skus': len(skus),
+            'total_segundos': float(segundos.sum()),
+            'p50': float(p50),
+            'p90': float(p90),
+            'p99': float(p99),
+            'maximo': float(segundos.max()),
+            'rangos': {etiqueta: int(n) for etiqueta, n in zip(etiquetas, conteos) if n},
+            'mas_lentos': [{'sku': skus[i], 'segundos': float(segundos[i])} for i in lentos]
+        }
+
+    def reporte(self) -> Dict:
+        return {
+            'segundos_totales': self.segundos_totales(),
+            'cpu_segundos_totales': time.process_time() - self.inicio_cpu,
+            'rss_maximo_mb': rss_maximo_mb(),
+            'etapas': [medicion.a_dict() for medicion in self.etapas],
+            'latencias_sku': self.histograma_latencias()
+        }
+
+    def guardar_json(self, ruta: str) -> None:
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(self.reporte(), archivo, indent=2, ensure_ascii=False)
+
+    def resumen_texto(self) -> str:
+        """Tabla de etapas y SKUs más lentos para el resumen"""
+        lineas = [f"{'Etapa':<22}{'Seg':>8}{'CPU':>8}{'Pico MB':>9}{'RSS MB':>8}  Throughput"]
+        for m in self.etapas_terminadas():
+            pico = f"{m.pico_memoria_mb:.1f}" if m.pico_memoria_mb is not None else '-'
+            throughput = f"{m.por_segundo:,.0f} {m.unidad}/s" if m.elementos else ''
+            nombre = '  ' * m.nivel + m.nombre
+            lineas.append(
+                f"{nombre:<22}{m.segundos:>8.2f}{m.cpu_segundos:>8.2f}{pico:>9}{m.rss_maximo_mb:>8.0f}  {throughput}"
+            )
+
+        histograma = self.histograma_latencias(n_lentos=5)
+        if histograma:
+            lineas.append("")
+            lineas.append(
+                f"Latencia por SKU: p50 {_formato_latencia(histograma['p50'])}, "
+                f"p90 {_formato_latencia(histograma['p90'])}, p99 {_formato_latencia(histograma['p99'])}"
+            )
+            for lento in histograma['mas_lentos']:
+                lineas.append(f"  - {lento['sku']}: {_formato_latencia(lento['segundos'])}")
+
+        return "\n".join(lineas)
+
+
+def _formato_latencia(segundos: float) -> str:
+    if segundos < 1e-3:
+        return f"{segundos * 1e6:.0f}µs"
+    if segundos < 1:
+        return f"{segundos * 1e3:.1f}ms"
+    return f"{segundos:.2f}s"
@@ -0,0 +1,740 @@
+"""
+Motor Vectorizado sobre el Panel SKU × Día
+Cálculos de `AlgoritmoMLAvanzado` ejecutados para todos los SKUs a la vez
+
+Todas las funciones reciben matrices (n_skus, n_dias) de `panel_demanda` más
+los rangos válidos por SKU (`inicio`, `fin`, inclusive) y devuelven arrays
+por SKU. No hay loops Python sobre SKUs.
+"""
+
+import warnings
+import numpy as np
+from typing import Sequence, Tuple
+
+
+def mascara_rango(inicio: np.ndarray, fin: np.ndarray, n_dias: int) -> np.ndarray:
+    """Máscara (n_skus, n_dias) con True dentro del rango válido de cada SKU"""
+    dias = np.arange(n_dias)
+    return (dias >= inicio[:, None]) & (dias <= fin[:, None])
+
+
+# =====================================================================
+# STOCKOUTS
+# =====================================================================
+
+def stock_inicial_panel(
+    compras: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    respaldo: np.ndarray
+) -> np.ndarray:
+    """
+    Stock inicial estimado por SKU
+
+    Cantidad del primer día con compras dentro del rango válido; si el SKU
+    no tiene compras en su rango, se usa `respaldo` (ej. 30 días de venta).
+    """
+    n_skus, n_dias = compras.shape
+    positivas = (compras > 0) & mascara_rango(inicio, fin, n_dias)
+    hay_compras = positivas.any(axis=1)
+    primera = positivas.argmax(axis=1)
+
+    return np.where(hay_compras, compras[np.arange(n_skus), primera], respaldo)
+
+
+def reconstruir_stock_panel(
+    ventas: np.ndarray,
+    compras: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    stock_inicial: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reconstruye el stock diario de todos los SKUs con sumas acumuladas
+
+    Stock_inicio = stock_inicial
+    Stock_t = Stock_t-1 + Compras_t - Ventas_t   (inicio < t <= fin)
+
+    Returns:
+        (stock, stockout): stock diario (n_skus, n_dias) y máscara de días
+        dentro del rango válido con stock <= 0
+    """
+    n_dias = ventas.shape[1]
+    dias = np.arange(n_dias)
+
+    valida = (dias >= inicio[:, None]) & (dias <= fin[:, None])
+    movimientos = np.where(valida & (dias > inicio[:, None]), compras - ventas, 0.0)
+
+    stock = stock_inicial[:, None] + np.cumsum(movimientos, axis=1)
+    stockout = valida & (stock <= 0)
+
+    return stock, stockout
+
+
+def dias_con_stock_panel(
+    ventas: np.ndarray,
+    compras: np.ndarray,
+    tiene_compras: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    venta_diaria_promedio: np.ndarray
+) -> np.ndarray:
+    """
+    Máscara (n_skus, n_dias) de días válidos con stock disponible
+
+    Para SKUs sin historial de compras no se puede reconstruir el stock y se
+    consideran todos los días del rango. Es la máscara que usan las
+    estadísticas de demanda y el stock de seguridad.
+    """
+    n_dias = ventas.shape[1]
+    valida = mascara_rango(inicio, fin, n_dias)
+
+    if not tiene_compras.any():
+        return valida
+
+    stock_inicial = stock_inicial_panel(compras, inicio, fin, venta_diaria_promedio * 30)
+    _, stockout = reconstruir_stock_panel(ventas, compras, inicio, fin, stock_inicial)
+
+    return valida & ~(stockout & tiene_compras[:, None])
+
+
+# =====================================================================
+# MODELOS DE DEMANDA
+# =====================================================================
+
+def ewma_panel(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    alpha: float,
+    nivel_inicial: np.ndarray = None
+) -> np.ndarray:
+    """
+    Nivel EWMA final (adjust=False) de cada SKU
+
+    Filtro recursivo lineal a lo largo del eje temporal, vectorizado sobre
+    SKUs: nivel_inicio = x_inicio, nivel_t = (1 - alpha) * nivel_t-1 + alpha * x_t.
+    Cada SKU arranca en su propio `inicio` y se congela después de `fin`.
+
+    Con `nivel_inicial`, los SKUs con un nivel no-NaN continúan desde ese
+    nivel (el día `inicio` también se actualiza) en vez de inicializarse.
+    """
+    n_skus, n_dias = ventas.shape
+    if nivel_inicial is None:
+        nivel = np.zeros(n_skus)
+        continua = np.zeros(n_skus, dtype=bool)
+    else:
+        continua = ~np.isnan(nivel_inicial)
+        nivel = np.where(continua, nivel_inicial, 0.0)
+
+    if n_skus == 0:
+        return nivel
+
+    reinicia = ~continua
+    for t in range(max(int(inicio.min()), 0), min(int(fin.max()) + 1, n_dias)):
+        x = ventas[:, t]
+        actualizado = (1 - alpha) * nivel + alpha * x
+        nivel = np.where(
+            (t == inicio) & reinicia,
+            x,
+            np.where((t >= inicio) & (t <= fin), actualizado, nivel)
+        )
+
+    return nivel
+
+
+def niveles_ewma_panel(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    alpha: float,
+    cortes: np.ndarray
+) -> np.ndarray:
+    """
+    Nivel EWMA de cada SKU al cierre de cada día de `cortes` (n_skus, n_cortes)
+
+    Mismo filtro que `ewma_panel`, en una sola pasada por los días: el nivel
+    al cierre del día c usa solo los días <= c, así que todos los cortes
+    salen del mismo recorrido. SKUs que aún no empiezan quedan en 0.
+    """
+    n_skus, n_dias = ventas.shape
+    cortes = np.asarray(cortes, dtype=np.int64)
+    niveles = np.zeros((n_skus, len(cortes)))
+    if n_skus == 0 or len(cortes) == 0:
+        return niveles
+
+    nivel = np.zeros(n_skus)
+    desde = max(int(inicio.min()), 0)
+    for t in range(desde, min(int(cortes.max()) + 1, n_dias)):
+        x = ventas[:, t]
+        actualizado = (1 - alpha) * nivel + alpha * x
+        nivel = np.where(t == inicio, x, np.where((t >= inicio) & (t <= fin), actualizado, nivel))
+        niveles[:, cortes == t] = nivel[:, None]
+
+    return niveles
+
+
+def tasa_intermitencia_panel(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray
+) -> np.ndarray:
+    """Fracción de días sin venta dentro del rango válido de cada SKU"""
+    valida = mascara_rango(inicio, fin, ventas.shape[1])
+    largo = np.maximum(fin - inicio + 1, 0)
+    dias_sin_venta = ((ventas == 0) & valida).sum(axis=1)
+
+    return np.divide(
+        dias_sin_venta,
+        largo,
+        out=np.zeros(len(largo)),
+        where=largo > 0
+    )
+
+
+def croston_desde_conteos(
+    n_ventas: np.ndarray,
+    suma: np.ndarray,
+    primera: np.ndarray,
+    ultima: np.ndarray,
+    largo: np.ndarray
+) -> np.ndarray:
+    """
+    Forecast Croston a partir de sus estadísticos por SKU
+
+    promedio de demanda no-cero / intervalo promedio entre ventas, donde el
+    intervalo es (última - primera) / (n - 1). Con una sola venta el
+    intervalo es el largo del rango; sin ventas el forecast es 0.
+    """
+    promedio_demanda = suma / np.maximum(n_ventas, 1)
+    intervalo = np.where(
+        n_ventas > 1,
+        (ultima - primera) / np.maximum(n_ventas - 1, 1),
+        largo
+    )
+
+    forecast = np.where(
+        intervalo > 0,
+        promedio_demanda / np.where(intervalo > 0, intervalo, 1),
+        promedio_demanda
+    )
+    return np.where(n_ventas > 0, forecast, 0.0)
+
+
+def croston_panel(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray
+) -> np.ndarray:
+    """Forecast Croston de cada SKU sobre su rango válido"""
+    n_dias = ventas.shape[1]
+    positivas = (ventas > 0) & mascara_rango(inicio, fin, n_dias)
+
+    n_ventas = positivas.sum(axis=1)
+    suma = np.where(positivas, ventas, 0.0).sum(axis=1)
+    primera = positivas.argmax(axis=1)
+    ultima = n_dias - 1 - positivas[:, ::-1].argmax(axis=1)
+
+    return croston_desde_conteos(n_ventas, suma, primera, ultima, fin - inicio + 1)
+
+
+# =====================================================================
+# OUTLIERS Y PERCENTILES
+# =====================================================================
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Interpolación lineal con la misma fórmula que usa np.percentile"""
+    diferencia = b - a
+    return np.where(t >= 0.5, b - diferencia * (1 - t), a + diferencia * t)
+
+
+def percentiles_por_grupo(
+    valores: np.ndarray,
+    codigos: np.ndarray,
+    n_grupos: int,
+    percentiles: Sequence[float]
+) -> np.ndarray:
+    """
+    Percentiles (método lineal) de cada grupo con un único ordenamiento
+
+    Equivale a llamar `np.percentile(valores[codigos == g], p)` por grupo,
+    pero ordena todos los valores una sola vez por (grupo, valor) y resuelve
+    cada percentil con aritmética de índices. Los NaN se ignoran.
+
+    Returns:
+        Array (len(percentiles), n_grupos); NaN para grupos vacíos
+    """
+    validos = ~np.isnan(valores)
+    valores = valores[validos]
+    codigos = codigos[validos]
+
+    ordenados = valores[np.lexsort((valores, codigos))]
+    n = np.bincount(codigos, minlength=n_grupos)
+    inicios = np.concatenate(([0], np.cumsum(n)[:-1]))
+
+    resultado = np.full((len(percentiles), n_grupos), np.nan)
+    hay = n > 0
+    n, inicios = n[hay], inicios[hay]
+
+    for k, p in enumerate(percentiles):
+        virtual = (n - 1) * (p / 100)
+        previo = np.floor(virtual)
+        gamma = virtual - previo
+        previo = previo.astype(np.int64)
+        siguiente = np.minimum(previo + 1, n - 1)
+        resultado[k, hay] = _lerp(
+            ordenados[inicios + previo],
+            ordenados[inicios + siguiente],
+            gamma
+        )
+
+    return resultado
+
+
+def limites_iqr_por_grupo(
+    valores: np.ndarray,
+    codigos: np.ndarray,
+    n_grupos: int,
+    multiplicador: float = 1.5
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Límites [Q1 - k·IQR, Q3 + k·IQR] de cada grupo (SKU)
+
+    Un grupo con algún NaN no tiene cuartiles (límites NaN), igual que con
+    np.percentile.
+    """
+    q1, q3 = percentiles_por_grupo(valores, codigos, n_grupos, (25, 75))
+
+    con_nan = np.bincount(codigos, weights=np.isnan(valores), minlength=n_grupos) > 0
+    q1[con_nan] = np.nan
+    q3[con_nan] = np.nan
+
+    iqr = q3 - q1
+    return q1 - multiplicador * iqr, q3 + multiplicador * iqr
+
+
+def mascara_outliers_iqr(
+    valores: np.ndarray,
+    codigos: np.ndarray,
+    n_grupos: int,
+    multiplicador: float = 1.5
+) -> np.ndarray:
+    """
+    Máscara de filas dentro de [Q1 - k·IQR, Q3 + k·IQR] de su grupo (SKU)
+
+    Las filas de un grupo sin cuartiles (con algún NaN) quedan todas fuera.
+    """
+    limite_inferior, limite_superior = limites_iqr_por_grupo(
+        valores, codigos, n_grupos, multiplicador
+    )
+
+    return (valores >= limite_inferior[codigos]) & (valores <= limite_superior[codigos])
+
+
+def estadisticas_panel(
+    ventas: np.ndarray,
+    con_stock: np.ndarray,
+    respaldo: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    P50/P75/P90 de los días con venta y desviación estándar por SKU
+
+    Solo se usan los días de `con_stock`. Los percentiles se calculan sobre
+    los días con venta > 0 y la desviación (ddof=1) sobre todos los días con
+    stock. SKUs sin ningún día con venta usan `respaldo` como percentiles y
+    desviación 0.
+
+    Returns:
+        (p50, p75, p90, desviacion_estandar)
+    """
+    n_skus = ventas.shape[0]
+    no_cero = con_stock & (ventas > 0)
+    hay_ventas = no_cero.any(axis=1)
+
+    filas, dias = np.nonzero(no_cero)
+    p50, p75, p90 = percentiles_por_grupo(ventas[filas, dias], filas, n_skus, (50, 75, 90))
+
+    with warnings.catch_warnings():
+        # SKUs con un solo día con stock: ddof=1 → NaN, igual que antes
+        warnings.simplefilter('ignore', RuntimeWarning)
+        desviacion = np.nanstd(np.where(con_stock, ventas, np.nan), axis=1, ddof=1)
+
+    return (
+        np.where(hay_ventas, p50, respaldo),
+        np.where(hay_ventas, p75, respaldo),
+        np.where(hay_ventas, p90, respaldo),
+        np.where(hay_ventas, desviacion, 0.0)
+    )
+
+
+def momentos_panel(
+    ventas: np.ndarray,
+    mascara: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Momentos (n, media, M2) de los días de `mascara` de cada SKU
+
+    M2 es la suma de cuadrados centrada, así que la varianza muestral es
+    M2 / (n - 1). Se combinan entre tramos con `combinar_momentos`.
+    """
+    n = mascara.sum(axis=1)
+    suma = np.where(mascara, ventas, 0.0).sum(axis=1)
+    media = np.divide(suma, n, out=np.zeros(len(n)), where=n > 0)
+    m2 = np.where(mascara, (ventas - media[:, None]) ** 2, 0.0).sum(axis=1)
+
+    return n, media, m2
+
+
+def combinar_momentos(
+    n_a: np.ndarray,
+    media_a: np.ndarray,
+    m2_a: np.ndarray,
+    n_b: np.ndarray,
+    media_b: np.ndarray,
+    m2_b: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Une los momentos de dos tramos disjuntos (fórmula de Chan et al.)"""
+    n = n_a + n_b
+    delta = media_b - media_a
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media = np.where(n > 0, media_a + delta * n_b / n, 0.0)
+        m2 = np.where(n > 0, m2_a + m2_b + delta * delta * n_a * n_b / n, 0.0)
+
+    return n, media, m2
+
+
+# =====================================================================
+# TENDENCIA
+# =====================================================================
+
+def sumas_regresion(
+    x: np.ndarray,
+    y: np.ndarray,
+    codigos: np.ndarray,
+    n_grupos: int
+) -> Tuple[np.ndarray, ...]:
+    """Estadísticos suficientes (n, Σx, Σy, Σx², Σxy, Σy²) de cada grupo"""
+    def suma(pesos):
+        return np.bincount(codigos, weights=pesos, minlength=n_grupos)
+
+    n = np.bincount(codigos, minlength=n_grupos).astype(float)
+    return n, suma(x), suma(y), suma(x * x), suma(x * y), suma(y * y)
+
+
+def regresion_desde_sumas(
+    n: np.ndarray,
+    sx: np.ndarray,
+    sy: np.ndarray,
+    sxx: np.ndarray,
+    sxy: np.ndarray,
+    syy: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Regresión lineal y ~ x de cada grupo a partir de sus sumas
+
+    Replica `scipy.stats.linregress` (p-valor bilateral, n - 2 grados de
+    libertad; con n = 2 el p-valor es 0 si y varía y 1 si no).
+
+    Returns:
+        (pendiente, intercepto, estadistico_t, p_valor). Grupos con n < 2
+        o x constante quedan en NaN.
+    """
+    from scipy import special
+
+    n = np.asarray(n, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Sumas de cuadrados centradas
+        ssx = sxx - sx * sx / n
+        ssxy = sxy - sx * sy / n
+        ssy = syy - sy * sy / n
+
+        valida = (n >= 2) & (ssx > 0)
+        ssx = np.where(valida, ssx, np.nan)
+
+        pendiente = ssxy / ssx
+        intercepto = sy / n - pendiente * sx / n
+
+        r = np.clip(ssxy / np.sqrt(ssx * ssy), -1.0, 1.0)
+        r = np.where(ssy > 0, r, np.nan)
+
+        gl = n - 2
+        tiny = 1.0e-20
+        estadistico_t = r * np.sqrt(gl / ((1.0 - r + tiny) * (1.0 + r + tiny)))
+        p_valor = 2 * special.stdtr(np.where(gl > 0, gl, 1), -np.abs(estadistico_t))
+
+    # Con dos puntos la recta pasa exacta por ambos
+    dos_puntos = valida & (n == 2)
+    p_valor = np.where(dos_puntos, np.where(ssy > 0, 0.0, 1.0), p_valor)
+    p_valor = np.where(valida, p_valor, np.nan)
+
+    return pendiente, intercepto, estadistico_t, p_valor
+
+
+def tendencia_panel(
+    x: np.ndarray,
+    y: np.ndarray,
+    codigos: np.ndarray,
+    n_grupos: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Regresión lineal y ~ x de cada grupo (SKU) en forma cerrada
+
+    Usa solo los estadísticos suficientes por grupo (n, Σx, Σy, Σxy, Σx², Σy²)
+    y evalúa la CDF t de Student una sola vez para todos los grupos.
+
+    `x` se desplaza al mínimo de cada grupo antes de acumular para no perder
+    precisión en Σx²; el intercepto queda referido a ese mínimo.
+
+    Returns:
+        (pendiente, intercepto, estadistico_t, p_valor, n). Grupos con n < 2
+        o x constante quedan en NaN.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    x_min = np.full(n_grupos, np.inf)
+    np.minimum.at(x_min, codigos, x)
+    x = x - x_min[codigos]
+
+    sumas = sumas_regresion(x, y, codigos, n_grupos)
+    pendiente, intercepto, estadistico_t, p_valor = regresion_desde_sumas(*sumas)
+
+    return pendiente, intercepto, estadistico_t, p_valor, sumas[0].astype(np.int64)
+
+
+# =====================================================================
+# REPOSICIÓN
+# =====================================================================
+
+def reposicion_panel(
+    venta: np.ndarray,
+    p50: np.ndarray,
+    p75: np.ndarray,
+    p90: np.ndarray,
+    desviacion: np.ndarray,
+    dias_stock: np.ndarray,
+    transito: np.ndarray,
+    z: np.ndarray,
+    dias_stock_deseado: np.ndarray,
+    dias_transito: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Stock de seguridad (SS = Z × σ × √LT), stock óptimo y sugerencias
+    p50/p75/p90 descontando el tránsito
+
+    Con broadcasting: arrays por SKU de forma (n_skus, 1) y parámetros
+    (`z`, `dias_stock_deseado`, `dias_transito`) de forma (n_escenarios,)
+    dan resultados (n_skus, n_escenarios); con parámetros escalares, uno
+    por SKU.
+
+    Returns:
+        (stock_seguridad, stock_optimo, sugerencia_p50, sugerencia_p75,
+        sugerencia_p90), sin redondear
+    """
+    stock_optimo_base = venta * dias_stock_deseado
+    stock_seguridad = z * desviacion * np.sqrt(dias_transito)
+    stock_seguridad = np.where((desviacion > 0) & (stock_seguridad > 0), stock_seguridad, 0.0)
+    stock_optimo = stock_optimo_base + stock_seguridad
+
+    # Con más días de stock que de tránsito, lo que se venderá mientras
+    # llega el pedido se descuenta del objetivo
+    sobrante = dias_stock > dias_transito
+    dias_sobrantes = dias_stock - dias_transito
+
+    def sugerencia(venta_escenario, objetivo):
+        valor = np.where(sobrante, objetivo - dias_sobrantes * venta_escenario, objetivo) - transito
+        return np.where(valor > 0, valor, 0.0)
+
+    return (
+        stock_seguridad,
+        stock_optimo,
+        sugerencia(p50, stock_optimo_base),
+        sugerencia(p75, stock_optimo_base + stock_seguridad * 0.5),
+        sugerencia(p90, stock_optimo_base + stock_seguridad)
+    )
+
+
+# =====================================================================
+# BACKTESTING
+# =====================================================================
+
+def _acumulada(valores: np.ndarray) -> np.ndarray:
+    """Suma acumulada por fila con una columna 0 al inicio: [:, t] = Σ días < t"""
+    acumulada = np.zeros((valores.shape[0], valores.shape[1] + 1))
+    np.cumsum(valores, axis=1, out=acumulada[:, 1:])
+    return acumulada
+
+
+def intermitencia_por_origen_panel(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    origenes: np.ndarray
+) -> np.ndarray:
+    """Fracción de días sin venta en [inicio, min(fin, origen - 1)]: (n_skus, n_origenes)"""
+    valida = mascara_rango(inicio, fin, ventas.shape[1])
+    largo = np.maximum(np.minimum(fin[:, None], origenes - 1) - inicio[:, None] + 1, 0)
+    dias_sin_venta = _acumulada(valida & (ventas == 0))[:, origenes]
+    return np.divide(dias_sin_venta, largo, out=np.zeros(largo.shape), where=largo > 0)
+
+
+def croston_por_origen_panel(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    origenes: np.ndarray
+) -> np.ndarray:
+    """
+    Forecast Croston (como `croston_panel`) con los días anteriores a cada
+    origen: n, suma, primera y última venta salen de sumas acumuladas
+    """
+    n_dias = ventas.shape[1]
+    positivas = mascara_rango(inicio, fin, n_dias) & (ventas > 0)
+    largo = np.maximum(np.minimum(fin[:, None], origenes - 1) - inicio[:, None] + 1, 0)
+
+    n_ventas = _acumulada(positivas)[:, origenes]
+    suma = _acumulada(np.where(positivas, ventas, 0.0))[:, origenes]
+    primera = positivas.argmax(axis=1)[:, None]
+    ultima_hasta = np.maximum.accumulate(np.where(positivas, np.arange(n_dias), -1), axis=1)
+    ultima = ultima_hasta[:, np.maximum(origenes - 1, 0)]
+    return croston_desde_conteos(n_ventas, suma, primera, ultima, largo)
+
+
+def pronosticos_por_origen_panel(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    alpha: float,
+    umbral_intermitencia: float,
+    origenes: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Venta diaria pronosticada en cada origen con los días anteriores a él
+
+    Replica el modelo del análisis (Croston si la demanda es intermitente,
+    EWMA si no) sin reajustes por origen: los conteos de Croston y la
+    intermitencia salen de sumas acumuladas y los niveles EWMA de una sola
+    pasada (`niveles_ewma_panel`). El costo casi no crece con los orígenes.
+
+    Returns:
+        (venta_diaria, es_intermitente), ambos (n_skus, n_origenes)
+    """
+    origenes = np.asarray(origenes, dtype=np.int64)
+    es_intermitente = intermitencia_por_origen_panel(ventas, inicio, fin, origenes) >= umbral_intermitencia
+    croston = croston_por_origen_panel(ventas, inicio, fin, origenes)
+    ewma = niveles_ewma_panel(ventas, inicio, fin, alpha, origenes - 1)
+
+    return np.where(es_intermitente, croston, ewma), es_intermitente
+
+
+def reales_por_origen_panel(
+    ventas: np.ndarray,
+    con_stock: np.ndarray,
+    origenes: np.ndarray,
+    horizonte: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Unidades vendidas y días con stock en [origen, origen + horizonte) de
+    cada SKU; los días sin stock no cuentan (la venta está censurada)
+
+    Returns:
+        (unidades, dias_con_stock), ambos (n_skus, n_origenes)
+    """
+    origenes = np.asarray(origenes, dtype=np.int64)
+    fin_horizonte = np.minimum(origenes + horizonte, ventas.shape[1])
+    unidades = _acumulada(np.where(con_stock, ventas, 0.0))
+    dias = _acumulada(con_stock)
+    return (
+        unidades[:, fin_horizonte] - unidades[:, origenes],
+        dias[:, fin_horizonte] - dias[:, origenes]
+    )
+
+
+# =====================================================================
+# MODELOS CANDIDATOS (ajuste por SKU)
+# =====================================================================
+
+def suavizado_por_origen_panel(
+    valores: np.ndarray,
+    actualizar: np.ndarray,
+    alphas: Sequence[float],
+    cortes: np.ndarray
+) -> np.ndarray:
+    """
+    Suavizado exponencial de `valores` con varios alphas a la vez, en una
+    pasada por los días
+
+    El nivel se actualiza solo en los días de `actualizar` (el primero lo
+    inicializa) con la misma fórmula que `ewma_panel`. Antes de la primera
+    actualización vale NaN.
+
+    Returns:
+        Nivel al cierre de cada día de `cortes`: (n_skus, n_alphas, n_cortes)
+    """
+    n_skus, n_dias = valores.shape
+    alphas = np.asarray(alphas, dtype=float)
+    cortes = np.asarray(cortes, dtype=np.int64)
+    niveles = np.full((n_skus, len(alphas), len(cortes)), np.nan)
+    nivel = np.full((n_skus, len(alphas)), np.nan)
+    if n_skus == 0 or len(cortes) == 0:
+        return niveles
+
+    hay_actualizacion = actualizar.any(axis=0)
+    for t in range(min(int(cortes.max()) + 1, n_dias)):
+        if hay_actualizacion[t]:
+            x = valores[:, t][:, None]
+            nuevo = np.where(np.isnan(nivel), x, (1 - alphas) * nivel + alphas * x)
+            nivel = np.where(actualizar[:, t][:, None], nuevo, nivel)
+        for k in np.flatnonzero(cortes == t):
+            niveles[:, :, k] = nivel
+
+    return niveles
+
+
+def intervalos_entre_ventas(positivas: np.ndarray, inicio: np.ndarray) -> np.ndarray:
+    """
+    Días desde la venta anterior en cada día con venta (desde el día previo
+    a `inicio` para la primera); 0 en los demás días
+    """
+    n_dias = positivas.shape[1]
+    dias = np.arange(n_dias)
+    ultima_hasta = np.maximum.accumulate(np.where(positivas, dias, -1), axis=1)
+    anterior = np.empty_like(ultima_hasta)
+    anterior[:, 0] = -1
+    anterior[:, 1:] = ultima_hasta[:, :-1]
+    anterior = np.maximum(anterior, inicio[:, None] - 1)
+    return np.where(positivas, dias - anterior, 0).astype(float)
+
+
+def media_movil_por_origen_panel(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    ventanas: Sequence[int],
+    origenes: np.ndarray
+) -> np.ndarray:
+    """
+    Promedio de los últimos `w` días válidos antes de cada origen, para
+    cada largo de ventana `w`
+
+    Returns:
+        (n_skus, n_ventanas, n_origenes); 0 sin días válidos
+    """
+    n_skus, n_dias = ventas.shape
+    origenes = np.asarray(origenes, dtype=np.int64)
+    valida = mascara_rango(inicio, fin, n_dias)
+    acumulada = np.zeros((n_skus, n_dias + 1))
+    np.cumsum(np.where(valida, ventas, 0.0), axis=1, out=acumulada[:, 1:])
+
+    hasta = np.minimum(origenes, fin[:, None] + 1)
+    medias = np.zeros((n_skus, len(ventanas), len(origenes)))
+    for j, ventana in enumerate(ventanas):
+        desde = np.minimum(np.maximum(hasta - ventana, inicio[:, None]), hasta)
+        largo = hasta - desde
+        suma = np.take_along_axis(acumulada, np.maximum(hasta, 0), axis=1) - np.take_along_axis(
+            acumulada, np.maximum(desde, 0), axis=1
+        )
+        medias[:, j] = np.divide(suma, largo, out=np.zeros(largo.shape), where=largo > 0)
+
+    return medias
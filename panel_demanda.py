@@ -0,0 +1,417 @@
+"""
+Panel de Demanda por SKU
+Estructuras columnar para procesar todos los SKUs en una sola pasada
+
+En lugar de filtrar el DataFrame completo una vez por SKU
+(`df[df['sku'] == sku]`, O(SKUs × filas)), se ordena una sola vez por SKU
+y cada SKU queda como un tramo contiguo [inicio, fin) del DataFrame ordenado.
+
+Sobre ese índice se construye la matriz densa SKU × día (`MatrizDemanda`),
+que consumen directamente los modelos de `algoritmo_ml_avanzado.py`.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, Tuple
+from dataclasses import dataclass
+
+
+@dataclass
+class IndiceSKU:
+    """Índice de SKUs: tramos contiguos sobre las filas ordenadas por SKU"""
+    skus: np.ndarray      # SKUs únicos en orden de primera aparición
+    codigos: np.ndarray   # Código (posición en `skus`) de cada fila original
+    orden: np.ndarray     # Permutación estable que agrupa las filas por SKU
+    limites: np.ndarray   # limites[i]:limites[i+1] = tramo del SKU i en `orden`
+
+    @property
+    def n_skus(self) -> int:
+        return len(self.skus)
+
+    def filas(self, i: int) -> np.ndarray:
+        """Posiciones (en el DataFrame original) de las filas del SKU i"""
+        return self.orden[self.limites[i]:self.limites[i + 1]]
+
+    def conteos(self) -> np.ndarray:
+        """Número de filas por SKU"""
+        return np.diff(self.limites)
+
+
+def indice_unico(sku: str, n_filas: int) -> IndiceSKU:
+    """Índice de un solo SKU que abarca todas las filas (ej. datos ya filtrados)"""
+    return IndiceSKU(
+        skus=np.array([sku], dtype=object),
+        codigos=np.zeros(n_filas, dtype=np.int64),
+        orden=np.arange(n_filas, dtype=np.int64),
+        limites=np.array([0, n_filas], dtype=np.int64)
+    )
+
+
+def indexar_por_sku(df: pd.DataFrame, columna: str = 'sku') -> IndiceSKU:
+    """
+    Construye el índice de SKUs con un único factorize + argsort estable
+
+    El orden de los SKUs coincide con `df[columna].unique()` y, dentro de
+    cada SKU, las filas conservan su orden original.
+    """
+    codigos, skus = pd.factorize(df[columna], sort=False)
+    codigos = codigos.astype(np.int64, copy=False)
+
+    # Filas sin SKU (NaN → código -1) quedan fuera de todos los tramos
+    validos = codigos >= 0
+    orden = np.argsort(codigos, kind='stable')
+    orden = orden[validos[orden]]
+    conteos = np.bincount(codigos[validos], minlength=len(skus))
+    limites = np.zeros(len(skus) + 1, dtype=np.int64)
+    np.cumsum(conteos, out=limites[1:])
+
+    return IndiceSKU(
+        skus=np.asarray(skus, dtype=object),
+        codigos=codigos,
+        orden=orden,
+        limites=limites
+    )
+
+
+def iterar_por_sku(
+    df: pd.DataFrame,
+    indice: IndiceSKU = None
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Itera (sku, filas_del_sku) reordenando el DataFrame una sola vez
+
+    Cada sub-DataFrame es un tramo contiguo del DataFrame ordenado y conserva
+    las etiquetas de índice originales (idéntico a `df[df['sku'] == sku]`).
+    """
+    if indice is None:
+        indice = indexar_por_sku(df)
+
+    df_ordenado = df.take(indice.orden)
+
+    for i, sku in enumerate(indice.skus):
+        yield sku, df_ordenado.iloc[indice.limites[i]:indice.limites[i + 1]]
+
+
+def agrupar_por_sku(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Diccionario {sku: filas_del_sku} construido con un solo ordenamiento"""
+    if df is None or df.empty:
+        return {}
+
+    return dict(iterar_por_sku(df))
+
+
+@dataclass
+class MatrizDemanda:
+    """
+    Demanda diaria densa SKU × día
+
+    ventas[i, d] = unidades vendidas del SKU i el día `fecha_base + d`.
+    Cada SKU tiene su propio rango válido [inicio[i], fin[i]] (inclusive);
+    fuera de ese rango la matriz vale 0 y no debe usarse para estadísticas.
+    """
+    skus: np.ndarray
+    fecha_base: pd.Timestamp
+    ventas: np.ndarray    # float64 (n_skus, n_dias)
+    inicio: np.ndarray    # int64 (n_skus,) primer día válido
+    fin: np.ndarray       # int64 (n_skus,) último día válido (inclusive)
+    ultima_venta: np.ndarray = None  # int64 (n_skus,) día de la última venta
+
+    @property
+    def n_skus(self) -> int:
+        return self.ventas.shape[0]
+
+    @property
+    def n_dias(self) -> int:
+        return self.ventas.shape[1]
+
+    def largo(self) -> np.ndarray:
+        """Días del rango válido de cada SKU"""
+        return self.fin - self.inicio + 1
+
+    def mascara_valida(self) -> np.ndarray:
+        """Máscara booleana (n_skus, n_dias) del rango válido de cada SKU"""
+        dias = np.arange(self.n_dias)
+        return (dias >= self.inicio[:, None]) & (dias <= self.fin[:, None])
+
+    def fila(self, i: int) -> np.ndarray:
+        """Serie diaria del SKU i restringida a su rango válido (vista)"""
+        return self.ventas[i, self.inicio[i]:self.fin[i] + 1]
+
+    def fechas(self) -> pd.DatetimeIndex:
+        """Fechas de todas las columnas de la matriz"""
+        return pd.date_range(self.fecha_base, periods=self.n_dias, freq='D')
+
+    def dia(self, fecha) -> int:
+        """Offset (en días) de una fecha respecto a `fecha_base`"""
+        return int((pd.Timestamp(fecha).normalize() - self.fecha_base).days)
+
+
+def dias_desde(fechas, fecha_base: pd.Timestamp) -> np.ndarray:
+    """Convierte fechas a offsets enteros de días desde `fecha_base`"""
+    dias = pd.to_datetime(fechas).values.astype('datetime64[D]')
+    return (dias - np.datetime64(fecha_base.normalize(), 'D')).astype(np.int64)
+
+
+@dataclass
+class RegistrosSKU:
+    """
+    Registros (SKU, día, valor) codificados como arrays paralelos
+
+    Es la forma columnar de ventas o compras que consume el motor de panel:
+    sin strings ni timestamps por fila, solo el código del SKU (posición en
+    `skus`), el offset en días desde `fecha_base` y el valor.
+    """
+    skus: np.ndarray
+    fecha_base: pd.Timestamp
+    codigos: np.ndarray   # int64 (n_filas,)
+    dias: np.ndarray      # int64 (n_filas,)
+    valores: np.ndarray   # float64 (n_filas,)
+
+    @property
+    def n_skus(self) -> int:
+        return len(self.skus)
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def conteos(self) -> np.ndarray:
+        """Número de registros por SKU"""
+        return np.bincount(self.codigos, minlength=self.n_skus)
+
+    def ordenados(self) -> 'RegistrosSKU':
+        """Copia con los registros agrupados por SKU (orden estable)"""
+        orden = np.argsort(self.codigos, kind='stable')
+        return RegistrosSKU(
+            skus=self.skus,
+            fecha_base=self.fecha_base,
+            codigos=self.codigos[orden],
+            dias=self.dias[orden],
+            valores=self.valores[orden]
+        )
+
+    def tramo(self, sku_inicio: int, sku_fin: int) -> 'RegistrosSKU':
+        """
+        Registros de los SKUs [sku_inicio, sku_fin) con códigos desde 0
+
+        Requiere registros ordenados por SKU; devuelve vistas, sin copiar.
+        """
+        filas = np.searchsorted(self.codigos, [sku_inicio, sku_fin])
+        return RegistrosSKU(
+            skus=self.skus[sku_inicio:sku_fin],
+            fecha_base=self.fecha_base,
+            codigos=self.codigos[filas[0]:filas[1]] - sku_inicio,
+            dias=self.dias[filas[0]:filas[1]],
+            valores=self.valores[filas[0]:filas[1]]
+        )
+
+    def hasta(self, dia: int) -> 'RegistrosSKU':
+        """Registros de los días <= `dia` (offset desde `fecha_base`), con los mismos SKUs"""
+        filas = self.dias <= dia
+        return RegistrosSKU(
+            skus=self.skus,
+            fecha_base=self.fecha_base,
+            codigos=self.codigos[filas],
+            dias=self.dias[filas],
+            valores=self.valores[filas]
+        )
+
+    def seleccionar(self, indices: np.ndarray) -> 'RegistrosSKU':
+        """Registros de los SKUs `indices` (en ese orden de códigos)"""
+        nuevo_codigo = np.full(self.n_skus, -1, dtype=np.int64)
+        nuevo_codigo[indices] = np.arange(len(indices))
+        codigos = nuevo_codigo[self.codigos]
+        filas = codigos >= 0
+        return RegistrosSKU(
+            skus=self.skus[indices],
+            fecha_base=self.fecha_base,
+            codigos=codigos[filas],
+            dias=self.dias[filas],
+            valores=self.valores[filas]
+        )
+
+
+def registros_desde_df(
+    df: pd.DataFrame,
+    columna_valor: str,
+    skus: np.ndarray = None,
+    codigos: np.ndarray = None,
+    fecha_base: pd.Timestamp = None
+) -> RegistrosSKU:
+    """
+    Codifica un DataFrame (sku, fecha, valor) como RegistrosSKU
+
+    Args:
+        skus: SKUs de referencia (default: los de `df` en orden de aparición).
+            Las filas de SKUs fuera de la lista se descartan.
+        codigos: Código de cada fila ya calculado (ej. `IndiceSKU.codigos`)
+        fecha_base: Día 0 (default: primera fecha de `df`)
+    """
+    if codigos is None:
+        if skus is None:
+            indice = indexar_por_sku(df)
+            skus, codigos = indice.skus, indice.codigos
+        else:
+            codigos = pd.Index(skus).get_indexer(df['sku'])
+
+    codigos = np.asarray(codigos, dtype=np.int64)
+    fechas = pd.to_datetime(df['fecha'])
+    if fecha_base is None:
+        fecha_base = fechas.min().normalize() if len(df) else pd.Timestamp(0)
+
+    validos = codigos >= 0
+    return RegistrosSKU(
+        skus=np.asarray(skus, dtype=object),
+        fecha_base=fecha_base,
+        codigos=codigos[validos],
+        dias=dias_desde(fechas, fecha_base)[validos],
+        valores=df[columna_valor].to_numpy(dtype=np.float64)[validos]
+    )
+
+
+def matriz_desde_registros(
+    registros: RegistrosSKU,
+    mascara_filas: np.ndarray = None,
+    fecha_hasta=None,
+    extender: np.ndarray = None
+) -> MatrizDemanda:
+    """
+    Matriz SKU × día a partir de registros codificados (un scatter-add)
+
+    La primera columna es el primer día con registros, así un tramo de SKUs
+    no arrastra columnas vacías.
+    """
+    n_skus = registros.n_skus
+    codigos = registros.codigos
+    desplazamiento = int(registros.dias.min()) if len(registros) else 0
+    dias = registros.dias - desplazamiento
+    fecha_base = registros.fecha_base + pd.Timedelta(days=desplazamiento)
+
+    # Rango válido por SKU: [primera venta, última venta] (con todas las filas)
+    inicio = np.full(n_skus, np.iinfo(np.int64).max, dtype=np.int64)
+    fin = np.full(n_skus, -1, dtype=np.int64)
+    np.minimum.at(inicio, codigos, dias)
+    np.maximum.at(fin, codigos, dias)
+    ultima_venta = fin.copy()
+
+    if fecha_hasta is not None:
+        dia_hasta = int((pd.Timestamp(fecha_hasta).normalize() - fecha_base).days)
+        if extender is None:
+            fin = np.maximum(fin, dia_hasta)
+        else:
+            fin = np.where(extender, np.maximum(fin, dia_hasta), fin)
+
+    n_dias = int(fin.max()) + 1 if n_skus > 0 else 0
+
+    # Scatter-add de todas las filas en una sola llamada
+    usar = slice(None) if mascara_filas is None else mascara_filas
+    plano = np.bincount(
+        codigos[usar] * n_dias + dias[usar],
+        weights=registros.valores[usar],
+        minlength=n_skus * n_dias
+    )
+
+    return MatrizDemanda(
+        skus=registros.skus,
+        fecha_base=fecha_base,
+        ventas=plano.reshape(n_skus, n_dias),
+        inicio=inicio,
+        fin=fin,
+        ultima_venta=ultima_venta
+    )
+
+
+def construir_matriz_demanda(
+    ventas_df: pd.DataFrame,
+    indice: IndiceSKU = None,
+    mascara_filas: np.ndarray = None,
+    fecha_hasta=None,
+    extender: np.ndarray = None,
+    columna_valor: str = 'unidades'
+) -> MatrizDemanda:
+    """
+    Convierte `ventas_df` en una matriz SKU × día con un único scatter-add
+
+    Args:
+        ventas_df: Ventas con columnas sku, fecha y `columna_valor`
+        indice: Índice de SKUs ya calculado (opcional)
+        mascara_filas: Filas a acumular (ej. sin outliers). El rango válido
+            de cada SKU se calcula igual con todas sus filas.
+        fecha_hasta: Extiende el rango válido hasta esta fecha (ej. hoy)
+        extender: Máscara por SKU de a quiénes aplicar `fecha_hasta`
+            (default: a todos)
+
+    Las ventas de un mismo SKU y día se suman.
+    """
+    if indice is None:
+        indice = indexar_por_sku(ventas_df)
+
+    registros = registros_desde_df(
+        ventas_df, columna_valor, skus=indice.skus, codigos=indice.codigos
+    )
+    if mascara_filas is not None:
+        mascara_filas = np.asarray(mascara_filas)[indice.codigos >= 0]
+
+    return matriz_desde_registros(registros, mascara_filas, fecha_hasta, extender)
+
+
+def matriz_compras_desde_registros(
+    compras: RegistrosSKU,
+    matriz: MatrizDemanda
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Matriz de compras alineada con `matriz` (mismos SKUs y días)
+
+    `compras` debe estar codificado con los mismos SKUs que `matriz`. Solo se
+    acumulan compras dentro del rango válido de cada SKU.
+
+    Returns:
+        (compras, tiene_compras): matriz (n_skus, n_dias) y máscara por SKU
+        de quiénes tienen al menos un registro de compra (en cualquier fecha)
+    """
+    matriz_compras = np.zeros_like(matriz.ventas)
+    tiene_compras = np.zeros(matriz.n_skus, dtype=bool)
+
+    if compras is None or len(compras) == 0:
+        return matriz_compras, tiene_compras
+
+    codigos = compras.codigos
+    tiene_compras[codigos] = True
+
+    dias = compras.dias - (matriz.fecha_base - compras.fecha_base).days
+    en_rango = (dias >= matriz.inicio[codigos]) & (dias <= matriz.fin[codigos])
+
+    np.add.at(
+        matriz_compras,
+        (codigos[en_rango], dias[en_rango]),
+        compras.valores[en_rango]
+    )
+
+    return matriz_compras, tiene_compras
+
+
+def construir_matriz_compras(
+    compras_df: pd.DataFrame,
+    matriz: MatrizDemanda,
+    codigos: np.ndarray = None,
+    columna_valor: str = 'cantidad'
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Matriz de compras alineada con `matriz` a partir de un DataFrame
+
+    Las compras de SKUs sin ventas o fuera del rango válido se ignoran.
+
+    Args:
+        codigos: Fila de `matriz` de cada compra (default: según columna sku)
+    """
+    if compras_df is None or compras_df.empty:
+        return matriz_compras_desde_registros(None, matriz)
+
+    compras = registros_desde_df(
+        compras_df,
+        columna_valor,
+        skus=matriz.skus,
+        codigos=codigos,
+        fecha_base=matriz.fecha_base
+    )
+
+    return matriz_compras_desde_registros(compras, matriz)
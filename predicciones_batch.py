@@ -0,0 +1,232 @@
+"""
+Lote Columnar de Predicciones
+Las predicciones de una corrida como un array NumPy por campo
+
+`PrediccionesBatch` guarda los campos de PrediccionAvanzada como columnas
+alineadas: el motor de panel lo arma de una vez a partir del análisis, sin
+un objeto por SKU, y la escritura sanitiza y serializa por columna.
+
+El código que recorre predicciones una a una sigue funcionando: indexar o
+iterar el lote entrega vistas de fila (`FilaPrediccion`) con los mismos
+atributos que PrediccionAvanzada, que leen y escriben en las columnas.
+"""
+
+import json
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# Campos de PrediccionAvanzada, en orden
+CAMPOS = (
+    'sku', 'descripcion',
+    'venta_diaria_promedio', 'venta_diaria_p50', 'venta_diaria_p75', 'venta_diaria_p90',
+    'desviacion_estandar', 'coeficiente_variacion',
+    'tendencia', 'tasa_crecimiento_mensual',
+    'stock_actual', 'stock_optimo', 'stock_seguridad', 'dias_stock_actual', 'transito_china',
+    'sugerencia_reposicion', 'sugerencia_reposicion_p75', 'sugerencia_reposicion_p90',
+    'precio_unitario', 'valor_total_sugerencia',
+    'periodo_inicio', 'periodo_fin', 'dias_periodo', 'unidades_totales_periodo',
+    'clasificacion_abc', 'clasificacion_xyz', 'es_demanda_intermitente',
+    'modelo_usado',
+    'observaciones', 'alertas'
+)
+
+CAMPOS_TEXTO = (
+    'sku', 'descripcion', 'tendencia', 'clasificacion_abc', 'clasificacion_xyz',
+    'modelo_usado', 'observaciones'
+)
+CAMPOS_FECHA = ('periodo_inicio', 'periodo_fin')
+CAMPOS_ENTEROS = ('dias_periodo',)
+CAMPOS_BOOLEANOS = ('es_demanda_intermitente',)
+CAMPOS_LISTA = ('alertas',)
+CAMPOS_NUMERICOS = tuple(
+    c for c in CAMPOS
+    if c not in CAMPOS_TEXTO + CAMPOS_FECHA + CAMPOS_ENTEROS + CAMPOS_BOOLEANOS + CAMPOS_LISTA
+)
+
+
+def columna_prediccion(campo: str, valores) -> np.ndarray:
+    """Array con el tipo de `campo` (object para texto y listas)"""
+    if campo in CAMPOS_TEXTO:
+        return np.asarray(valores, dtype=object)
+    if campo in CAMPOS_LISTA:
+        columna = np.empty(len(valores), dtype=object)
+        for k, lista in enumerate(valores):
+            columna[k] = lista
+        return columna
+    if campo in CAMPOS_FECHA:
+        return pd.to_datetime(np.asarray(valores)).to_numpy(dtype='datetime64[ns]')
+    if campo in CAMPOS_ENTEROS:
+        return np.asarray(valores, dtype=np.int64)
+    if campo in CAMPOS_BOOLEANOS:
+        return np.asarray(valores, dtype=bool)
+    return np.asarray(valores, dtype=np.float64)
+
+
+def _finitos(valores: np.ndarray) -> np.ndarray:
+    """inf/NaN → 0.0, como `sanitize_float`"""
+    return np.where(np.isfinite(valores), valores, 0.0)
+
+
+class FilaPrediccion:
+    """Vista de una fila del lote con los atributos de PrediccionAvanzada"""
+    __slots__ = ('_lote', '_i')
+
+    def __init__(self, lote: 'PrediccionesBatch', i: int):
+        object.__setattr__(self, '_lote', lote)
+        object.__setattr__(self, '_i', i)
+
+    def __getattr__(self, campo: str):
+        try:
+            valor = self._lote.columnas[campo][self._i]
+        except KeyError:
+            raise AttributeError(campo) from None
+        if campo in CAMPOS_FECHA:
+            return pd.Timestamp(valor)
+        if campo in CAMPOS_BOOLEANOS:
+            return bool(valor)
+        return valor
+
+    def __setattr__(self, campo: str, valor):
+        if campo not in self._lote.columnas:
+            raise AttributeError(campo)
+        self._lote.columnas[campo][self._i] = valor
+
+    def __repr__(self) -> str:
+        return f"FilaPrediccion(sku={self.sku!r}, sugerencia_reposicion={self.sugerencia_reposicion})"
+
+    def a_prediccion(self):
+        """Copia como PrediccionAvanzada"""
+        from algoritmo_ml_avanzado import PrediccionAvanzada
+        return PrediccionAvanzada(**{campo: getattr(self, campo) for campo in CAMPOS})
+
+
+class PrediccionesBatch:
+    """Predicciones como columnas alineadas (una fila por SKU)"""
+
+    def __init__(self, columnas: Dict[str, np.ndarray]):
+        self.columnas = {campo: columnas[campo] for campo in CAMPOS}
+
+    @classmethod
+    def vacio(cls) -> 'PrediccionesBatch':
+        return cls({campo: columna_prediccion(campo, []) for campo in CAMPOS})
+
+    @classmethod
+    def desde_predicciones(cls, predicciones: Iterable) -> 'PrediccionesBatch':
+        """Lote desde PrediccionAvanzada (o vistas de fila); los None se omiten"""
+        filas = list(map(attrgetter(*CAMPOS), (p for p in predicciones if p is not None)))
+        if not filas:
+            return cls.vacio()
+        return cls({campo: columna_prediccion(campo, valores) for campo, valores in zip(CAMPOS, zip(*filas))})
+
+    @classmethod
+    def concatenar(cls, lotes: Sequence['PrediccionesBatch']) -> 'PrediccionesBatch':
+        lotes = [lote for lote in lotes if len(lote)]
+        if not lotes:
+            return cls.vacio()
+        return cls({
+            campo: np.concatenate([lote.columnas[campo] for lote in lotes]) for campo in CAMPOS
+        })
+
+    def __len__(self) -> int:
+        return len(self.columnas['sku'])
+
+    def __iter__(self) -> Iterator[FilaPrediccion]:
+        return (FilaPrediccion(self, i) for i in range(len(self)))
+
+    def __getitem__(self, indice):
+        """Entero → vista de fila; slice, máscara o índices → nuevo lote"""
+        if isinstance(indice, (int, np.integer)):
+            n = len(self)
+            if not -n <= indice < n:
+                raise IndexError(indice)
+            return FilaPrediccion(self, int(indice) % n)
+        return self.seleccionar(indice)
+
+    @property
+    def skus(self) -> np.ndarray:
+        return self.columnas['sku']
+
+    def seleccionar(self, indices) -> 'PrediccionesBatch':
+        """Filas por slice, máscara booleana o índices (en ese orden)"""
+        return PrediccionesBatch({campo: valores[indices] for campo, valores in self.columnas.items()})
+
+    def ordenar_por(self, campo: str, descendente: bool = False) -> 'PrediccionesBatch':
+        """Orden estable por `campo` (los empates conservan el orden actual)"""
+        valores = self.columnas[campo]
+        orden = np.argsort(-valores if descendente else valores, kind='stable')
+        return self.seleccionar(orden)
+
+    def a_predicciones(self) -> List:
+        """Copia como lista de PrediccionAvanzada"""
+        return [fila.a_prediccion() for fila in self]
+
+    def sanitizado(self) -> 'PrediccionesBatch':
+        """Copia con inf/NaN → 0.0 en las columnas numéricas"""
+        columnas = dict(self.columnas)
+        for campo in CAMPOS_NUMERICOS:
+            columnas[campo] = _finitos(columnas[campo])
+        return PrediccionesBatch(columnas)
+
+    def columnas_json(self) -> Dict[str, list]:
+        """Columnas sanitizadas con tipos nativos de JSON (fechas en ISO 8601)"""
+        columnas = {}
+        for campo, valores in self.sanitizado().columnas.items():
+            if campo in CAMPOS_FECHA:
+                columnas[campo] = [fecha.isoformat() for fecha in pd.DatetimeIndex(valores)]
+            else:
+                columnas[campo] = valores.tolist()
+        return columnas
+
+    def registros(self, **constantes) -> List[dict]:
+        """
+        Filas sanitizadas como dicts JSON (formato de la tabla `predicciones`)
+
+        Args:
+            constantes: Campos con el mismo valor en todas las filas
+                (ej. fecha_calculo)
+        """
+        columnas = self.columnas_json()
+        nombres = list(constantes) + list(columnas)
+        fijos = tuple(constantes.values())
+        return [dict(zip(nombres, fijos + fila)) for fila in zip(*columnas.values())]
+
+    def a_dataframe(self, campos: Sequence[str] = CAMPOS) -> pd.DataFrame:
+        return pd.DataFrame({campo: self.columnas[campo] for campo in campos})
+
+    def a_json(self, ruta: str = None, por_columnas: bool = False) -> str:
+        """
+        JSON sanitizado: lista de filas o, con `por_columnas`, un objeto
+        con una lista por campo (más compacto, sin un dict por fila)
+        """
+        datos = self.columnas_json() if por_columnas else self.registros()
+        texto = json.dumps(datos, ensure_ascii=False)
+        if ruta:
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                archivo.write(texto)
+        return texto
+
+    def a_csv(self, ruta: str = None) -> str:
+        """CSV sanitizado; las alertas van como lista JSON en su celda"""
+        df = self.sanitizado().a_dataframe()
+        df['alertas'] = [json.dumps(alertas, ensure_ascii=False) for alertas in df['alertas']]
+        return df.to_csv(ruta, index=False)
+
+    def a_arrow(self):
+        """pyarrow.Table sanitizada (requiere pyarrow)"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("PrediccionesBatch.a_arrow requiere pyarrow: pip install pyarrow") from None
+
+        columnas = self.sanitizado().columnas
+        return pa.table({
+            campo: (
+                pa.array(valores.tolist(), type=pa.list_(pa.string())) if campo in CAMPOS_LISTA
+                else pa.array(valores)
+            )
+            for campo, valores in columnas.items()
+        })
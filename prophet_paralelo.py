@@ -0,0 +1,262 @@
+"""
+Entrenamiento de Prophet por Lotes
+Un modelo Prophet por SKU en un pool de procesos, con presupuesto de tiempo
+
+Cada ajuste de Prophet toma segundos, así que un catálogo completo no cabe
+en la corrida diaria. El lote:
+
+- arma las series diarias de todos los SKUs con un solo groupby
+- ordena los SKUs por prioridad: clase ABC por valor de venta (A primero)
+  y, dentro de la clase, valor descendente
+- los entrena en `n_workers` procesos; cada worker importa Prophet/Stan y
+  recibe las series una sola vez, al iniciarse
+- corta al agotar `presupuesto_segundos` (tiempo de reloj total): los
+  workers se terminan y los SKUs sin predicción de Prophet (sin tiempo,
+  menos de 365 días de historia o error al entrenar) usan
+  AlgoritmoMLAvanzado
+
+Por SKU se registra el estado y los segundos de ajuste, forecast,
+backtesting y total (`ResultadoProphetLote.estadisticas`).
+"""
+
+import importlib
+import logging
+import multiprocessing
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from predicciones_batch import PrediccionesBatch
+
+
+# Días con venta mínimos para entrenar Prophet (como `calcular_prediccion_sku`)
+DIAS_MINIMOS_PROPHET = 365
+
+# Estados por SKU
+ESTADOS = ('prophet', 'sin_tiempo', 'historia_insuficiente', 'error')
+
+# Series y algoritmo de cada worker (se cargan una vez en `_inicializar_worker`)
+_ALGORITMO = None
+_SERIES: Dict[str, pd.DataFrame] = {}
+
+
+def series_diarias(ventas_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Serie diaria (ds, y) de cada SKU, como `preparar_datos_prophet`, con un
+    solo groupby para todo el catálogo
+    """
+    diarias = (
+        ventas_df.groupby(['sku', 'fecha'], observed=True, sort=True)['unidades']
+        .sum()
+        .reset_index()
+    )
+    skus = np.asarray(diarias['sku'], dtype=object)
+    fechas = pd.to_datetime(diarias['fecha']).to_numpy()
+    unidades = diarias['unidades'].to_numpy()
+
+    cortes = np.flatnonzero(skus[1:] != skus[:-1]) + 1
+    inicios = np.concatenate(([0], cortes)) if len(skus) else np.zeros(0, dtype=int)
+    finales = np.concatenate((cortes, [len(skus)])) if len(skus) else np.zeros(0, dtype=int)
+    return {
+        skus[a]: pd.DataFrame({'ds': fechas[a:b], 'y': unidades[a:b]})
+        for a, b in zip(inicios, finales)
+    }
+
+
+def prioridad_abc(ventas_df: pd.DataFrame, algoritmo_ml) -> Tuple[List[str], Dict[str, str]]:
+    """
+    SKUs en orden de entrenamiento (clase A, B, C; dentro de cada una por
+    valor de venta descendente) y la clase de cada uno
+
+    La clase es la de `algoritmo_ml.clasificar_abc` sobre unidades × precio.
+    """
+    valor = (ventas_df['unidades'] * ventas_df['precio']).groupby(
+        np.asarray(ventas_df['sku'], dtype=object)
+    ).sum()
+    clase = algoritmo_ml.clasificar_abc(valor.to_dict())
+    orden = sorted(valor.index, key=lambda sku: (clase[sku], -valor[sku], sku))
+    return orden, clase
+
+
+def _inicializar_worker(algoritmo, series: Dict[str, pd.DataFrame]) -> None:
+    """Importa Prophet/Stan una vez por proceso y guarda las series"""
+    global _ALGORITMO, _SERIES
+    importlib.import_module('prophet')  # el import caro, antes de la primera tarea
+    for nombre in ('cmdstanpy', 'prophet'):
+        logging.getLogger(nombre).setLevel(logging.WARNING)
+    _ALGORITMO = algoritmo
+    _SERIES = series
+
+
+def _entrenar_sku(tarea: Tuple) -> Tuple[str, object, Dict[str, float]]:
+    """
+    Worker: predicción de Prophet de un SKU y sus tiempos
+
+    Un error en cualquier etapa devuelve None (estado 'error', el SKU pasa al
+    respaldo) en vez de cortar el lote.
+    """
+    sku, stock_actual, transito_china, precio_unitario, descripcion = tarea
+    tiempos = {}
+    inicio = time.perf_counter()
+    try:
+        prediccion = _ALGORITMO.prediccion_desde_serie(
+            _SERIES[sku], sku, stock_actual, transito_china, precio_unitario, descripcion, tiempos=tiempos
+        )
+    except Exception as e:
+        print(f"❌ Error en SKU {sku}: {e}")
+        prediccion = None
+    tiempos['total'] = time.perf_counter() - inicio
+    return sku, prediccion, tiempos
+
+
+@dataclass
+class ResultadoProphetLote:
+    """Predicciones de Prophet, respaldo de AlgoritmoMLAvanzado y estadísticas por SKU"""
+    predicciones: Dict[str, object]     # sku → PrediccionConEstacionalidad
+    respaldo: PrediccionesBatch         # AlgoritmoMLAvanzado para el resto
+    estadisticas: pd.DataFrame          # una fila por SKU, en orden de prioridad
+    segundos: float
+    presupuesto_segundos: float = None
+
+    def latencias(self) -> Dict[str, float]:
+        """Segundos totales de cada SKU entrenado (para `Instrumentacion.latencias_sku`)"""
+        entrenados = self.estadisticas.dropna(subset=['segundos_total'])
+        return dict(zip(entrenados['sku'], entrenados['segundos_total'].astype(float)))
+
+    def resumen(self) -> dict:
+        """SKUs por estado y por clase, y percentiles del tiempo de ajuste"""
+        estadisticas = self.estadisticas
+        ajuste = estadisticas['segundos_ajuste'].dropna().to_numpy()
+        resumen = {
+            'segundos': round(self.segundos, 2),
+            'presupuesto_segundos': self.presupuesto_segundos,
+            'por_estado': {estado: int((estadisticas['estado'] == estado).sum()) for estado in ESTADOS},
+            'prophet_por_clase': (
+                estadisticas.loc[estadisticas['estado'] == 'prophet', 'clase_abc']
+                .value_counts().sort_index().astype(int).to_dict()
+            ),
+            'skus_respaldo': len(self.respaldo)
+        }
+        if len(ajuste):
+            p50, p90, p99 = np.percentile(ajuste, [50, 90, 99])
+            resumen['segundos_ajuste'] = {
+                'total': round(float(ajuste.sum()), 2),
+                'p50': round(float(p50), 3),
+                'p90': round(float(p90), 3),
+                'p99': round(float(p99), 3),
+                'maximo': round(float(ajuste.max()), 3)
+            }
+        return resumen
+
+
+def calcular_prophet_lote(
+    algoritmo,
+    ventas_df: pd.DataFrame,
+    stock_df: pd.DataFrame,
+    transito_df: pd.DataFrame = None,
+    compras_df: pd.DataFrame = None,
+    n_workers: int = 1,
+    presupuesto_segundos: float = None,
+    algoritmo_respaldo=None
+) -> ResultadoProphetLote:
+    """
+    Predicciones de Prophet para todos los SKUs de `ventas_df`, dentro del
+    presupuesto de tiempo y con respaldo de AlgoritmoMLAvanzado
+
+    Args:
+        algoritmo: AlgoritmoProphetEstacionalidad
+        n_workers: Procesos de entrenamiento (1 = en este proceso; el
+            presupuesto se revisa entre SKUs)
+        presupuesto_segundos: Tiempo de reloj para preparar y entrenar
+            (None = sin límite); al agotarse se terminan los workers. El
+            respaldo se calcula después (segundos, sin Prophet)
+        algoritmo_respaldo: AlgoritmoMLAvanzado (default: con los mismos
+            días de stock, tránsito y nivel de servicio)
+    """
+    from algoritmo_ml_avanzado import AlgoritmoMLAvanzado
+
+    inicio = time.perf_counter()
+    limite = np.inf if presupuesto_segundos is None else inicio + presupuesto_segundos
+    if algoritmo_respaldo is None:
+        algoritmo_respaldo = AlgoritmoMLAvanzado(
+            dias_stock_deseado=algoritmo.dias_stock_deseado,
+            dias_transito=algoritmo.dias_transito,
+            nivel_servicio=algoritmo.nivel_servicio
+        )
+
+    series = series_diarias(ventas_df)
+    orden, clase = prioridad_abc(ventas_df, algoritmo_respaldo)
+    datos = algoritmo_respaldo._datos_por_sku(np.asarray(orden, dtype=object), ventas_df, stock_df, transito_df)
+
+    estadisticas = pd.DataFrame({
+        'sku': orden,
+        'clase_abc': [clase[sku] for sku in orden],
+        'prioridad': np.arange(len(orden)),
+        'dias_historia': [len(series[sku]) for sku in orden],
+        'estado': 'sin_tiempo',
+        'segundos_ajuste': np.nan,
+        'segundos_forecast': np.nan,
+        'segundos_backtesting': np.nan,
+        'segundos_total': np.nan
+    })
+    entrenables = estadisticas['dias_historia'].to_numpy() >= DIAS_MINIMOS_PROPHET
+    estadisticas.loc[~entrenables, 'estado'] = 'historia_insuficiente'
+
+    tareas = [
+        (orden[k], float(datos['stock_actual'][k]), float(datos['transito_china'][k]),
+         float(datos['precio_unitario'][k]), datos['descripcion'][k])
+        for k in np.flatnonzero(entrenables)
+    ]
+    fila = {sku: k for k, sku in enumerate(orden)}
+    predicciones = {}
+
+    def registrar(sku, prediccion, tiempos):
+        k = fila[sku]
+        estadisticas.loc[k, 'estado'] = 'prophet' if prediccion is not None else 'error'
+        for etapa, segundos in tiempos.items():
+            estadisticas.loc[k, f'segundos_{etapa}'] = segundos
+        if prediccion is not None:
+            predicciones[sku] = prediccion
+
+    if n_workers and n_workers > 1:
+        # chunksize=1: las tareas se reparten en orden de prioridad
+        with multiprocessing.Pool(n_workers, _inicializar_worker, (algoritmo, series)) as pool:
+            resultados = pool.imap_unordered(_entrenar_sku, tareas, chunksize=1)
+            try:
+                for _ in range(len(tareas)):
+                    restante = limite - time.perf_counter()
+                    if restante <= 0:
+                        break
+                    registrar(*resultados.next(timeout=None if np.isinf(restante) else restante))
+            except multiprocessing.TimeoutError:
+                pass
+            # Al salir del `with` el pool se termina, aunque queden ajustes en curso
+    else:
+        _inicializar_worker(algoritmo, series)
+        for tarea in tareas:
+            if time.perf_counter() >= limite:
+                break
+            registrar(*_entrenar_sku(tarea))
+
+    # Respaldo: AlgoritmoMLAvanzado para los SKUs sin predicción de Prophet
+    sin_prophet = estadisticas.loc[estadisticas['estado'] != 'prophet', 'sku'].tolist()
+    respaldo = PrediccionesBatch.vacio()
+    if sin_prophet:
+        en_respaldo = np.isin(np.asarray(ventas_df['sku'], dtype=object), sin_prophet)
+        respaldo = algoritmo_respaldo.calcular_predicciones_completas(
+            ventas_df=ventas_df[en_respaldo],
+            stock_df=stock_df,
+            transito_df=transito_df,
+            compras_df=compras_df
+        )
+
+    return ResultadoProphetLote(
+        predicciones=predicciones,
+        respaldo=respaldo,
+        estadisticas=estadisticas,
+        segundos=time.perf_counter() - inicio,
+        presupuesto_segundos=presupuesto_segundos
+    )
@@ -0,0 +1,216 @@
+"""
+Benchmark de arranque en frío de los scripts y módulos del forecasting
+
+Cada entrada se importa en un proceso nuevo con `python -X importtime`
+(sin ejecutar su bloque `__main__`) y se mide:
+
+- segundos: tiempo total del proceso (intérprete + imports)
+- imports: suma de los tiempos acumulados de `-X importtime`
+- los módulos de primer nivel más pesados
+- si se cargó algún módulo de MODULOS_PESADOS, que deben importarse solo
+  en el código que los usa (Prophet al entrenar, supabase al conectar...)
+
+Se toma el mínimo de varias repeticiones, tras una primera corrida que
+compila los .pyc. Cada corrida se agrega a un historial JSON, como en
+`benchmark_forecast.py`, y se compara con la anterior de la misma
+plataforma.
+
+Uso:
+    python scripts/benchmark_arranque.py
+    python scripts/benchmark_arranque.py run_daily_forecast algoritmo_ml_avanzado
+    python scripts/benchmark_arranque.py --repeticiones=10 --top=15
+    python scripts/benchmark_arranque.py --estricto     # exit 1 si hay regresión o imports pesados
+"""
+
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).parent.parent
+sys.path.append(str(RAIZ))
+sys.path.append(str(RAIZ / 'scripts'))
+
+from benchmark_forecast import UMBRAL_REGRESION, cargar_historial, guardar_historial, info_maquina
+
+
+# Nombre → archivo (relativo a la raíz del repo)
+ENTRADAS = {
+    'run_daily_forecast': 'scripts/run_daily_forecast.py',
+    'exportar_fuente_local': 'scripts/exportar_fuente_local.py',
+    'simular_escenarios': 'scripts/simular_escenarios.py',
+    'cargar_datos_excel': 'scripts/cargar_datos_excel.py',
+    'verificar_calidad_datos': 'scripts/verificar_calidad_datos.py',
+    'benchmark_forecast': 'scripts/benchmark_forecast.py',
+    'benchmark_carga': 'scripts/benchmark_carga.py',
+    'algoritmo_ml_avanzado': 'algoritmo_ml_avanzado.py',
+    'algoritmo_prediccion_reposicion': 'algoritmo_prediccion_reposicion.py',
+    'algoritmo_prophet_estacionalidad': 'algoritmo_prophet_estacionalidad.py',
+}
+
+# Módulos que ninguna entrada debe cargar al arrancar
+MODULOS_PESADOS = ('scipy.stats', 'prophet', 'cmdstanpy', 'supabase', 'matplotlib')
+
+RUTA_HISTORIAL = RAIZ / 'benchmarks' / 'historial_arranque.json'
+REPETICIONES = 5
+TOP_MODULOS = 8
+
+# Carga el archivo como módulo (run_name distinto de __main__: no corre el
+# script) e informa en la última línea de stdout qué módulos pesados quedaron
+# en sys.modules: -X importtime lista también los imports fallidos
+_MARCA_PESADOS = 'PESADOS:'
+_CARGAR = (
+    "import runpy, sys; sys.path.insert(0, {raiz!r}); sys.path.insert(0, {carpeta!r}); "
+    "runpy.run_path({ruta!r}, run_name='arranque'); "
+    "print({marca!r}, *[m for m in {pesados!r} if m in sys.modules])"
+)
+
+
+def parsear_importtime(salida: str) -> list:
+    """
+    Líneas de `-X importtime` como (modulo, nivel, self_us, acumulado_us)
+
+    El nivel es la profundidad de anidamiento (0 = importado por la entrada).
+    """
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or 'imported package' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|', 2)
+        nombre = nombre[1:]
+        nivel = (len(nombre) - len(nombre.lstrip(' '))) // 2
+        modulos.append((nombre.strip(), nivel, int(propio), int(acumulado)))
+    return modulos
+
+
+def modulos_base() -> set:
+    """Módulos que el intérprete y el cargador importan por sí solos"""
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import pkgutil, runpy, sys'], capture_output=True, text=True
+    )
+    return {modulo for modulo, _, _, _ in parsear_importtime(proceso.stderr)}
+
+
+def medir_arranque(nombre: str, ruta: Path, base: set) -> dict:
+    """Un proceso nuevo que carga `ruta`; tiempo total, imports y módulos pesados"""
+    codigo = _CARGAR.format(
+        raiz=str(RAIZ), carpeta=str(ruta.parent), ruta=str(ruta),
+        marca=_MARCA_PESADOS, pesados=MODULOS_PESADOS
+    )
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=RAIZ, capture_output=True, text=True
+    )
+    segundos = time.perf_counter() - inicio
+
+    if proceso.returncode != 0:
+        error = proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else f"exit {proceso.returncode}"
+        return {'entrada': nombre, 'omitido': error}
+
+    # Solo los imports de la entrada (nivel 0 y fuera de la base del intérprete)
+    propios = [m for m in parsear_importtime(proceso.stderr) if m[1] == 0 and m[0] not in base]
+    return {
+        'entrada': nombre,
+        'segundos': round(segundos, 4),
+        'segundos_imports': round(sum(acumulado for _, _, _, acumulado in propios) / 1e6, 4),
+        'mas_pesados': [
+            {'modulo': modulo, 'segundos': round(acumulado / 1e6, 4)}
+            for modulo, _, _, acumulado in sorted(propios, key=lambda m: m[3], reverse=True)
+        ],
+        'pesados_cargados': proceso.stdout.rsplit(_MARCA_PESADOS, 1)[-1].split()
+    }
+
+
+def medir_entrada(nombre: str, repeticiones: int, top: int, base: set) -> dict:
+    """Mínimo de `repeticiones` arranques, tras uno de calentamiento"""
+    ruta = RAIZ / ENTRADAS[nombre]
+    medir_arranque(nombre, ruta, base)
+    mediciones = [medir_arranque(nombre, ruta, base) for _ in range(repeticiones)]
+    if 'omitido' in mediciones[0]:
+        return mediciones[0]
+
+    resultado = min(mediciones, key=lambda m: m['segundos'])
+    resultado['repeticiones'] = repeticiones
+    resultado['segundos_mediana'] = sorted(m['segundos'] for m in mediciones)[len(mediciones) // 2]
+    resultado['mas_pesados'] = resultado['mas_pesados'][:top]
+    return resultado
+
+
+def comparar_con_historial(historial: list, corrida: dict) -> list:
+    """Variación del tiempo de arranque contra la corrida anterior de la misma plataforma"""
+    comparaciones = []
+    for resultado in corrida['resultados']:
+        if 'omitido' in resultado:
+            continue
+        anterior = None
+        for previa in reversed(historial):
+            if previa['maquina']['plataforma'] != corrida['maquina']['plataforma']:
+                continue
+            anterior = next(
+                (r for r in previa['resultados'] if r['entrada'] == resultado['entrada'] and 'omitido' not in r),
+                None
+            )
+            if anterior is not None:
+                break
+
+        variacion = None
+        if anterior is not None and anterior['segundos'] > 0:
+            variacion = resultado['segundos'] / anterior['segundos'] - 1
+        comparaciones.append((resultado, variacion))
+    return comparaciones
+
+
+if __name__ == "__main__":
+    opciones = dict(a[2:].split('=', 1) if '=' in a else (a[2:], '1') for a in sys.argv[1:] if a.startswith('--'))
+    entradas = [a for a in sys.argv[1:] if not a.startswith('--')] or list(ENTRADAS)
+    repeticiones = int(opciones.get('repeticiones', REPETICIONES))
+    top = int(opciones.get('top', TOP_MODULOS))
+    ruta_historial = Path(opciones.get('historial', RUTA_HISTORIAL))
+
+    desconocidas = set(entradas) - set(ENTRADAS)
+    if desconocidas:
+        sys.exit(f"Entradas desconocidas: {', '.join(sorted(desconocidas))} (disponibles: {', '.join(ENTRADAS)})")
+
+    corrida = {'fecha': datetime.now().isoformat(timespec='seconds'), 'maquina': info_maquina(), 'resultados': []}
+    print(f"\n⏱️  Arranque en frío de {len(entradas)} entradas ({repeticiones} repeticiones)")
+
+    base = modulos_base()
+    con_pesados = []
+    for nombre in entradas:
+        resultado = medir_entrada(nombre, repeticiones, top, base)
+        corrida['resultados'].append(resultado)
+        if 'omitido' in resultado:
+            print(f"\n   ℹ️  {nombre} omitido: {resultado['omitido']}")
+            continue
+
+        print(
+            f"\n   ✓ {nombre}: {resultado['segundos']:.3f}s "
+            f"(imports {resultado['segundos_imports']:.3f}s)"
+        )
+        for modulo in resultado['mas_pesados']:
+            print(f"      - {modulo['modulo']}: {modulo['segundos']:.3f}s")
+        if resultado['pesados_cargados']:
+            con_pesados.append(resultado)
+            print(f"      ⚠️  Carga al arrancar: {', '.join(resultado['pesados_cargados'])}")
+
+    historial = cargar_historial(ruta_historial)
+    regresiones = []
+    print(f"\n{'Entrada':<34}{'Seg':>8}{'Imports':>10}  vs anterior")
+    for resultado, variacion in comparar_con_historial(historial, corrida):
+        if variacion is None:
+            texto = 'sin referencia'
+        else:
+            texto = f"{variacion * 100:+.1f}%"
+            if variacion > UMBRAL_REGRESION:
+                texto += '  ⚠️  REGRESIÓN'
+                regresiones.append(resultado)
+        print(f"{resultado['entrada']:<34}{resultado['segundos']:>8.3f}{resultado['segundos_imports']:>10.3f}  {texto}")
+
+    historial.append(corrida)
+    guardar_historial(ruta_historial, historial)
+    print(f"\n✅ Corrida agregada a {ruta_historial} ({len(historial)} corridas)")
+
+    if (regresiones or con_pesados) and 'estricto' in opciones:
+        sys.exit(1)
@@ -0,0 +1,125 @@
+"""
+Benchmark de la decodificación de ventas: select('*') vs columnas tipadas
+
+Compara la forma anterior (todas las columnas, DataFrame desde dicts y
+pd.to_datetime) con la proyección + `filas_a_dataframe`. Mide tamaño del
+payload JSON, tiempo de decodificación, memoria del DataFrame y pico de
+memoria (tracemalloc) de cada variante.
+
+Uso:
+    python scripts/benchmark_carga.py               # 500.000 filas sintéticas
+    python scripts/benchmark_carga.py 2000000
+    python scripts/benchmark_carga.py --supabase    # ventas reales (180 días)
+"""
+
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from carga_paginada import ESQUEMA_VENTAS, CargadorPaginado, filas_a_dataframe
+
+
+def filas_sinteticas(n_filas: int, n_skus: int = 15000, seed: int = 0) -> list:
+    """Filas con todas las columnas de ventas_historicas, como las entrega PostgREST"""
+    rng = np.random.default_rng(seed)
+    hoy = date.today()
+    skus = rng.integers(0, n_skus, n_filas)
+    dias = rng.integers(0, 180, n_filas)
+    unidades = rng.poisson(3, n_filas)
+    precios = rng.integers(1000, 50000, n_filas)
+
+    return [
+        {
+            'id': i + 1,
+            'sku': f"SKU{skus[i]:05d}",
+            'fecha': (hoy - timedelta(days=int(dias[i]))).isoformat(),
+            'unidades': int(unidades[i]),
+            'precio': int(precios[i]),
+            'empresa': 'EMPRESA',
+            'canal': 'MERCADOLIBRE' if i % 2 else 'TIENDA',
+            'mlc': f"MLC{1000000000 + skus[i]}",
+            'descripcion': f"Producto de ejemplo número {skus[i]}",
+            'created_at': '2025-01-01T00:00:00.000000+00:00'
+        }
+        for i in range(n_filas)
+    ]
+
+
+def filas_supabase(columnas: str) -> list:
+    """Ventas de los últimos 180 días desde Supabase"""
+    from supabase import create_client
+
+    cliente = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_KEY'))
+    desde = (date.today() - timedelta(days=180)).isoformat()
+    return CargadorPaginado(cliente).cargar(
+        'ventas_historicas', columnas=columnas, columna_fecha='fecha', desde=desde
+    ).filas
+
+
+def decodificar_anterior(filas: list) -> pd.DataFrame:
+    df = pd.DataFrame(filas)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
+
+
+def decodificar_tipado(filas: list) -> pd.DataFrame:
+    return filas_a_dataframe(filas, ESQUEMA_VENTAS)
+
+
+def medir(nombre: str, filas: list, decodificar) -> dict:
+    payload = len(json.dumps(filas, separators=(',', ':')).encode())
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    df = decodificar(filas)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'variante': nombre,
+        'filas': len(df),
+        'payload_mb': payload / 1024 / 1024,
+        'decodificacion_s': segundos,
+        'dataframe_mb': df.memory_usage(deep=True).sum() / 1024 / 1024,
+        'pico_mb': pico / 1024 / 1024
+    }
+
+
+if __name__ == "__main__":
+    usar_supabase = '--supabase' in sys.argv
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    n_filas = int(argumentos[0]) if argumentos else 500_000
+
+    if usar_supabase:
+        filas_todas = filas_supabase('*')
+        filas_proyectadas = filas_supabase(','.join(ESQUEMA_VENTAS))
+    else:
+        filas_todas = filas_sinteticas(n_filas)
+        columnas = list(ESQUEMA_VENTAS) + ['id']
+        filas_proyectadas = [{c: fila[c] for c in columnas} for fila in filas_todas]
+
+    resultados = [
+        medir("select('*')", filas_todas, decodificar_anterior),
+        medir('proyección tipada', filas_proyectadas, decodificar_tipado)
+    ]
+
+    print(f"\n{'variante':<20}{'filas':>10}{'payload MB':>12}{'decodif. s':>12}{'DataFrame MB':>14}{'pico MB':>10}")
+    for r in resultados:
+        print(
+            f"{r['variante']:<20}{r['filas']:>10,}{r['payload_mb']:>12.1f}"
+            f"{r['decodificacion_s']:>12.2f}{r['dataframe_mb']:>14.1f}{r['pico_mb']:>10.1f}"
+        )
+
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\nRSS máximo del proceso: {rss_mb:.0f} MB")
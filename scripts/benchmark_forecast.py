@@ -0,0 +1,432 @@
+"""
+Benchmark de los motores de forecasting sobre catálogos sintéticos
+
+Para cada tamaño de catálogo (`carga_sintetica.generar_catalogo`) mide:
+
+- pipeline: ForecastPipeline completo sobre un SQLite temporal, con las
+  etapas de su `Instrumentacion` (carga, expansión de packs, forecast,
+  guardado, alertas, métricas)
+- ml_avanzado: AlgoritmoMLAvanzado por etapas (expansión de packs,
+  codificación, análisis del panel, predicciones, clasificación ABC y
+  serialización a los registros de la tabla `predicciones`)
+- ml_compacto: lo mismo con las ventas en formato compacto
+  (`ventas_compactas`); con --memoria, su pico frente al de ml_avanzado es
+  el ahorro de memoria del formato
+- backtest: backtesting rolling-origin sobre un mismo análisis con
+  ORIGENES_BACKTEST orígenes (una etapa por cantidad: el tiempo debe crecer
+  mucho menos que los orígenes) y la selección de modelo por SKU sobre la
+  grilla de `seleccion_modelos.CANDIDATOS`
+- reposicion: AlgoritmoPrediccionReposicion (conversión a registros y cálculo)
+- prophet: AlgoritmoProphetEstacionalidad sobre una muestra de SKUs con
+  2 años de historia (solo si Prophet está instalado; el costo es por SKU),
+  SKU a SKU y con el lote paralelo (`prophet_paralelo`) en WORKERS_PROPHET
+  procesos
+
+Cada corrida se agrega a un historial JSON con la máquina, el commit y las
+versiones, y se compara con la corrida anterior del mismo motor y tamaño en
+la misma plataforma: un tiempo mayor en más de UMBRAL_REGRESION se marca
+como regresión.
+
+Uso:
+    python scripts/benchmark_forecast.py                      # 1.000 y 10.000 SKUs
+    python scripts/benchmark_forecast.py 1000 10000 100000
+    python scripts/benchmark_forecast.py 10000 --motores=ml_avanzado,pipeline
+    python scripts/benchmark_forecast.py --memoria            # con tracemalloc
+    python scripts/benchmark_forecast.py 100000 --memoria --motores=ml_avanzado,ml_compacto
+    python scripts/benchmark_forecast.py --estricto           # exit 1 si hay regresión
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).parent.parent
+sys.path.append(str(RAIZ))
+sys.path.append(str(RAIZ / 'scripts'))
+
+from algoritmo_ml_avanzado import AlgoritmoMLAvanzado
+from algoritmo_prediccion_reposicion import (
+    AlgoritmoPrediccionReposicion, CompraRecord, PackComponent, StockRecord, TransitoRecord
+)
+from carga_sintetica import generar_catalogo
+from expansion_packs import aplanar_packs, expandir_packs
+from instrumentacion import Instrumentacion
+from ventas_compactas import compactar_ventas, expandir_packs_compactas
+
+
+MOTORES = ('pipeline', 'ml_avanzado', 'ml_compacto', 'backtest', 'reposicion', 'prophet')
+TAMANOS_POR_DEFECTO = (1_000, 10_000)
+RUTA_HISTORIAL = RAIZ / 'benchmarks' / 'historial_forecast.json'
+
+# Aumento relativo de tiempo respecto de la corrida anterior que cuenta como regresión
+UMBRAL_REGRESION = 0.20
+
+# Cantidades de orígenes medidas por el motor backtest
+ORIGENES_BACKTEST = (1, 8, 32)
+
+# SKUs de la muestra de Prophet (entrena un modelo por SKU)
+MUESTRA_PROPHET = 10
+WORKERS_PROPHET = 2
+
+
+def _resultado(motor: str, n_skus: int, instrumentacion: Instrumentacion, skus_medidos: int) -> dict:
+    etapas = [medicion.a_dict() for medicion in instrumentacion.etapas_terminadas()]
+    segundos = sum(e['segundos'] for e in etapas if e['nivel'] == 0)
+    picos = [e['pico_memoria_mb'] for e in etapas if e['pico_memoria_mb'] is not None]
+    return {
+        'motor': motor,
+        'n_skus': n_skus,
+        'skus_medidos': skus_medidos,
+        'segundos': segundos,
+        'skus_por_segundo': skus_medidos / segundos if segundos > 0 else 0.0,
+        'rss_maximo_mb': max((e['rss_maximo_mb'] for e in etapas), default=0.0),
+        'pico_memoria_mb': max(picos) if picos else None,
+        'etapas': etapas
+    }
+
+
+def medir_pipeline(catalogo, n_skus: int, memoria: bool) -> dict:
+    """ForecastPipeline de punta a punta con una FuenteSQLite temporal"""
+    from fuentes_datos import FuenteSQLite
+    from run_daily_forecast import ForecastPipeline
+
+    entorno = {
+        'FORECAST_TRAZAR_MEMORIA': '1' if memoria else '0',
+        'FORECAST_STREAMING': '0',
+        'FORECAST_INCREMENTAL': '0',
+        'FORECAST_CACHE': ''
+    }
+    anterior = {clave: os.environ.get(clave) for clave in entorno}
+    directorio_actual = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        fuente = FuenteSQLite(os.path.join(directorio, 'forecast.sqlite'))
+        catalogo.escribir_en(fuente)
+
+        os.environ.update(entorno)
+        os.chdir(directorio)  # forecast_summary.txt y forecast_metricas.json quedan en el temporal
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                pipeline = ForecastPipeline(fuente=fuente)
+                pipeline.ejecutar()
+        finally:
+            os.chdir(directorio_actual)
+            for clave, valor in anterior.items():
+                if valor is None:
+                    os.environ.pop(clave, None)
+                else:
+                    os.environ[clave] = valor
+            fuente.conexion.close()
+
+    instrumentacion = pipeline.instrumentacion
+    forecast = next((m for m in instrumentacion.etapas if m.nombre == 'forecast'), None)
+    return _resultado('pipeline', n_skus, instrumentacion, forecast.elementos if forecast else 0)
+
+
+def medir_ml_avanzado(catalogo, n_skus: int, memoria: bool, compacto: bool = False) -> dict:
+    """
+    AlgoritmoMLAvanzado por etapas, sobre las ventas con packs expandidos
+
+    Con `compacto`, las ventas pasan a `VentasCompactas` antes de expandir packs.
+    """
+    instrumentacion = Instrumentacion(trazar_memoria=memoria)
+    algoritmo = AlgoritmoMLAvanzado()
+    ahora = pd.Timestamp.now()
+    transito = catalogo.transito[catalogo.transito['estado'] == 'en_transito']
+
+    if compacto:
+        with instrumentacion.etapa('compactacion') as medicion:
+            ventas_df = compactar_ventas(catalogo.ventas)
+            medicion.elementos = len(ventas_df)
+
+    with instrumentacion.etapa('expansion_packs') as medicion:
+        tabla_packs, _ = aplanar_packs(catalogo.packs_dict())
+        if compacto:
+            ventas_df, _ = expandir_packs_compactas(ventas_df, tabla_packs)
+        else:
+            ventas_df, _ = expandir_packs(catalogo.ventas, tabla_packs)
+        medicion.elementos = len(ventas_df)
+
+    with instrumentacion.etapa('codificacion') as medicion:
+        ventas, compras = algoritmo._codificar(ventas_df, catalogo.compras)
+        datos = algoritmo._datos_por_sku(ventas.skus, ventas_df, catalogo.stock, transito)
+        medicion.elementos = len(ventas_df)
+
+    with instrumentacion.etapa('analisis_panel', unidad='SKUs') as medicion:
+        analisis = algoritmo.analizar_panel(ventas, datos['stock_actual'], compras=compras, ahora=ahora)
+        medicion.elementos = ventas.n_skus
+
+    with instrumentacion.etapa('predicciones', unidad='SKUs') as medicion:
+        resultados = algoritmo.predicciones_desde_analisis(
+            analisis, datos['stock_actual'], datos['transito_china'],
+            datos['precio_unitario'], datos['descripcion']
+        )
+        medicion.elementos = ventas.n_skus
+
+    with instrumentacion.etapa('clasificacion_abc', unidad='SKUs') as medicion:
+        predicciones = algoritmo.clasificar_y_ordenar(resultados)
+        medicion.elementos = len(predicciones)
+
+    with instrumentacion.etapa('serializacion', unidad='SKUs') as medicion:
+        marca = datetime.now()
+        predicciones.registros(fecha_calculo=marca.isoformat(), dia_calculo=marca.date().isoformat())
+        medicion.elementos = len(predicciones)
+
+    return _resultado('ml_compacto' if compacto else 'ml_avanzado', n_skus, instrumentacion, ventas.n_skus)
+
+
+def medir_backtest(catalogo, n_skus: int, memoria: bool) -> dict:
+    """Backtesting con 1, 8 y 32 orígenes y selección de modelos sobre el mismo análisis del panel"""
+    from backtesting import HORIZONTE_DIAS, origenes_backtest
+
+    instrumentacion = Instrumentacion(trazar_memoria=memoria)
+    algoritmo = AlgoritmoMLAvanzado()
+    tabla_packs, _ = aplanar_packs(catalogo.packs_dict())
+    ventas_df, _ = expandir_packs_compactas(compactar_ventas(catalogo.ventas), tabla_packs)
+
+    with instrumentacion.etapa('analisis_panel', unidad='SKUs') as medicion:
+        ventas, compras = algoritmo._codificar(ventas_df, catalogo.compras)
+        datos = algoritmo._datos_por_sku(ventas.skus, ventas_df, catalogo.stock)
+        analisis = algoritmo.analizar_panel(ventas, datos['stock_actual'], compras=compras)
+        medicion.elementos = ventas.n_skus
+
+    for n_origenes in ORIGENES_BACKTEST:
+        # Orígenes repartidos en los 120 días previos al último horizonte completo
+        origenes = origenes_backtest(
+            analisis.matriz.n_dias, HORIZONTE_DIAS, n_origenes, paso=max(1, 120 // n_origenes)
+        )
+        with instrumentacion.etapa(f'origenes_{n_origenes}', unidad='SKUs') as medicion:
+            algoritmo.backtest(analisis, origenes=origenes)
+            medicion.elementos = ventas.n_skus
+
+    with instrumentacion.etapa('seleccion_modelos', unidad='SKUs') as medicion:
+        algoritmo.seleccionar_modelos(analisis)
+        medicion.elementos = ventas.n_skus
+
+    return _resultado('backtest', n_skus, instrumentacion, ventas.n_skus)
+
+
+def medir_reposicion(catalogo, n_skus: int, memoria: bool) -> dict:
+    """AlgoritmoPrediccionReposicion, incluida la conversión a sus registros"""
+    instrumentacion = Instrumentacion(trazar_memoria=memoria)
+    algoritmo = AlgoritmoPrediccionReposicion()
+
+    with instrumentacion.etapa('conversion_registros') as medicion:
+        ventas = compactar_ventas(catalogo.ventas).registros_venta()
+        stock = list(map(
+            StockRecord, catalogo.stock['sku'], catalogo.stock['stock_total'], catalogo.stock['descripcion']
+        ))
+        en_transito = catalogo.transito[catalogo.transito['estado'] == 'en_transito']
+        transito = list(map(TransitoRecord, en_transito['sku'], en_transito['unidades']))
+        compras = list(map(
+            CompraRecord,
+            np.asarray(catalogo.compras['sku'], dtype=object).tolist(),
+            catalogo.compras['fecha'].dt.to_pydatetime().tolist()
+        ))
+        packs = {
+            pack: [PackComponent(componente, cantidad) for componente, cantidad in componentes]
+            for pack, componentes in catalogo.packs_dict().items()
+        }
+        medicion.elementos = len(ventas)
+
+    with instrumentacion.etapa('calculo', unidad='SKUs') as medicion:
+        with contextlib.redirect_stdout(io.StringIO()):
+            algoritmo.calcular_sugerencias_por_sku(
+                ventas=ventas,
+                stock=stock,
+                transito=transito,
+                compras=compras,
+                packs=packs,
+                skus_desconsiderar=catalogo.skus_excluidos
+            )
+        medicion.elementos = len(stock)
+
+    return _resultado('reposicion', n_skus, instrumentacion, len(stock))
+
+
+def medir_prophet(memoria: bool) -> dict:
+    """AlgoritmoProphetEstacionalidad sobre MUESTRA_PROPHET SKUs con 2 años de historia"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        from algoritmo_prophet_estacionalidad import PROPHET_AVAILABLE, AlgoritmoProphetEstacionalidad
+    if not PROPHET_AVAILABLE:
+        return {'motor': 'prophet', 'n_skus': MUESTRA_PROPHET, 'omitido': 'Prophet no instalado'}
+
+    catalogo = generar_catalogo(MUESTRA_PROPHET * 5, dias=730, fraccion_packs=0.0, semilla=1)
+    ventas = catalogo.ventas.assign(sku=np.asarray(catalogo.ventas['sku'], dtype=object))
+    dias_con_venta = ventas.groupby('sku')['fecha'].nunique()
+    muestra = dias_con_venta[dias_con_venta >= 365].index[:MUESTRA_PROPHET].tolist()
+
+    instrumentacion = Instrumentacion(trazar_memoria=memoria)
+    algoritmo = AlgoritmoProphetEstacionalidad()
+    horizonte = algoritmo.dias_transito + algoritmo.dias_stock_deseado
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for nombre in ('preparacion', 'entrenamiento', 'forecast', 'prediccion_completa'):
+            with instrumentacion.etapa(nombre, unidad='SKUs') as medicion:
+                for sku in muestra:
+                    inicio = time.perf_counter()
+                    if nombre == 'prediccion_completa':
+                        algoritmo.calcular_prediccion_sku(ventas, sku, 0.0, 0.0, 1000.0)
+                        instrumentacion.latencias_sku[sku] = time.perf_counter() - inicio
+                        continue
+                    datos = algoritmo.preparar_datos_prophet(ventas, sku)
+                    if nombre in ('entrenamiento', 'forecast'):
+                        modelo = algoritmo.entrenar_modelo_prophet(datos)
+                    if nombre == 'forecast':
+                        algoritmo.hacer_forecast(modelo, dias_futuro=horizonte)
+                medicion.elementos = len(muestra)
+
+        with instrumentacion.etapa('lote_paralelo', unidad='SKUs') as medicion:
+            algoritmo.calcular_predicciones_lote(
+                ventas[ventas['sku'].isin(muestra)], catalogo.stock, n_workers=WORKERS_PROPHET
+            )
+            medicion.elementos = len(muestra)
+
+    # Las etapas acumulan: cada una repite las anteriores; el total es la predicción completa
+    resultado = _resultado('prophet', MUESTRA_PROPHET, instrumentacion, len(muestra))
+    resultado['segundos'] = next(e['segundos'] for e in resultado['etapas'] if e['nombre'] == 'prediccion_completa')
+    resultado['skus_por_segundo'] = len(muestra) / resultado['segundos'] if resultado['segundos'] > 0 else 0.0
+    resultado['latencias_sku'] = instrumentacion.histograma_latencias()
+    return resultado
+
+
+def info_maquina() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'commit': commit
+    }
+
+
+def comparar_con_historial(historial: list, corrida: dict) -> list:
+    """Variación de tiempo de cada resultado contra la corrida anterior comparable"""
+    comparaciones = []
+    for resultado in corrida['resultados']:
+        if 'omitido' in resultado:
+            continue
+        anterior = None
+        for previa in reversed(historial):
+            if previa['maquina']['plataforma'] != corrida['maquina']['plataforma']:
+                continue
+            anterior = next(
+                (r for r in previa['resultados']
+                 if r['motor'] == resultado['motor'] and r['n_skus'] == resultado['n_skus'] and 'omitido' not in r),
+                None
+            )
+            if anterior is not None:
+                break
+
+        variacion = None
+        if anterior is not None and anterior['segundos'] > 0:
+            variacion = resultado['segundos'] / anterior['segundos'] - 1
+        comparaciones.append((resultado, variacion))
+    return comparaciones
+
+
+def cargar_historial(ruta: Path) -> list:
+    if not ruta.exists():
+        return []
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def guardar_historial(ruta: Path, historial: list) -> None:
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(historial, archivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    opciones = dict(a[2:].split('=', 1) if '=' in a else (a[2:], '1') for a in sys.argv[1:] if a.startswith('--'))
+    tamanos = [int(a) for a in sys.argv[1:] if not a.startswith('--')] or list(TAMANOS_POR_DEFECTO)
+    motores = opciones.get('motores', ','.join(MOTORES)).split(',')
+    memoria = 'memoria' in opciones
+    ruta_historial = Path(opciones.get('historial', RUTA_HISTORIAL))
+
+    desconocidos = set(motores) - set(MOTORES)
+    if desconocidos:
+        sys.exit(f"Motores desconocidos: {', '.join(sorted(desconocidos))} (disponibles: {', '.join(MOTORES)})")
+
+    corrida = {'fecha': datetime.now().isoformat(timespec='seconds'), 'maquina': info_maquina(), 'resultados': []}
+    print(f"\n⏱️  Benchmark de forecasting: {', '.join(motores)} con {', '.join(f'{n:,}' for n in tamanos)} SKUs")
+
+    for n_skus in tamanos:
+        inicio = time.perf_counter()
+        catalogo = generar_catalogo(n_skus)
+        resumen = catalogo.resumen()
+        print(
+            f"\n📦 Catálogo de {n_skus:,} SKUs: {resumen['filas_ventas']:,} ventas, "
+            f"{resumen['packs']} packs ({time.perf_counter() - inicio:.1f}s)"
+        )
+
+        for motor in motores:
+            if motor == 'prophet':
+                continue
+            if motor == 'ml_compacto':
+                resultado = medir_ml_avanzado(catalogo, n_skus, memoria, compacto=True)
+            else:
+                medir = {
+                    'pipeline': medir_pipeline, 'ml_avanzado': medir_ml_avanzado,
+                    'backtest': medir_backtest, 'reposicion': medir_reposicion
+                }[motor]
+                resultado = medir(catalogo, n_skus, memoria)
+            resultado['catalogo'] = resumen
+            corrida['resultados'].append(resultado)
+            pico = f", pico {resultado['pico_memoria_mb']:,.0f} MB" if resultado['pico_memoria_mb'] is not None else ''
+            print(f"   ✓ {motor}: {resultado['segundos']:.2f}s ({resultado['skus_por_segundo']:,.0f} SKUs/s{pico})")
+            for etapa in resultado['etapas']:
+                memoria_etapa = f" ({etapa['pico_memoria_mb']:,.0f} MB)" if etapa['pico_memoria_mb'] is not None else ''
+                print(f"      {'  ' * etapa['nivel']}- {etapa['nombre']}: {etapa['segundos']:.2f}s{memoria_etapa}")
+
+    if 'prophet' in motores:
+        resultado = medir_prophet(memoria)
+        corrida['resultados'].append(resultado)
+        if 'omitido' in resultado:
+            print(f"\n   ℹ️  prophet omitido: {resultado['omitido']}")
+        else:
+            print(f"\n   ✓ prophet: {resultado['segundos']:.2f}s para {resultado['skus_medidos']} SKUs")
+
+    historial = cargar_historial(ruta_historial)
+    regresiones = []
+    print(f"\n{'Motor':<14}{'SKUs':>10}{'Seg':>10}{'SKUs/s':>12}  vs anterior")
+    for resultado, variacion in comparar_con_historial(historial, corrida):
+        if variacion is None:
+            texto = 'sin referencia'
+        else:
+            texto = f"{variacion * 100:+.1f}%"
+            if variacion > UMBRAL_REGRESION:
+                texto += '  ⚠️  REGRESIÓN'
+                regresiones.append(resultado)
+        print(
+            f"{resultado['motor']:<14}{resultado['n_skus']:>10,}{resultado['segundos']:>10.2f}"
+            f"{resultado['skus_por_segundo']:>12,.0f}  {texto}"
+        )
+
+    historial.append(corrida)
+    guardar_historial(ruta_historial, historial)
+    print(f"\n✅ Corrida agregada a {ruta_historial} ({len(historial)} corridas)")
+
+    if regresiones and 'estricto' in opciones:
+        sys.exit(1)
@@ -7,7 +7,6 @@ import sys
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
-from supabase import create_client
 
 # Cargar variables de entorno
 from dotenv import load_dotenv
@@ -27,6 +26,7 @@ class CargadorDatosExcel:
         if not self.supabase_url or not self.supabase_key:
             raise ValueError("Faltan credenciales de Supabase en .env.local")
 
+        from supabase import create_client
         self.supabase = create_client(self.supabase_url, self.supabase_key)
 
         print(f"✅ Conectado a Supabase")
@@ -0,0 +1,59 @@
+"""
+Copia las tablas de entrada del forecasting desde Supabase a un SQLite local
+
+Con la copia, el pipeline corre completo sin red ni credenciales:
+
+    FORECAST_FUENTE=sqlite FORECAST_SQLITE=datos/forecast.sqlite \
+        python scripts/run_daily_forecast.py
+
+Uso:
+    python scripts/exportar_fuente_local.py                          # datos/forecast.sqlite
+    python scripts/exportar_fuente_local.py datos/copia.sqlite 365   # días de ventas
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fuentes_datos import FuenteSQLite, FuenteSupabase
+
+
+ESTADOS_COTIZACION = ['pendiente', 'respondida', 'aprobada', 'recibida']
+
+
+def exportar(origen: FuenteSupabase, destino: FuenteSQLite, dias_historico: int = 180):
+    """Reemplaza las tablas de entrada de `destino` con las de `origen`"""
+    desde = (datetime.now() - pd.Timedelta(days=dias_historico)).strftime('%Y-%m-%d')
+    configuracion = origen.configuracion()
+
+    tablas = {
+        'configuracion_sistema': pd.DataFrame(
+            {'clave': list(configuracion), 'valor': list(configuracion.values())}
+        ),
+        'packs': pd.DataFrame(origen.packs(), columns=['sku_pack', 'sku_componente', 'cantidad']),
+        'skus_excluidos': pd.DataFrame({'sku': sorted(origen.skus_excluidos())}),
+        'ventas_historicas': origen.ventas(desde=desde),
+        'stock_actual': origen.stock(),
+        'transito_china': pd.DataFrame(origen.transito_china(), columns=['sku', 'unidades', 'estado']),
+        'cotizaciones': pd.DataFrame(
+            origen.cotizaciones(ESTADOS_COTIZACION), columns=['sku', 'cantidad_cotizar', 'estado']
+        ),
+        'compras': origen.compras()
+    }
+
+    for tabla, df in tablas.items():
+        filas = destino.escribir_tabla(tabla, df)
+        print(f"   ✓ {tabla}: {filas} filas")
+
+
+if __name__ == "__main__":
+    ruta = sys.argv[1] if len(sys.argv) > 1 else 'datos/forecast.sqlite'
+    dias = int(sys.argv[2]) if len(sys.argv) > 2 else 180
+
+    print(f"\n📥 Copiando tablas de Supabase a {ruta} ({dias} días de ventas)...")
+    exportar(FuenteSupabase.desde_entorno(), FuenteSQLite(ruta), dias)
+    print("\n✅ Copia lista")
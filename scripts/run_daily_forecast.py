@@ -4,17 +4,38 @@ Ejecutado por GitHub Actions
 """
 
 import os
+import queue
 import sys
+import threading
 from pathlib import Path
+from typing import List
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from supabase import create_client, Client
+from datetime import datetime
 
 # Agregar path del proyecto
 sys.path.append(str(Path(__file__).parent.parent))
 
 from algoritmo_ml_avanzado import AlgoritmoMLAvanzado
+from backtesting import ResultadoBacktest
+from cache_predicciones import CachePredicciones
+from escritura_lotes import ResultadoEscritura
+from estado_incremental import cargar_estado, estado_vigente, firma_estado, guardar_estado
+from expansion_packs import aplanar_packs
+from fuentes_datos import FuenteDatos, fuente_desde_entorno
+from instrumentacion import Instrumentacion
+from predicciones_batch import PrediccionesBatch
+from tabla_predicciones import (
+    CLASES_ABC, agregados_por_abc, alertas_inventario, estadisticas_resumen, tabla_predicciones
+)
+from ventas_compactas import VentasCompactas, compactar_ventas, expandir_packs_compactas
+
+
+# Bloques de predicciones calculados que pueden esperar a la escritura (modo streaming)
+BLOQUES_EN_COLA = 2
+
+# Artefacto con las mediciones de la corrida (tiempo, CPU, memoria por etapa)
+RUTA_METRICAS_JSON = 'forecast_metricas.json'
 
 
 def sanitize_float(value):
@@ -29,27 +50,32 @@ def sanitize_float(value):
         return 0.0
 
 
-def sanitize_bool(value):
-    """Convierte NumPy bool a Python bool"""
-    return bool(value)
+def _es_pack(predicciones: PrediccionesBatch) -> np.ndarray:
+    """Máscara de las predicciones de SKUs tipo PACK"""
+    return np.asarray(pd.Index(predicciones.skus).str.startswith('PACK'), dtype=bool)
 
 
 class ForecastPipeline:
     """Pipeline completo de forecasting"""
 
-    def __init__(self):
-        # Configuración desde variables de entorno
-        self.supabase_url = os.getenv('SUPABASE_URL')
-        self.supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
-
-        if not self.supabase_url or not self.supabase_key:
-            raise ValueError("Faltan credenciales de Supabase en variables de entorno")
+    def __init__(self, fuente: FuenteDatos = None):
+        """
+        Args:
+            fuente: Origen de los datos y destino de los resultados (por
+                defecto según FORECAST_FUENTE: Supabase o un SQLite local)
+        """
+        # Tiempo, CPU y memoria por etapa (tracemalloc agrega overhead: FORECAST_TRAZAR_MEMORIA=0)
+        self.instrumentacion = Instrumentacion(
+            trazar_memoria=os.getenv('FORECAST_TRAZAR_MEMORIA', '1') == '1'
+        )
 
-        # Conectar a Supabase
-        self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        # Conectar a la fuente de datos (Supabase con credenciales desde variables de entorno)
+        self.fuente = fuente if fuente is not None else fuente_desde_entorno()
 
         # Cargar configuración desde BD (con fallbacks a variables de entorno)
-        config = self._cargar_configuracion()
+        with self.instrumentacion.etapa('configuracion', unidad='parámetros') as medicion:
+            config = self._cargar_configuracion()
+            medicion.elementos = len(config)
 
         # Inicializar algoritmo con configuración
         self.algoritmo = AlgoritmoMLAvanzado(
@@ -61,24 +87,67 @@ class ForecastPipeline:
             umbral_abc_a=config['umbral_abc_a'],
             umbral_abc_b=config['umbral_abc_b'],
             umbral_xyz_x=config['umbral_xyz_x'],
-            umbral_xyz_y=config['umbral_xyz_y']
+            umbral_xyz_y=config['umbral_xyz_y'],
+            ajustar_modelos=os.getenv('FORECAST_AJUSTE_MODELOS', '0') == '1'
         )
 
         # Guardar configuración para uso posterior
         self.config = config
 
+        # Procesos para el cálculo de predicciones (1 = serial)
+        self.n_workers = int(os.getenv('FORECAST_WORKERS', '1'))
+
+        # Modo incremental: estado por SKU persistido entre corridas
+        self.incremental = os.getenv('FORECAST_INCREMENTAL', '0') == '1'
+        self.forzar_completo = os.getenv('FORECAST_FORZAR_COMPLETO', '0') == '1'
+        self.ruta_estado = os.getenv('FORECAST_ESTADO', 'estado/forecast_estado.npz')
+        self.dias_recalculo_completo = int(os.getenv('DIAS_RECALCULO_COMPLETO', '7'))
+        self.firma_estado = firma_estado(config['alpha_ewma'], 180)
+
+        # Streaming: escribe cada bloque de SKUs mientras se calcula el siguiente
+        self.streaming = os.getenv('FORECAST_STREAMING', '0') == '1'
+        self.skus_por_bloque = int(os.getenv('FORECAST_SKUS_POR_BLOQUE', '2000'))
+
+        # Backtesting rolling-origin para las métricas de error (MAPE/MAE/RMSE/bias)
+        self.backtesting = os.getenv('FORECAST_BACKTEST', '1') == '1'
+        self.backtest_origenes = int(os.getenv('FORECAST_BACKTEST_ORIGENES', '8'))
+        self.backtest_horizonte = int(os.getenv('FORECAST_BACKTEST_HORIZONTE', '30'))
+
+        # Cache de predicciones por SKU (vacío = desactivado)
+        self.cache = None
+        directorio_cache = os.getenv('FORECAST_CACHE', '')
+        if directorio_cache:
+            self.cache = CachePredicciones(
+                directorio_cache,
+                max_bytes=int(os.getenv('FORECAST_CACHE_MB', '256')) * 1024 * 1024
+            )
+
         print(f"✅ Pipeline inicializado con configuración desde BD")
         print(f"   - Días stock deseado: {config['dias_stock_deseado']}")
         print(f"   - Días tránsito: {config['dias_transito']}")
         print(f"   - Nivel de servicio: {config['nivel_servicio'] * 100}%")
         print(f"   - Umbral intermitencia: {config['umbral_intermitencia']}")
         print(f"   - Alpha EWMA: {config['alpha_ewma']}")
-
-        # Cargar matriz de packs
-        self.packs_dict = self._cargar_packs()
+        print(f"   - Workers: {self.n_workers}")
+        print(f"   - Modo incremental: {'sí' if self.incremental else 'no'}")
+        print(f"   - Cache de predicciones: {directorio_cache or 'no'}")
+        print(f"   - Streaming cálculo/escritura: {'sí' if self.streaming else 'no'}")
+        print(f"   - Backtesting: {f'{self.backtest_origenes} orígenes, {self.backtest_horizonte} días' if self.backtesting else 'no'}")
+        print(f"   - Modelo por SKU: {'ajustado por backtesting' if self.algoritmo.ajustar_modelos else 'regla EWMA/Croston'}")
+        print(f"   - Fuente de datos: {self.fuente.nombre}")
+
+        # Cargar matriz de packs y aplanarla (packs anidados) una sola vez
+        with self.instrumentacion.etapa('packs', unidad='componentes') as medicion:
+            self.packs_dict = self._cargar_packs()
+            self.tabla_packs, ciclos = aplanar_packs(self.packs_dict)
+            medicion.elementos = len(self.tabla_packs)
+        if ciclos:
+            print(f"   ⚠️  Packs que se contienen a sí mismos (no se expanden de nuevo): {', '.join(ciclos)}")
 
         # Cargar SKUs excluidos
-        self.skus_excluidos = self._cargar_skus_excluidos()
+        with self.instrumentacion.etapa('skus_excluidos', unidad='SKUs') as medicion:
+            self.skus_excluidos = self._cargar_skus_excluidos()
+            medicion.elementos = len(self.skus_excluidos)
 
 
     def _cargar_configuracion(self) -> dict:
@@ -101,13 +170,11 @@ class ForecastPipeline:
 
         try:
             # Intentar cargar desde BD
-            response = self.supabase.table('configuracion_sistema').select('*').execute()
+            parametros = self.fuente.configuracion()
 
-            if response.data:
-                # Convertir array de configs a diccionario
-                for item in response.data:
-                    config[item['clave']] = float(item['valor'])
-                print(f"   ✓ Configuración cargada desde BD ({len(response.data)} parámetros)")
+            if parametros:
+                config.update(parametros)
+                print(f"   ✓ Configuración cargada desde BD ({len(parametros)} parámetros)")
             else:
                 print(f"   ⚠️  Tabla de configuración vacía, usando valores por defecto")
 
@@ -122,15 +189,15 @@ class ForecastPipeline:
         """Carga la matriz de packs para descomposición"""
         print(f"\n📦 Cargando matriz de packs...")
 
-        response = self.supabase.table('packs').select('*').execute()
+        filas = self.fuente.packs()
 
-        if not response.data:
+        if not filas:
             print("   ℹ️  No hay packs configurados")
             return {}
 
         # Crear diccionario: {sku_pack: [(sku_componente, cantidad), ...]}
         packs = {}
-        for row in response.data:
+        for row in filas:
             sku_pack = row['sku_pack']
             sku_comp = row['sku_componente']
             cantidad = float(row['cantidad'])
@@ -148,13 +215,12 @@ class ForecastPipeline:
         print(f"\n🚫 Cargando SKUs excluidos...")
 
         try:
-            response = self.supabase.table('skus_excluidos').select('sku').execute()
+            excluidos = self.fuente.skus_excluidos()
 
-            if not response.data:
+            if not excluidos:
                 print("   ℹ️  No hay SKUs excluidos")
                 return set()
 
-            excluidos = {row['sku'] for row in response.data}
             print(f"   ✓ {len(excluidos)} SKUs excluidos del análisis")
             return excluidos
 
@@ -163,122 +229,75 @@ class ForecastPipeline:
             return set()
 
 
-    def cargar_datos_ventas(self, dias_historico: int = 180) -> pd.DataFrame:
-        """Carga ventas de los últimos N días desde Supabase con paginación"""
-        print(f"\n📥 Cargando ventas de últimos {dias_historico} días...")
-
-        fecha_inicio = (datetime.now() - pd.Timedelta(days=dias_historico)).strftime('%Y-%m-%d')
-
-        # Cargar todos los datos con paginación
-        all_data = []
-        page_size = 1000
-        offset = 0
-
-        while True:
-            response = self.supabase.table('ventas_historicas') \
-                .select('*') \
-                .gte('fecha', fecha_inicio) \
-                .range(offset, offset + page_size - 1) \
-                .execute()
+    def cargar_datos_ventas(self, dias_historico: int = 180, desde: datetime = None) -> VentasCompactas:
+        """
+        Carga ventas de los últimos N días desde la fuente de datos
 
-            if not response.data or len(response.data) == 0:
-                break
-
-            all_data.extend(response.data)
-            print(f"   ✓ Descargados {len(all_data)} registros...")
+        Con `desde`, carga solo las ventas posteriores a esa fecha (modo incremental).
+        Las ventas quedan en formato compacto (16 bytes por fila).
+        """
+        if desde is not None:
+            print(f"\n📥 Cargando ventas posteriores al {desde.strftime('%Y-%m-%d')}...")
+        else:
+            print(f"\n📥 Cargando ventas de últimos {dias_historico} días...")
 
-            if len(response.data) < page_size:
-                break
+        fecha_inicio = (datetime.now() - pd.Timedelta(days=dias_historico)).strftime('%Y-%m-%d')
 
-            offset += page_size
+        df = self.fuente.ventas(
+            desde=desde if desde is not None else fecha_inicio,
+            incluir_desde=desde is None
+        )
 
-        if not all_data:
+        if df.empty:
             print("⚠️  No se encontraron ventas")
             return pd.DataFrame()
 
-        df = pd.DataFrame(all_data)
-        df['fecha'] = pd.to_datetime(df['fecha'])
+        bytes_df = df.memory_usage(deep=True).sum()
+        ventas = compactar_ventas(df)
+        del df
 
-        print(f"   ✓ {len(df)} registros cargados")
-        print(f"   ✓ {df['sku'].nunique()} SKUs únicos")
+        print(f"   ✓ {len(ventas)} registros cargados")
+        print(f"   ✓ {ventas.n_skus} SKUs únicos")
+        print(f"   ✓ Formato compacto: {ventas.nbytes / 1e6:.1f} MB (DataFrame: {bytes_df / 1e6:.1f} MB)")
 
         # Filtrar SKUs excluidos
         if self.skus_excluidos:
-            skus_antes = df['sku'].nunique()
-            df = df[~df['sku'].isin(self.skus_excluidos)]
-            skus_despues = df['sku'].nunique()
-            print(f"   ✓ {skus_antes - skus_despues} SKUs excluidos filtrados ({skus_despues} restantes)")
+            skus_antes = ventas.n_skus
+            ventas = ventas.sin_skus(self.skus_excluidos)
+            print(f"   ✓ {skus_antes - ventas.n_skus} SKUs excluidos filtrados ({ventas.n_skus} restantes)")
 
         # Expandir packs a SKUs componentes
         if self.packs_dict:
-            df = self._expandir_packs(df)
+            with self.instrumentacion.etapa('expansion_packs') as medicion:
+                ventas = self._expandir_packs(ventas)
+                medicion.elementos = len(ventas)
 
-        return df
+        return ventas
 
 
-    def _expandir_packs(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Expande las ventas de packs a sus SKUs componentes"""
+    def _expandir_packs(self, ventas: VentasCompactas) -> VentasCompactas:
+        """Expande las ventas de packs a sus SKUs componentes (incluye packs anidados)"""
         print(f"\n📦 Expandiendo packs a SKUs componentes...")
 
-        ventas_expandidas = []
-        packs_encontrados = 0
-
-        for _, row in df.iterrows():
-            sku = row['sku']
-
-            # Si es un pack, expandir
-            if sku in self.packs_dict:
-                packs_encontrados += 1
-                componentes = self.packs_dict[sku]
-
-                for sku_comp, cantidad in componentes:
-                    row_expandida = row.copy()
-                    row_expandida['sku'] = sku_comp
-                    row_expandida['unidades'] = row['unidades'] * cantidad
-                    ventas_expandidas.append(row_expandida)
-            else:
-                # No es un pack, mantener como está
-                ventas_expandidas.append(row)
-
-        df_expandido = pd.DataFrame(ventas_expandidas)
+        expandidas, packs_encontrados = expandir_packs_compactas(ventas, self.tabla_packs)
 
         print(f"   ✓ {packs_encontrados} registros de packs expandidos")
-        print(f"   ✓ {len(df_expandido)} registros totales después de expansión")
-        print(f"   ✓ {df_expandido['sku'].nunique()} SKUs únicos")
+        print(f"   ✓ {len(expandidas)} registros totales después de expansión")
+        print(f"   ✓ {expandidas.n_skus} SKUs únicos")
 
-        return df_expandido
+        return expandidas
 
 
     def cargar_datos_stock(self) -> pd.DataFrame:
-        """Carga stock actual desde Supabase con paginación"""
+        """Carga stock actual desde la fuente de datos"""
         print(f"\n📦 Cargando stock actual...")
 
-        all_data = []
-        page_size = 1000
-        offset = 0
-
-        while True:
-            response = self.supabase.table('stock_actual') \
-                .select('*') \
-                .range(offset, offset + page_size - 1) \
-                .execute()
+        df = self.fuente.stock()
 
-            if not response.data or len(response.data) == 0:
-                break
-
-            all_data.extend(response.data)
-
-            if len(response.data) < page_size:
-                break
-
-            offset += page_size
-
-        if not all_data:
+        if df.empty:
             print("⚠️  No se encontró información de stock")
             return pd.DataFrame()
 
-        df = pd.DataFrame(all_data)
-
         print(f"   ✓ {len(df)} SKUs con stock")
 
         return df
@@ -289,14 +308,11 @@ class ForecastPipeline:
         print(f"\n🚢 Cargando tránsito China y cotizaciones en proceso...")
 
         # 1. Cargar tránsito China
-        response_transito = self.supabase.table('transito_china') \
-            .select('*') \
-            .filter('estado', 'eq', 'en_transito') \
-            .execute()
+        filas_transito = self.fuente.transito_china()
 
         transito_data = []
-        if response_transito.data:
-            for row in response_transito.data:
+        if filas_transito:
+            for row in filas_transito:
                 transito_data.append({
                     'sku': row['sku'],
                     'unidades': row['unidades'],
@@ -308,14 +324,11 @@ class ForecastPipeline:
 
         # 2. Cargar cotizaciones en proceso (tratadas como tránsito)
         # Estados: pendiente, respondida, aprobada, recibida (excluir solo rechazada)
-        response_cotizaciones = self.supabase.table('cotizaciones') \
-            .select('*') \
-            .in_('estado', ['pendiente', 'respondida', 'aprobada', 'recibida']) \
-            .execute()
+        filas_cotizaciones = self.fuente.cotizaciones(['pendiente', 'respondida', 'aprobada', 'recibida'])
 
         cotizaciones_data = []
-        if response_cotizaciones.data:
-            for row in response_cotizaciones.data:
+        if filas_cotizaciones:
+            for row in filas_cotizaciones:
                 cotizaciones_data.append({
                     'sku': row['sku'],
                     'unidades': row['cantidad_cotizar'],
@@ -324,7 +337,7 @@ class ForecastPipeline:
             print(f"   ✓ {len(cotizaciones_data)} cotizaciones en proceso (como tránsito)")
             # Mostrar resumen por estado
             estados_count = {}
-            for cot in response_cotizaciones.data:
+            for cot in filas_cotizaciones:
                 estado = cot['estado']
                 estados_count[estado] = estados_count.get(estado, 0) + 1
             print(f"      - Pendientes: {estados_count.get('pendiente', 0)}")
@@ -355,213 +368,276 @@ class ForecastPipeline:
         return df_agrupado
 
 
-    def cargar_datos_compras(self) -> pd.DataFrame:
-        """Carga historial de compras/reposiciones desde Supabase"""
+    def cargar_datos_compras(self, desde: datetime = None) -> pd.DataFrame:
+        """Carga historial de compras/reposiciones desde la fuente de datos (posteriores a `desde`)"""
         print(f"\n📦 Cargando historial de compras...")
 
-        all_data = []
-        page_size = 1000
-        offset = 0
+        df = self.fuente.compras(desde=desde)
 
-        while True:
-            response = self.supabase.table('compras') \
-                .select('*') \
-                .range(offset, offset + page_size - 1) \
-                .execute()
+        if df.empty:
+            print("   ℹ️  No se encontraron datos de compras")
+            return pd.DataFrame()
 
-            if not response.data or len(response.data) == 0:
-                break
+        print(f"   ✓ {len(df)} registros de compras desde {df['fecha'].min().date()} hasta {df['fecha'].max().date()}")
 
-            all_data.extend(response.data)
+        return df
 
-            if len(response.data) < page_size:
-                break
 
-            offset += page_size
+    def guardar_predicciones(self, predicciones: PrediccionesBatch):
+        """
+        Guarda predicciones con upsert sobre (sku, día de cálculo)
 
-        if not all_data:
-            print("   ℹ️  No se encontraron datos de compras")
-            return pd.DataFrame()
+        Las predicciones del día ya guardadas se reemplazan en el lugar, así
+        que una corrida que falla a la mitad nunca deja el dashboard vacío.
+        Las de SKUs que ya no están en esta corrida se borran al final, solo
+        si todos los lotes se escribieron.
+        """
+        print(f"\n💾 Guardando {len(predicciones)} predicciones...")
 
-        df = pd.DataFrame(all_data)
-        df['fecha'] = pd.to_datetime(df['fecha'])
+        # Misma marca para toda la corrida: el dashboard filtra por la última fecha_calculo
+        marca = datetime.now()
+        fecha_hoy = marca.date().isoformat()
+
+        resultado = self.fuente.upsert_predicciones(self._registros_prediccion(predicciones, marca))
+
+        if self._cerrar_escritura(resultado, fecha_hoy, set(predicciones.skus.tolist())):
+            print(f"   ✅ Predicciones guardadas")
+
+
+    def calcular_y_guardar_por_bloques(
+        self,
+        ventas_df: VentasCompactas,
+        stock_df: pd.DataFrame,
+        transito_df: pd.DataFrame,
+        compras_df: pd.DataFrame,
+        backtests: list = None
+    ) -> PrediccionesBatch:
+        """
+        Calcula las predicciones por bloques de SKUs y las guarda mientras se
+        calcula el bloque siguiente
+
+        Un hilo escritor toma los bloques de una cola acotada (si la escritura
+        se atrasa, el cálculo espera). Los bloques se guardan sin los packs y
+        con ABC provisional 'C'; al final se clasifica el conjunto completo
+        (con los packs, como `calcular_predicciones_completas`) y se
+        actualiza solo la clasificación de los SKUs A y B.
+
+        Con `backtests` (una lista) se le agrega el backtesting de cada bloque
+        (ver `calcular_predicciones_por_bloques`).
+        """
+        print(f"   ✓ Streaming: bloques de {self.skus_por_bloque} SKUs, escritura en paralelo")
+
+        marca = datetime.now()
+        fecha_hoy = marca.date().isoformat()
+
+        cola = queue.Queue(maxsize=BLOQUES_EN_COLA)
+        escritura = ResultadoEscritura()
+        errores_hilo = []
+
+        def escribir():
+            while True:
+                bloque = cola.get()
+                if bloque is None:
+                    return
+                if errores_hilo:
+                    continue  # Solo vaciar la cola para no bloquear el cálculo
+                try:
+                    escritura.sumar(self.fuente.upsert_predicciones(self._registros_prediccion(bloque, marca)))
+                except Exception as e:
+                    errores_hilo.append(e)
+
+        hilo = threading.Thread(target=escribir, name='escritor-predicciones', daemon=True)
+        hilo.start()
 
-        print(f"   ✓ {len(df)} registros de compras desde {df['fecha'].min().date()} hasta {df['fecha'].max().date()}")
+        inicio = datetime.now()
+        espera_cola = 0.0
+        lotes = []
+        try:
+            bloques = self.algoritmo.calcular_predicciones_por_bloques(
+                ventas_df=ventas_df,
+                stock_df=stock_df,
+                transito_df=transito_df,
+                compras_df=compras_df,
+                skus_por_bloque=self.skus_por_bloque,
+                n_workers=self.n_workers,
+                cache=self.cache,
+                backtests=backtests,
+                n_origenes=self.backtest_origenes,
+                horizonte=self.backtest_horizonte
+            )
+            for bloque in bloques:
+                lotes.append(bloque)
+
+                antes = datetime.now()
+                cola.put(bloque[~_es_pack(bloque)])
+                espera_cola += (datetime.now() - antes).total_seconds()
+        finally:
+            cola.put(None)
+            hilo.join()
+
+        predicciones = PrediccionesBatch.concatenar(lotes)
+        segundos = (datetime.now() - inicio).total_seconds()
+        print(f"   ✓ {int((~_es_pack(predicciones)).sum())} predicciones calculadas y enviadas en {segundos:.1f}s")
+        print(f"   ✓ Cálculo detenido {espera_cola:.1f}s esperando a la escritura (cola de {BLOQUES_EN_COLA} bloques)")
+
+        if errores_hilo:
+            raise errores_hilo[0]
+
+        # Con bloques sin guardar no se toca la clasificación: el upsert
+        # crearía filas sin métricas para sus SKUs o mezclaría el ABC nuevo
+        # con las métricas anteriores
+        if escritura.fallidas:
+            print(f"   ⚠️  Clasificación ABC no actualizada: hay bloques sin guardar")
+            escritura.segundos = (datetime.now() - inicio).total_seconds()
+            predicciones = predicciones[~_es_pack(predicciones)]
+            self._cerrar_escritura(escritura, fecha_hoy, set(predicciones.skus.tolist()))
+            return self.algoritmo.clasificar_y_ordenar(predicciones)
+
+        # Clasificación ABC sobre el conjunto completo, con los packs
+        # (los cortes A/B/C son los del modo no streaming); se guardan sin ellos
+        predicciones = self.algoritmo.clasificar_y_ordenar(predicciones)
+        predicciones = predicciones[~_es_pack(predicciones)]
+        columnas = predicciones.columnas
+        cambiados = columnas['clasificacion_abc'] != 'C'
+        cambios = [
+            {
+                'sku': sku,
+                'dia_calculo': fecha_hoy,
+                'clasificacion_abc': abc,
+                'clasificacion_xyz': xyz
+            }
+            for sku, abc, xyz in zip(
+                columnas['sku'][cambiados].tolist(),
+                columnas['clasificacion_abc'][cambiados].tolist(),
+                columnas['clasificacion_xyz'][cambiados].tolist()
+            )
+        ]
+        escritura.sumar(self.fuente.upsert_predicciones(cambios))
+        print(f"   ✓ Clasificación ABC actualizada en {len(cambios)} SKUs")
 
-        return df
+        escritura.segundos = (datetime.now() - inicio).total_seconds()
+        if self._cerrar_escritura(escritura, fecha_hoy, set(predicciones.skus.tolist())):
+            print(f"   ✅ Predicciones guardadas")
 
+        return predicciones
 
-    def guardar_predicciones(self, predicciones: list):
-        """Guarda predicciones en Supabase"""
-        print(f"\n💾 Guardando {len(predicciones)} predicciones...")
 
-        # Primero, eliminar predicciones antiguas de hoy para evitar duplicados
-        fecha_hoy = datetime.now().date().isoformat()
-        fecha_manana = (datetime.now().date() + timedelta(days=1)).isoformat()
+    def _registros_prediccion(self, predicciones: PrediccionesBatch, marca: datetime) -> List[dict]:
+        """Filas de `predicciones` en formato JSON (inf/NaN → 0.0 por columna)"""
+        return predicciones.registros(
+            fecha_calculo=marca.isoformat(),
+            dia_calculo=marca.date().isoformat()
+        )
+
+
+    def _cerrar_escritura(self, resultado, fecha_hoy: str, skus_guardados: set) -> bool:
+        """
+        Informa la escritura y, si no falló ningún lote, borra las
+        predicciones obsoletas del día
+        """
+        print(
+            f"   ✓ {resultado.filas} registros en {resultado.segundos:.1f}s "
+            f"({resultado.filas_por_segundo:,.0f} filas/s, {resultado.lotes} lotes, "
+            f"{resultado.reintentos} reintentos)"
+        )
+
+        if resultado.fallidas:
+            for error in resultado.errores:
+                print(f"   ❌ Error guardando lote: {error}")
+            print(f"   ⚠️  {resultado.fallidas} predicciones sin guardar; se conservan las anteriores del día")
+            return False
+
+        self._borrar_predicciones_obsoletas(fecha_hoy, skus_guardados)
+        return True
 
-        print(f"   🗑️  Limpiando predicciones antiguas del {fecha_hoy}...")
+
+    def _borrar_predicciones_obsoletas(self, fecha_hoy: str, skus_guardados: set):
+        """Borra las predicciones del día de SKUs que no están en esta corrida"""
         try:
-            # Contar cuántas hay antes de borrar (usando count, no len(data))
-            response_count = self.supabase.table('predicciones') \
-                .select('*', count='exact', head=True) \
-                .gte('fecha_calculo', fecha_hoy) \
-                .lt('fecha_calculo', fecha_manana) \
-                .execute()
-
-            count_antiguas = response_count.count if hasattr(response_count, 'count') else 0
-
-            if count_antiguas > 0:
-                # Simplemente eliminar todas las predicciones del día
-                # (Supabase delete no soporta limit, pero sí soporta filtros)
-                response_delete = self.supabase.table('predicciones') \
-                    .delete() \
-                    .gte('fecha_calculo', fecha_hoy) \
-                    .lt('fecha_calculo', fecha_manana) \
-                    .execute()
-
-                print(f"   ✓ {count_antiguas} predicciones antiguas eliminadas")
-            else:
-                print(f"   ℹ️  No hay predicciones antiguas para hoy")
+            obsoletos = sorted(self.fuente.skus_con_prediccion(fecha_hoy) - skus_guardados)
+            self.fuente.borrar_predicciones(fecha_hoy, obsoletos)
+
+            if obsoletos:
+                print(f"   🗑️  {len(obsoletos)} predicciones de SKUs fuera de esta corrida eliminadas")
         except Exception as e:
-            print(f"   ⚠️  Error limpiando predicciones antiguas: {e}")
-            # Continuar de todos modos
-
-        # Convertir predicciones a formato JSON
-        registros = []
-        for pred in predicciones:
-            registro = {
-                'sku': pred.sku,
-                'descripcion': pred.descripcion,
-                'fecha_calculo': datetime.now().isoformat(),
-                'venta_diaria_promedio': sanitize_float(pred.venta_diaria_promedio),
-                'venta_diaria_p50': sanitize_float(pred.venta_diaria_p50),
-                'venta_diaria_p75': sanitize_float(pred.venta_diaria_p75),
-                'venta_diaria_p90': sanitize_float(pred.venta_diaria_p90),
-                'desviacion_estandar': sanitize_float(pred.desviacion_estandar),
-                'coeficiente_variacion': sanitize_float(pred.coeficiente_variacion),
-                'tendencia': pred.tendencia,
-                'tasa_crecimiento_mensual': sanitize_float(pred.tasa_crecimiento_mensual),
-                'stock_actual': sanitize_float(pred.stock_actual),
-                'stock_optimo': sanitize_float(pred.stock_optimo),
-                'stock_seguridad': sanitize_float(pred.stock_seguridad),
-                'dias_stock_actual': sanitize_float(pred.dias_stock_actual),
-                'transito_china': sanitize_float(pred.transito_china),
-                'sugerencia_reposicion': sanitize_float(pred.sugerencia_reposicion),
-                'sugerencia_reposicion_p75': sanitize_float(pred.sugerencia_reposicion_p75),
-                'sugerencia_reposicion_p90': sanitize_float(pred.sugerencia_reposicion_p90),
-                'precio_unitario': sanitize_float(pred.precio_unitario),
-                'valor_total_sugerencia': sanitize_float(pred.valor_total_sugerencia),
-                'periodo_inicio': pred.periodo_inicio.isoformat(),
-                'periodo_fin': pred.periodo_fin.isoformat(),
-                'dias_periodo': int(pred.dias_periodo),
-                'unidades_totales_periodo': sanitize_float(pred.unidades_totales_periodo),
-                'clasificacion_abc': pred.clasificacion_abc,
-                'clasificacion_xyz': pred.clasificacion_xyz,
-                'es_demanda_intermitente': sanitize_bool(pred.es_demanda_intermitente),
-                'modelo_usado': pred.modelo_usado,
-                'observaciones': pred.observaciones,
-                'alertas': pred.alertas
-            }
-            registros.append(registro)
+            print(f"   ⚠️  Error limpiando predicciones obsoletas: {e}")
 
-        # Insertar en lotes de 100
-        batch_size = 100
-        for i in range(0, len(registros), batch_size):
-            batch = registros[i:i + batch_size]
 
-            try:
-                self.supabase.table('predicciones').insert(batch).execute()
-                print(f"   ✓ Batch {i//batch_size + 1} guardado ({len(batch)} registros)")
-            except Exception as e:
-                print(f"   ❌ Error guardando batch {i//batch_size + 1}: {e}")
+    def mostrar_backtest(self, resultado):
+        """Resumen del backtesting rolling-origin calculado junto con las predicciones"""
+        print(f"\n🧪 Backtesting ({self.backtest_origenes} orígenes, horizonte {self.backtest_horizonte} días)...")
 
-        print(f"   ✅ Predicciones guardadas")
+        globales = resultado.agregados()
 
+        print(f"   ✓ {globales['skus']} SKUs evaluados en {int(resultado.ventanas.sum())} ventanas")
+        if globales['mae'] is not None:
+            print(
+                f"   ✓ MAPE {globales['mape']:.1f}% | MAE {globales['mae']:.2f} | "
+                f"RMSE {globales['rmse']:.2f} | Bias {globales['bias']:+.2f}"
+            )
+
+
+    def guardar_metricas(self, tabla: pd.DataFrame, backtest=None):
+        """
+        Calcula y guarda métricas del modelo
 
-    def guardar_metricas(self, predicciones: list):
-        """Calcula y guarda métricas del modelo"""
+        Args:
+            backtest: ResultadoBacktest; sin él (backtesting desactivado o
+                corrida incremental) el error queda vacío y el MAPE por
+                clase usa el CV como proxy
+        """
         print(f"\n📊 Calculando métricas del modelo...")
 
-        # Calcular métricas por segmento
-        total_skus = len(predicciones)
-        skus_abc_a = [p for p in predicciones if p.clasificacion_abc == 'A']
-        skus_abc_b = [p for p in predicciones if p.clasificacion_abc == 'B']
-        skus_abc_c = [p for p in predicciones if p.clasificacion_abc == 'C']
+        por_abc = agregados_por_abc(tabla)
+        total_skus = len(tabla)
 
-        # CV promedio por segmento (como proxy de accuracy)
-        cv_a = np.mean([p.coeficiente_variacion for p in skus_abc_a]) if skus_abc_a else 0
-        cv_b = np.mean([p.coeficiente_variacion for p in skus_abc_b]) if skus_abc_b else 0
-        cv_c = np.mean([p.coeficiente_variacion for p in skus_abc_c]) if skus_abc_c else 0
-        cv_promedio = np.mean([p.coeficiente_variacion for p in predicciones])
+        if backtest is not None:
+            clase_por_sku = dict(zip(tabla['sku'], tabla['clasificacion_abc']))
+            resumen_backtest = backtest.resumen(clase_por_sku, CLASES_ABC)
+            errores = resumen_backtest['global']
+            mape_abc = {clase: datos['mape'] for clase, datos in resumen_backtest['por_abc'].items()}
+        else:
+            # CV promedio por segmento ABC (como proxy de accuracy)
+            resumen_backtest = None
+            errores = {'mape': None, 'mae': None, 'rmse': None, 'bias': None}
+            mape_abc = {clase: sanitize_float(datos['cv_promedio']) for clase, datos in por_abc.items()}
 
         metricas = {
             'fecha_calculo': datetime.now().date().isoformat(),
             'total_skus': total_skus,
-            'mape': None,  # Requiere backtesting
-            'mae': None,
-            'rmse': None,
-            'bias': None,
-            'mape_abc_a': sanitize_float(cv_a),  # Usando CV como proxy
-            'mape_abc_b': sanitize_float(cv_b),
-            'mape_abc_c': sanitize_float(cv_c),
+            'mape': errores['mape'],
+            'mae': errores['mae'],
+            'rmse': errores['rmse'],
+            'bias': errores['bias'],
+            'mape_abc_a': mape_abc['A'],
+            'mape_abc_b': mape_abc['B'],
+            'mape_abc_c': mape_abc['C'],
             'skus_con_prediccion': total_skus,
             'skus_sin_datos': 0,
-            'tiempo_ejecucion_segundos': 0  # Se calculará después
+            'tiempo_ejecucion_segundos': round(self.instrumentacion.segundos_totales(), 2),
+            'etapas': {
+                'etapas': [medicion.a_dict() for medicion in self.instrumentacion.etapas_terminadas()],
+                'latencias_sku': self.instrumentacion.histograma_latencias()
+            },
+            'backtesting': resumen_backtest
         }
 
         try:
-            self.supabase.table('metricas_modelo').insert(metricas).execute()
+            self.fuente.insertar_metricas(metricas)
             print(f"   ✓ Métricas guardadas")
         except Exception as e:
             print(f"   ❌ Error guardando métricas: {e}")
 
 
-    def generar_alertas(self, predicciones: list):
+    def generar_alertas(self, tabla: pd.DataFrame):
         """Genera y guarda alertas de inventario"""
         print(f"\n🚨 Generando alertas...")
 
-        alertas_registros = []
-
-        for pred in predicciones:
-            # Alerta: Stockout inminente
-            if pred.dias_stock_actual < 60:
-                alertas_registros.append({
-                    'sku': pred.sku,
-                    'tipo_alerta': 'stockout_inminente',
-                    'severidad': 'critica' if pred.dias_stock_actual < 30 else 'alta',
-                    'mensaje': f'Solo {pred.dias_stock_actual:.0f} días de stock restantes',
-                    'valor_actual': sanitize_float(pred.dias_stock_actual),
-                    'valor_esperado': sanitize_float(self.config['dias_stock_deseado']),
-                    'estado': 'activa'
-                })
-
-            # Alerta: Exceso de stock
-            if pred.dias_stock_actual > 180:
-                alertas_registros.append({
-                    'sku': pred.sku,
-                    'tipo_alerta': 'exceso_stock',
-                    'severidad': 'media',
-                    'mensaje': f'{pred.dias_stock_actual:.0f} días de stock (exceso)',
-                    'valor_actual': sanitize_float(pred.dias_stock_actual),
-                    'valor_esperado': sanitize_float(self.config['dias_stock_deseado']),
-                    'estado': 'activa'
-                })
-
-            # Alerta: Demanda en declive
-            if pred.tendencia == 'decreciente' and pred.tasa_crecimiento_mensual < -10:
-                alertas_registros.append({
-                    'sku': pred.sku,
-                    'tipo_alerta': 'demanda_anomala',
-                    'severidad': 'media',
-                    'mensaje': f'Demanda cayendo {abs(pred.tasa_crecimiento_mensual):.1f}% mensual',
-                    'valor_actual': sanitize_float(pred.tasa_crecimiento_mensual),
-                    'valor_esperado': 0.0,
-                    'estado': 'activa'
-                })
+        alertas_registros = alertas_inventario(tabla, self.config['dias_stock_deseado'])
 
         if alertas_registros:
             try:
-                self.supabase.table('alertas_inventario').insert(alertas_registros).execute()
+                self.fuente.insertar_alertas(alertas_registros)
                 print(f"   ✓ {len(alertas_registros)} alertas generadas")
             except Exception as e:
                 print(f"   ❌ Error guardando alertas: {e}")
@@ -579,30 +655,101 @@ class ForecastPipeline:
         inicio = datetime.now()
 
         try:
-            # 1. Cargar datos
-            ventas_df = self.cargar_datos_ventas()
-            stock_df = self.cargar_datos_stock()
-            transito_df = self.cargar_datos_transito()
-            compras_df = self.cargar_datos_compras()
-
-            if ventas_df.empty:
+            # 0. Estado incremental de la corrida anterior (si sigue vigente)
+            ahora = pd.Timestamp.now()
+            estado = self._cargar_estado_vigente(ahora)
+
+            # 1. Cargar datos (en modo incremental, solo los días nuevos)
+            desde = estado.fecha_ultimo_dia if estado is not None else None
+            ventas_df = self._medir_carga('carga_ventas', self.cargar_datos_ventas, desde=desde)
+            stock_df = self._medir_carga('carga_stock', self.cargar_datos_stock)
+            transito_df = self._medir_carga('carga_transito', self.cargar_datos_transito)
+            compras_df = self._medir_carga('carga_compras', self.cargar_datos_compras, desde=desde)
+
+            if ventas_df.empty and estado is None:
                 print("❌ No hay datos de ventas. Abortando.")
                 return
 
             # 2. Ejecutar forecasting
             print(f"\n🔮 Ejecutando algoritmo ML...")
-            predicciones = self.algoritmo.calcular_predicciones_completas(
-                ventas_df=ventas_df,
-                stock_df=stock_df,
-                transito_df=transito_df,
-                compras_df=compras_df
-            )
+            guardadas = False
+            # En streaming el cálculo y la escritura se solapan: se miden juntos
+            streaming = self.streaming and estado is None and not self.incremental
+            etapa = 'forecast_y_guardado' if streaming else 'forecast'
+            # Backtesting sobre el mismo análisis del forecast; necesita el
+            # historial completo (no el incremental)
+            backtest = None
+            with self.instrumentacion.etapa(etapa, unidad='SKUs') as medicion:
+                if estado is not None:
+                    predicciones, estado = self.algoritmo.calcular_predicciones_incrementales(
+                        estado=estado,
+                        ventas_df=ventas_df,
+                        stock_df=stock_df,
+                        transito_df=transito_df,
+                        compras_df=compras_df,
+                        ahora=ahora
+                    )
+                    # El estado puede traer SKUs excluidos después de construirlo
+                    predicciones = predicciones[~np.isin(predicciones.skus, list(self.skus_excluidos))]
+                elif self.incremental:
+                    predicciones, estado = self.algoritmo.calcular_predicciones_con_estado(
+                        ventas_df=ventas_df,
+                        stock_df=stock_df,
+                        transito_df=transito_df,
+                        compras_df=compras_df,
+                        firma=self.firma_estado,
+                        ahora=ahora
+                    )
+                elif self.streaming:
+                    backtests = [] if self.backtesting else None
+                    predicciones = self.calcular_y_guardar_por_bloques(
+                        ventas_df, stock_df, transito_df, compras_df, backtests
+                    )
+                    if backtests:
+                        backtest = ResultadoBacktest.concatenar(backtests)
+                    guardadas = True
+                elif self.backtesting:
+                    predicciones, backtest = self.algoritmo.calcular_predicciones_y_backtest(
+                        ventas_df=ventas_df,
+                        stock_df=stock_df,
+                        transito_df=transito_df,
+                        compras_df=compras_df,
+                        n_workers=self.n_workers,
+                        cache=self.cache,
+                        n_origenes=self.backtest_origenes,
+                        horizonte=self.backtest_horizonte
+                    )
+                else:
+                    predicciones = self.algoritmo.calcular_predicciones_completas(
+                        ventas_df=ventas_df,
+                        stock_df=stock_df,
+                        transito_df=transito_df,
+                        compras_df=compras_df,
+                        n_workers=self.n_workers,
+                        cache=self.cache
+                    )
+                medicion.elementos = len(predicciones)
+
+            if self.cache is not None and estado is None:
+                stats_cache = self.cache.estadisticas()
+                print(f"   ✓ Cache: {stats_cache['aciertos']} aciertos, {stats_cache['fallos']} fallos")
+
+            if estado is not None:
+                guardar_estado(estado, self.ruta_estado)
+                print(f"   ✓ Estado incremental guardado ({estado.n_skus} SKUs)")
 
             print(f"   ✓ {len(predicciones)} predicciones generadas")
+            if self.algoritmo.ajustar_modelos and estado is None and predicciones:
+                modelos, conteos = np.unique(predicciones.columnas['modelo_usado'].astype(str), return_counts=True)
+                orden = np.argsort(-conteos, kind='stable')[:5]
+                print(f"   ✓ Modelos más usados: {', '.join(f'{modelos[i]} ({conteos[i]})' for i in orden)}")
+
+            if backtest is not None:
+                self.mostrar_backtest(backtest)
 
             # Filtrar SKUs tipo PACK de las predicciones
             if predicciones:
-                predicciones_filtradas = [p for p in predicciones if not p.sku.startswith('PACK')]
+                predicciones_filtradas = predicciones[~_es_pack(predicciones)]
                 packs_filtrados = len(predicciones) - len(predicciones_filtradas)
                 print(f"   ✓ {packs_filtrados} SKUs tipo PACK filtrados")
                 print(f"   ✓ {len(predicciones_filtradas)} predicciones de SKUs reales")
@@ -610,12 +757,26 @@ class ForecastPipeline:
 
             # 3. Guardar resultados
             if predicciones:
-                self.guardar_predicciones(predicciones)
-                self.guardar_metricas(predicciones)
-                self.generar_alertas(predicciones)
+                if not guardadas:
+                    with self.instrumentacion.etapa('guardar_predicciones') as medicion:
+                        self.guardar_predicciones(predicciones)
+                        medicion.elementos = len(predicciones)
+
+                # Alertas, métricas y resumen sobre la tabla columnar
+                tabla = tabla_predicciones(predicciones)
+                with self.instrumentacion.etapa('alertas', unidad='SKUs') as medicion:
+                    self.generar_alertas(tabla)
+                    medicion.elementos = len(tabla)
+
+                # Las métricas van después de las alertas para incluir su tiempo
+                with self.instrumentacion.etapa('metricas', unidad='SKUs') as medicion:
+                    self.guardar_metricas(tabla, backtest)
+                    medicion.elementos = len(tabla)
 
                 # 4. Generar resumen
-                self.generar_resumen(predicciones, inicio)
+                with self.instrumentacion.etapa('resumen', unidad='SKUs') as medicion:
+                    self.generar_resumen(tabla, inicio)
+                    medicion.elementos = len(tabla)
             else:
                 print("⚠️  No se generaron predicciones")
 
@@ -625,8 +786,62 @@ class ForecastPipeline:
             traceback.print_exc()
             sys.exit(1)
 
+        finally:
+            self._guardar_instrumentacion()
+
+
+    def _medir_carga(self, nombre: str, cargar, **kwargs) -> pd.DataFrame:
+        """Ejecuta un cargador midiendo su etapa (filas cargadas)"""
+        with self.instrumentacion.etapa(nombre) as medicion:
+            df = cargar(**kwargs)
+            medicion.elementos = len(df)
+        return df
+
+
+    def _guardar_instrumentacion(self):
+        """Escribe el artefacto JSON con las mediciones de la corrida"""
+        try:
+            self.instrumentacion.guardar_json(RUTA_METRICAS_JSON)
+            print(f"   ✓ Mediciones por etapa en {RUTA_METRICAS_JSON}")
+        except Exception as e:
+            print(f"   ⚠️  Error guardando mediciones: {e}")
+
 
-    def generar_resumen(self, predicciones: list, inicio: datetime):
+    def _cargar_estado_vigente(self, ahora: pd.Timestamp):
+        """Estado incremental guardado, o None si corresponde un cálculo completo"""
+        if not self.incremental:
+            return None
+
+        if self.forzar_completo:
+            print(f"\n🔄 Recálculo completo forzado")
+            return None
+
+        estado = cargar_estado(self.ruta_estado)
+        if not estado_vigente(estado, self.firma_estado, ahora, self.dias_recalculo_completo):
+            print(f"\n🔄 Sin estado incremental vigente: recálculo completo")
+            return None
+
+        print(f"\n⏩ Modo incremental: {estado.n_skus} SKUs procesados hasta el {estado.fecha_ultimo_dia.date()}")
+        print(f"   ✓ Último recálculo completo: {estado.fecha_recalculo_completo.date()}")
+        return estado
+
+
+    def _resumen_cache(self) -> str:
+        """Sección del resumen con los contadores del cache de predicciones"""
+        if self.cache is None:
+            return ""
+
+        stats_cache = self.cache.estadisticas()
+        return f"""
+CACHE DE PREDICCIONES
+- Aciertos: {stats_cache['aciertos']}
+- Fallos: {stats_cache['fallos']}
+- Tasa de aciertos: {stats_cache['tasa_aciertos'] * 100:.1f}%
+- Entradas desalojadas: {stats_cache['desalojados']}
+"""
+
+
+    def generar_resumen(self, tabla: pd.DataFrame, inicio: datetime):
         """Genera resumen del forecasting"""
         fin = datetime.now()
         duracion = (fin - inicio).total_seconds()
@@ -636,14 +851,8 @@ class ForecastPipeline:
         print(f"{'='*60}")
 
         # Estadísticas
-        total_sugerencia = sum(p.sugerencia_reposicion for p in predicciones)
-        total_valor = sum(p.valor_total_sugerencia for p in predicciones)
-
-        skus_a = len([p for p in predicciones if p.clasificacion_abc == 'A'])
-        skus_b = len([p for p in predicciones if p.clasificacion_abc == 'B'])
-        skus_c = len([p for p in predicciones if p.clasificacion_abc == 'C'])
-
-        alertas_criticas = sum(1 for p in predicciones if any('CRÍTICO' in a for a in p.alertas))
+        estadisticas = estadisticas_resumen(tabla)
+        skus_por_abc = estadisticas['skus_por_abc']
 
         resumen = f"""
 RESUMEN DE FORECASTING
@@ -652,23 +861,29 @@ Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 Duración: {duracion:.1f} segundos
 
 PREDICCIONES
-- Total SKUs: {len(predicciones)}
-- Clasificación A: {skus_a} SKUs
-- Clasificación B: {skus_b} SKUs
-- Clasificación C: {skus_c} SKUs
+- Total SKUs: {estadisticas['total_skus']}
+- Clasificación A: {skus_por_abc['A']} SKUs
+- Clasificación B: {skus_por_abc['B']} SKUs
+- Clasificación C: {skus_por_abc['C']} SKUs
 
 SUGERENCIAS
-- Total unidades: {total_sugerencia:,.0f}
-- Valor total: ${total_valor:,.0f}
+- Total unidades: {estadisticas['total_unidades']:,.0f}
+- Valor total: ${estadisticas['total_valor']:,.0f}
 
 ALERTAS
-- Alertas críticas: {alertas_criticas}
+- Alertas críticas: {estadisticas['alertas_criticas']}
+{self._resumen_cache()}
+ETAPAS
+{self.instrumentacion.resumen_texto()}
 
 TOP 5 POR VALOR
 """
 
-        for i, pred in enumerate(predicciones[:5], 1):
-            resumen += f"\n{i}. {pred.sku}: ${pred.valor_total_sugerencia:,.0f} ({pred.sugerencia_reposicion:.0f} unidades)"
+        top = tabla.head(5)
+        for i, (sku, valor, unidades) in enumerate(
+            zip(top['sku'], top['valor_total_sugerencia'], top['sugerencia_reposicion']), 1
+        ):
+            resumen += f"\n{i}. {sku}: ${valor:,.0f} ({unidades:.0f} unidades)"
 
         print(resumen)
 
@@ -0,0 +1,79 @@
+"""
+Simulación what-if de reposición sobre los datos actuales
+
+Carga ventas, stock, tránsito y compras como el pipeline diario, analiza la
+demanda una sola vez y evalúa la grilla de escenarios (días de stock
+deseado × días de tránsito × nivel de servicio) sin recalcular el resto.
+Los parámetros omitidos toman el valor de la configuración.
+
+Uso:
+    python scripts/simular_escenarios.py --transito=100,120 --servicio=0.95,0.98
+    python scripts/simular_escenarios.py --stock=60,90,120 --csv=escenarios.csv
+    python scripts/simular_escenarios.py --servicio=0.9,0.95,0.99 --detalle=escenarios_sku.csv
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from run_daily_forecast import ForecastPipeline
+
+
+def _lista(texto: str, tipo):
+    return [tipo(valor) for valor in texto.split(',') if valor]
+
+
+if __name__ == "__main__":
+    opciones = dict(a[2:].split('=', 1) if '=' in a else (a[2:], '1') for a in sys.argv[1:] if a.startswith('--'))
+
+    pipeline = ForecastPipeline()
+    algoritmo = pipeline.algoritmo
+    grilla = {
+        'dias_stock_deseado': _lista(opciones.get('stock', str(algoritmo.dias_stock_deseado)), int),
+        'dias_transito': _lista(opciones.get('transito', str(algoritmo.dias_transito)), int),
+        'nivel_servicio': _lista(opciones.get('servicio', str(algoritmo.nivel_servicio)), float)
+    }
+
+    ventas = pipeline.cargar_datos_ventas()
+    if ventas.empty:
+        sys.exit("❌ No hay datos de ventas")
+
+    print(f"\n🔮 Analizando demanda y evaluando escenarios...")
+    inicio = time.perf_counter()
+    cubo = algoritmo.calcular_escenarios_completos(
+        ventas_df=ventas,
+        stock_df=pipeline.cargar_datos_stock(),
+        transito_df=pipeline.cargar_datos_transito(),
+        compras_df=pipeline.cargar_datos_compras(),
+        **grilla
+    )
+    segundos = time.perf_counter() - inicio
+
+    # Los packs se venden como sus componentes: fuera del resumen, como en el pipeline
+    cubo = cubo.seleccionar_skus(~np.asarray(pd.Index(cubo.skus).str.startswith('PACK'), dtype=bool))
+    print(f"   ✓ {cubo.n_skus} SKUs × {cubo.n_escenarios} escenarios en {segundos:.1f}s")
+
+    resumen = cubo.resumen()
+    print(
+        f"\n{'Stock':>6}{'Tránsito':>10}{'Servicio':>10}"
+        f"{'Unidades p50':>15}{'Unidades p90':>15}{'Valor p50':>18}{'SKUs':>8}"
+    )
+    for fila in resumen.itertuples(index=False):
+        print(
+            f"{fila.dias_stock_deseado:>6}{fila.dias_transito:>10}{fila.nivel_servicio:>10.3f}"
+            f"{fila.sugerencia_reposicion:>15,.0f}{fila.sugerencia_reposicion_p90:>15,.0f}"
+            f"{fila.valor_total_sugerencia:>18,.0f}{fila.skus_con_sugerencia:>8}"
+        )
+
+    if 'csv' in opciones:
+        resumen.to_csv(opciones['csv'], index=False)
+        print(f"\n✅ Resumen por escenario en {opciones['csv']}")
+    if 'detalle' in opciones:
+        cubo.a_dataframe().to_csv(opciones['detalle'], index=False)
+        print(f"✅ Detalle SKU × escenario en {opciones['detalle']}")
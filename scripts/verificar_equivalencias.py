@@ -0,0 +1,157 @@
+"""
+Verificación de equivalencias del forecast sobre catálogos sintéticos
+
+Cada verificación compara dos formas de calcular lo mismo que deben dar el
+mismo resultado:
+
+- ventas_tardias: el modo incremental con ventas del día de la corrida que
+  llegan después de ella, frente a las mismas ventas llegadas a tiempo y
+  frente a un recálculo completo
+- paralelo_ajuste: la selección de modelos (`ajustar_modelos`) del panel
+  completo frente a la de tramos en paralelo, bloques y un cache llenado con
+  un sub-panel
+
+Uso:
+    python scripts/verificar_equivalencias.py                  # todas
+    python scripts/verificar_equivalencias.py ventas_tardias   # solo algunas
+
+Sale con código 1 si alguna verificación falla.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).parent.parent
+sys.path.append(str(RAIZ))
+
+from algoritmo_ml_avanzado import AlgoritmoMLAvanzado
+from cache_predicciones import CachePredicciones
+from carga_sintetica import generar_catalogo
+from predicciones_batch import PrediccionesBatch
+
+
+def _columna(predicciones, nombre: str) -> pd.Series:
+    return pd.Series(predicciones.columnas[nombre], index=predicciones.skus)
+
+
+# =====================================================================
+# VENTAS TARDÍAS (modo incremental)
+# =====================================================================
+
+def verificar_ventas_tardias() -> list:
+    """
+    Corrida completa a las 02:00 del día D con solo parte de las ventas de D
+    (el resto llega después) y corrida incremental a las 02:00 de D+1
+    """
+    dia = pd.Timestamp.now().normalize() - pd.Timedelta(days=1)
+    catalogo = generar_catalogo(400, dias=200, semilla=11, fraccion_packs=0.0, hoy=dia + pd.Timedelta(days=1))
+    ventas = catalogo.ventas
+    fechas = pd.to_datetime(ventas['fecha'])
+    tardias = ((fechas == dia) & (np.random.default_rng(0).random(len(ventas)) < 0.7)).to_numpy()
+    algoritmo = AlgoritmoMLAvanzado()
+    primera = dia + pd.Timedelta(hours=2)
+    segunda = primera + pd.Timedelta(days=1)
+
+    def dos_corridas(visibles: np.ndarray):
+        _, estado = algoritmo.calcular_predicciones_con_estado(
+            ventas[visibles], catalogo.stock, catalogo.transito, catalogo.compras, ahora=primera
+        )
+        # Como `cargar_datos_ventas(desde=...)`: posteriores al último día del estado
+        posteriores = (fechas > estado.fecha_ultimo_dia).to_numpy()
+        compras = catalogo.compras[pd.to_datetime(catalogo.compras['fecha']) > estado.fecha_ultimo_dia]
+        predicciones, _ = algoritmo.calcular_predicciones_incrementales(
+            estado, ventas[posteriores], catalogo.stock, catalogo.transito, compras, ahora=segunda
+        )
+        return predicciones
+
+    con_tardias = dos_corridas(~tardias)
+    a_tiempo = dos_corridas(np.ones(len(ventas), dtype=bool))
+    completo = algoritmo.calcular_predicciones_completas(
+        ventas, catalogo.stock, catalogo.transito, catalogo.compras
+    )
+
+    errores = []
+    for nombre in ('venta_diaria_promedio', 'unidades_totales_periodo'):
+        tardio = _columna(con_tardias, nombre)
+        if not tardio.equals(_columna(a_tiempo, nombre).reindex(tardio.index)):
+            errores.append(f"{nombre}: las ventas tardías cambian el resultado incremental")
+
+        referencia = _columna(completo, nombre).reindex(tardio.index)
+        desvio = abs(tardio.sum() - referencia.sum()) / referencia.sum()
+        if desvio > 0.002:
+            errores.append(f"{nombre}: total incremental {tardio.sum():.1f} vs completo {referencia.sum():.1f}")
+    return errores
+
+
+# =====================================================================
+# SELECCIÓN DE MODELOS EN PARALELO, POR BLOQUES Y CON CACHE
+# =====================================================================
+
+def verificar_paralelo_ajuste() -> list:
+    """
+    Con `ajustar_modelos` cada SKU debe elegir el mismo modelo y pronóstico
+    sin importar con qué otros SKUs se analiza. Un tercio del catálogo está
+    discontinuado (sin stock y sin ventas los últimos 50 días), así que los
+    tramos y bloques cubren rangos de días distintos
+    """
+    catalogo = generar_catalogo(300, dias=300, semilla=4, fraccion_packs=0.0, fraccion_quiebres=0.4)
+    corte = pd.Timestamp.now().normalize() - pd.Timedelta(days=50)
+    discontinuados = catalogo.ventas['sku'].astype(str) >= 'SKU000200'
+    ventas = catalogo.ventas[~(discontinuados & (pd.to_datetime(catalogo.ventas['fecha']) > corte))]
+    stock = catalogo.stock.copy()
+    stock.loc[stock['sku'].astype(str) >= 'SKU000200', 'stock_total'] = 0
+    algoritmo = AlgoritmoMLAvanzado(ajustar_modelos=True)
+
+    def calcular(ventas_df, **opciones):
+        return algoritmo.calcular_predicciones_completas(
+            ventas_df, stock, catalogo.transito, catalogo.compras, **opciones
+        )
+
+    serial = calcular(ventas)
+    bloques = PrediccionesBatch.concatenar(list(algoritmo.calcular_predicciones_por_bloques(
+        ventas, stock, catalogo.transito, catalogo.compras, skus_por_bloque=40
+    )))
+    with tempfile.TemporaryDirectory() as directorio:
+        cache = CachePredicciones(directorio)
+        subconjunto = ventas['sku'].isin(serial.skus[180:260])
+        calcular(ventas[subconjunto], cache=cache)
+        con_cache = calcular(ventas, cache=cache)
+    variantes = {'n_workers=3': calcular(ventas, n_workers=3), 'bloques': bloques, 'cache': con_cache}
+
+    errores = []
+    for variante, predicciones in variantes.items():
+        for nombre in ('modelo_usado', 'venta_diaria_promedio'):
+            referencia = _columna(serial, nombre)
+            valores = _columna(predicciones, nombre).reindex(referencia.index)
+            distintos = int((valores != referencia).sum())
+            if distintos:
+                errores.append(f"{variante}: {nombre} distinto en {distintos} de {len(referencia)} SKUs")
+    return errores
+
+
+VERIFICACIONES = {
+    'ventas_tardias': verificar_ventas_tardias,
+    'paralelo_ajuste': verificar_paralelo_ajuste,
+}
+
+
+def main(nombres: list) -> int:
+    fallidas = 0
+    for nombre in nombres or list(VERIFICACIONES):
+        errores = VERIFICACIONES[nombre]()
+        if errores:
+            fallidas += 1
+            print(f"❌ {nombre}")
+            for error in errores:
+                print(f"   - {error}")
+        else:
+            print(f"✓ {nombre}")
+    return 1 if fallidas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
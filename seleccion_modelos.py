@@ -0,0 +1,420 @@
+"""
+Selección de Modelo por SKU
+Grilla de modelos de demanda y alphas evaluada para todos los SKUs a la vez
+
+En lugar de una regla global (Croston si la demanda es intermitente, EWMA
+con un alpha fijo si no), cada SKU usa el candidato con menor error en el
+backtesting rolling-origin de su propia historia:
+
+- ewma_<alpha>: suavizado exponencial simple
+- croston: Croston clásico (el del análisis)
+- sba_<alpha>: Syntetos-Boylan, (1 - alpha/2) × tamaño / intervalo suavizados
+- tsb_<alpha>: Teunter-Syntetos-Babai, probabilidad de venta × tamaño suavizados
+- sma_<días>: promedio móvil de los últimos días
+
+Cada familia se calcula para todos sus alphas (o ventanas) y orígenes en una
+sola pasada por la matriz SKU × día (`motor_panel`), sin reajustes por
+origen. El error es el MAE por ventana de `backtesting` (mismos orígenes,
+horizonte y días con stock). Un SKU cambia de modelo solo si el ganador
+mejora el MAE del modelo por regla; sin ventanas evaluables lo conserva.
+
+La selección guarda también el backtesting del modelo que queda en cada SKU
+(`SeleccionModelos.backtest`, `por_modelo` por familia), así las métricas
+que se persisten son las del modelo usado y no las de la regla.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtesting import (
+    HISTORIA_MINIMA_DIAS,
+    HORIZONTE_DIAS,
+    SKUS_POR_BLOQUE,
+    ResultadoBacktest,
+    metricas_ventanas,
+    origenes_backtest,
+    origenes_calculables,
+    resultado_desde_partes,
+    sin_ventanas,
+    ventanas_evaluables
+)
+from motor_panel import (
+    croston_por_origen_panel,
+    intervalos_entre_ventas,
+    mascara_rango,
+    media_movil_por_origen_panel,
+    pronosticos_por_origen_panel,
+    reales_por_origen_panel,
+    suavizado_por_origen_panel
+)
+from panel_demanda import MatrizDemanda
+
+
+# (familia, parámetro): alpha para ewma/sba/tsb, días para sma
+CANDIDATOS = (
+    ('ewma', 0.05), ('ewma', 0.1), ('ewma', 0.2), ('ewma', 0.3), ('ewma', 0.4), ('ewma', 0.5),
+    ('croston', None),
+    ('sba', 0.05), ('sba', 0.1), ('sba', 0.2), ('sba', 0.3),
+    ('tsb', 0.05), ('tsb', 0.1), ('tsb', 0.2), ('tsb', 0.3),
+    ('sma', 7), ('sma', 14), ('sma', 28), ('sma', 56),
+)
+
+FAMILIAS = ('ewma', 'croston', 'sba', 'tsb', 'sma')
+
+
+def nombre_candidato(familia: str, parametro) -> str:
+    """Nombre para `modelo_usado` (ej. 'ewma_0.3', 'sma_28', 'croston')"""
+    return familia if parametro is None else f"{familia}_{parametro:g}"
+
+
+def pronosticos_candidatos(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    origenes: np.ndarray,
+    candidatos: Sequence[Tuple[str, object]] = CANDIDATOS
+) -> np.ndarray:
+    """
+    Venta diaria de cada candidato en cada origen, con los días anteriores
+    a él (0 si todavía no hay con qué pronosticar)
+
+    Returns:
+        (n_skus, n_candidatos, n_origenes)
+    """
+    desconocidas = {familia for familia, _ in candidatos} - set(FAMILIAS)
+    if desconocidas:
+        raise ValueError(f"Familias de modelo desconocidas: {', '.join(sorted(desconocidas))}")
+
+    n_skus, n_dias = ventas.shape
+    origenes = np.asarray(origenes, dtype=np.int64)
+    cortes = origenes - 1
+    valida = mascara_rango(inicio, fin, n_dias)
+    positivas = valida & (ventas > 0)
+    en_rango = np.where(valida, ventas, 0.0)
+
+    def parametros(familia):
+        return [parametro for f, parametro in candidatos if f == familia]
+
+    def indices(familia):
+        return [j for j, (f, _) in enumerate(candidatos) if f == familia]
+
+    pronosticos = np.zeros((n_skus, len(candidatos), len(origenes)))
+
+    if parametros('ewma'):
+        pronosticos[:, indices('ewma')] = suavizado_por_origen_panel(
+            en_rango, valida, parametros('ewma'), cortes
+        )
+
+    if parametros('croston'):
+        pronosticos[:, indices('croston')] = croston_por_origen_panel(ventas, inicio, fin, origenes)[:, None]
+
+    # SBA y TSB comparten el tamaño suavizado (solo en días con venta)
+    alphas_intermitentes = sorted(set(parametros('sba')) | set(parametros('tsb')))
+    if alphas_intermitentes:
+        tamano = suavizado_por_origen_panel(en_rango, positivas, alphas_intermitentes, cortes)
+        posicion = {alpha: k for k, alpha in enumerate(alphas_intermitentes)}
+
+        if parametros('sba'):
+            alphas = np.asarray(parametros('sba'), dtype=float)
+            intervalo = suavizado_por_origen_panel(
+                intervalos_entre_ventas(positivas, inicio), positivas, alphas, cortes
+            )
+            pronosticos[:, indices('sba')] = (
+                (1 - alphas / 2)[None, :, None]
+                * tamano[:, [posicion[alpha] for alpha in parametros('sba')]]
+                / intervalo
+            )
+
+        if parametros('tsb'):
+            probabilidad = suavizado_por_origen_panel(
+                positivas.astype(float), valida, parametros('tsb'), cortes
+            )
+            pronosticos[:, indices('tsb')] = (
+                probabilidad * tamano[:, [posicion[alpha] for alpha in parametros('tsb')]]
+            )
+
+    if parametros('sma'):
+        pronosticos[:, indices('sma')] = media_movil_por_origen_panel(
+            ventas, inicio, fin, parametros('sma'), origenes
+        )
+
+    return np.nan_to_num(pronosticos, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def _ganador(mae: np.ndarray, mae_base: np.ndarray) -> np.ndarray:
+    """Candidato de menor MAE (el primero en empates), solo si mejora la regla; si no, -1"""
+    filas = np.arange(len(mae_base))
+    mejor = np.argmin(np.where(np.isnan(mae), np.inf, mae), axis=1)
+    mejora = ~np.isnan(mae_base) & (mae[filas, mejor] < mae_base)
+    return np.where(mejora, mejor, -1).astype(np.int64)
+
+
+def _pronostico_elegido(
+    pronosticos: np.ndarray,
+    indice: np.ndarray,
+    familias: Sequence[str],
+    base: np.ndarray,
+    es_intermitente: np.ndarray
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Pronóstico por ventana del modelo que queda en cada SKU y máscaras de
+    ventanas por familia (la regla cuenta como 'croston' o 'ewma' según la
+    intermitencia en cada origen)
+
+    Args:
+        pronosticos: (n_skus, n_columnas, n_origenes) de los candidatos
+        indice: Columna del ganador de cada SKU, -1 = la regla
+        familias: Familia de cada columna
+        base, es_intermitente: Pronóstico y tipo de la regla (n_skus, n_origenes)
+    """
+    ajustado = indice >= 0
+    columna = np.where(ajustado, indice, 0)
+    pronostico = base
+    familia = np.full(len(indice), '', dtype=object)
+    if pronosticos.shape[1]:
+        elegido = np.take_along_axis(pronosticos, columna[:, None, None], axis=1)[:, 0]
+        pronostico = np.where(ajustado[:, None], elegido, base)
+        familia = np.where(ajustado, np.asarray(familias, dtype=object)[columna], '')
+
+    regla = {'croston': es_intermitente, 'ewma': ~es_intermitente}
+    grupos = {}
+    for nombre in FAMILIAS:
+        grupos[nombre] = (familia == nombre)[:, None]
+        if nombre in regla:
+            grupos[nombre] = grupos[nombre] | (~ajustado[:, None] & regla[nombre])
+    return pronostico, grupos
+
+
+def seleccion_panel(
+    ventas: np.ndarray,
+    inicio: np.ndarray,
+    fin: np.ndarray,
+    con_stock: np.ndarray,
+    alpha: float,
+    umbral_intermitencia: float,
+    origenes: np.ndarray,
+    horizonte: int = HORIZONTE_DIAS,
+    historia_minima: int = HISTORIA_MINIMA_DIAS,
+    candidatos: Sequence[Tuple[str, object]] = CANDIDATOS
+) -> Dict[str, np.ndarray]:
+    """
+    MAE de backtesting de cada candidato y del modelo por regla, ganador y
+    pronóstico de cada candidato con toda la historia, para un bloque de la
+    matriz SKU × día
+
+    Returns:
+        Dict con mae (n_skus, n_candidatos), mae_base (n_skus,),
+        venta_diaria (n_skus, n_candidatos), indice (n_skus,) y metricas
+        (`metricas_ventanas` del modelo que queda); MAE NaN sin ventanas
+    """
+    n_dias = ventas.shape[1]
+    origenes = np.asarray(origenes, dtype=np.int64)
+
+    # El último corte (n_dias) es el pronóstico con toda la historia
+    pronosticos = pronosticos_candidatos(
+        ventas, inicio, fin, np.append(origenes, n_dias), candidatos
+    )
+    base, es_intermitente = pronosticos_por_origen_panel(
+        ventas, inicio, fin, alpha, umbral_intermitencia, origenes
+    )
+    unidades, dias = reales_por_origen_panel(ventas, con_stock, origenes, horizonte)
+    evaluable = ventanas_evaluables(inicio, fin, dias, origenes, horizonte, historia_minima)
+
+    ventanas = evaluable.sum(axis=1)
+    n = np.where(ventanas > 0, ventanas, np.nan)
+    error = np.abs(pronosticos[:, :, :-1] * dias[:, None, :] - unidades[:, None, :])
+    error_base = np.abs(base * dias - unidades)
+    mae = np.where(evaluable[:, None, :], error, 0.0).sum(axis=2) / n[:, None]
+    mae_base = np.where(evaluable, error_base, 0.0).sum(axis=1) / n
+
+    indice = _ganador(mae, mae_base)
+    pronostico, grupos = _pronostico_elegido(
+        pronosticos[:, :, :-1], indice, [familia for familia, _ in candidatos], base, es_intermitente
+    )
+
+    return {
+        'mae': mae,
+        'mae_base': mae_base,
+        'venta_diaria': pronosticos[:, :, -1],
+        'indice': indice,
+        'metricas': metricas_ventanas(pronostico, unidades, dias, evaluable, grupos)
+    }
+
+
+@dataclass
+class SeleccionModelos:
+    """Candidato elegido por SKU (-1 = conserva el modelo por regla)"""
+    skus: np.ndarray
+    candidatos: Tuple[str, ...]    # nombres, en el orden de las columnas
+    indice: np.ndarray             # (n_skus,) int64
+    mae: np.ndarray                # (n_skus, n_candidatos), NaN sin ventanas
+    mae_base: np.ndarray           # (n_skus,) MAE del modelo por regla
+    venta_diaria: np.ndarray       # (n_skus,) pronóstico del ganador (NaN si -1)
+    definiciones: Tuple[Tuple[str, object], ...] = CANDIDATOS   # (familia, parámetro) de cada nombre
+    backtest: Optional[ResultadoBacktest] = None                # del modelo que queda en cada SKU
+
+    @property
+    def n_skus(self) -> int:
+        return len(self.skus)
+
+    @property
+    def ajustados(self) -> np.ndarray:
+        """Máscara de los SKUs que cambian de modelo"""
+        return self.indice >= 0
+
+    @property
+    def mae_elegido(self) -> np.ndarray:
+        """MAE del modelo que queda en cada SKU"""
+        filas = np.flatnonzero(self.ajustados)
+        mae = self.mae_base.copy()
+        mae[filas] = self.mae[filas, self.indice[filas]]
+        return mae
+
+    def aplicar(self, venta_diaria_base: np.ndarray) -> np.ndarray:
+        """Venta diaria con el ganador donde lo hay y la base en el resto"""
+        return np.where(self.ajustados, self.venta_diaria, venta_diaria_base)
+
+    def modelos(self, es_intermitente: np.ndarray) -> np.ndarray:
+        """Nombre del modelo de cada SKU (la regla: 'croston' o 'ewma')"""
+        nombres = np.where(es_intermitente, 'croston', 'ewma').astype(object)
+        filas = np.flatnonzero(self.ajustados)
+        nombres[filas] = np.asarray(self.candidatos, dtype=object)[self.indice[filas]]
+        return nombres
+
+    def resumen(self) -> dict:
+        """SKUs por candidato y MAE medio antes y después (SKUs con ventanas)"""
+        con_ventanas = ~np.isnan(self.mae_base)
+        conteo = np.bincount(self.indice[self.ajustados], minlength=len(self.candidatos))
+        return {
+            'skus_evaluados': int(con_ventanas.sum()),
+            'skus_ajustados': int(self.ajustados.sum()),
+            'por_modelo': {
+                nombre: int(n) for nombre, n in zip(self.candidatos, conteo.tolist()) if n
+            },
+            'mae_regla': round(float(self.mae_base[con_ventanas].mean()), 4) if con_ventanas.any() else None,
+            'mae_ajustado': round(float(self.mae_elegido[con_ventanas].mean()), 4) if con_ventanas.any() else None
+        }
+
+
+def seleccionar_modelos_matriz(
+    matriz: MatrizDemanda,
+    con_stock: np.ndarray,
+    alpha: float,
+    umbral_intermitencia: float,
+    origenes: np.ndarray = None,
+    horizonte: int = HORIZONTE_DIAS,
+    historia_minima: int = HISTORIA_MINIMA_DIAS,
+    candidatos: Sequence[Tuple[str, object]] = CANDIDATOS,
+    skus_por_bloque: int = SKUS_POR_BLOQUE
+) -> SeleccionModelos:
+    """
+    Mejor candidato de cada SKU de una `MatrizDemanda`, por bloques de SKUs
+
+    Args:
+        con_stock: Días con stock (n_skus, n_dias), como en el análisis
+        alpha, umbral_intermitencia: Los del modelo por regla
+        origenes: Días de origen (default: `origenes_backtest`); los de un
+            tramo o sub-panel conviene derivarlos de fechas comunes
+            (`fechas_origen_backtest`) para que la elección de un SKU no
+            dependa de los demás SKUs de la matriz
+    """
+    if not candidatos:
+        raise ValueError("La lista de candidatos está vacía")
+    if origenes is None:
+        origenes = origenes_backtest(matriz.n_dias, horizonte)
+
+    origenes = np.asarray(origenes, dtype=np.int64)
+    calculables = origenes_calculables(origenes, matriz.n_dias, horizonte)
+
+    partes = []
+    for a in range(0, matriz.n_skus, skus_por_bloque):
+        b = min(matriz.n_skus, a + skus_por_bloque)
+        partes.append(seleccion_panel(
+            matriz.ventas[a:b], matriz.inicio[a:b], matriz.fin[a:b], con_stock[a:b],
+            alpha, umbral_intermitencia, calculables, horizonte, historia_minima, candidatos
+        ))
+
+    def columna(nombre, forma, dtype=float):
+        if not partes:
+            return np.zeros(forma, dtype=dtype)
+        return np.concatenate([parte[nombre] for parte in partes])
+
+    n_candidatos = len(candidatos)
+    mae = columna('mae', (0, n_candidatos))
+    mae_base = columna('mae_base', (0,))
+    venta_diaria = columna('venta_diaria', (0, n_candidatos))
+    indice = columna('indice', (0,), np.int64)
+
+    filas = np.arange(len(indice))
+    return SeleccionModelos(
+        skus=np.asarray(matriz.skus, dtype=object),
+        candidatos=tuple(nombre_candidato(familia, parametro) for familia, parametro in candidatos),
+        indice=indice,
+        mae=mae,
+        mae_base=mae_base,
+        venta_diaria=np.where(indice >= 0, venta_diaria[filas, np.maximum(indice, 0)], np.nan),
+        definiciones=tuple(candidatos),
+        backtest=resultado_desde_partes(
+            matriz, origenes, horizonte, [parte['metricas'] for parte in partes], FAMILIAS
+        )
+    )
+
+
+def backtest_seleccion_matriz(
+    matriz: MatrizDemanda,
+    con_stock: np.ndarray,
+    seleccion: SeleccionModelos,
+    alpha: float,
+    umbral_intermitencia: float,
+    origenes: np.ndarray = None,
+    horizonte: int = HORIZONTE_DIAS,
+    historia_minima: int = HISTORIA_MINIMA_DIAS,
+    skus_por_bloque: int = SKUS_POR_BLOQUE
+) -> ResultadoBacktest:
+    """
+    Backtesting del modelo que quedó en cada SKU (el ganador o la regla)
+
+    Con los mismos orígenes y horizonte de la selección devuelve el que ya
+    calculó; si no, evalúa solo los candidatos elegidos en los `origenes`.
+
+    Args:
+        seleccion: Selección sobre esta misma matriz (`seleccionar_modelos_matriz`)
+        origenes: Días de origen (default: `origenes_backtest`)
+    """
+    if origenes is None:
+        origenes = origenes_backtest(matriz.n_dias, horizonte)
+    origenes = np.asarray(origenes, dtype=np.int64)
+
+    previo = seleccion.backtest
+    fechas_origen = matriz.fecha_base + pd.to_timedelta(origenes, unit='D')
+    if previo is not None and previo.horizonte == horizonte and previo.fechas_origen.equals(fechas_origen):
+        return previo
+
+    # Solo los candidatos que ganaron en algún SKU, con el índice remapeado
+    usados = np.unique(seleccion.indice[seleccion.ajustados])
+    definiciones = [seleccion.definiciones[k] for k in usados]
+    indice = np.where(seleccion.ajustados, np.searchsorted(usados, seleccion.indice), -1)
+    calculables = origenes_calculables(origenes, matriz.n_dias, horizonte)
+
+    partes = []
+    for a in range(0, matriz.n_skus, skus_por_bloque):
+        b = min(matriz.n_skus, a + skus_por_bloque)
+        if not len(calculables):
+            partes.append(sin_ventanas(b - a, FAMILIAS))
+            continue
+        ventas, inicio, fin = matriz.ventas[a:b], matriz.inicio[a:b], matriz.fin[a:b]
+        pronosticos = pronosticos_candidatos(ventas, inicio, fin, calculables, definiciones)
+        base, es_intermitente = pronosticos_por_origen_panel(
+            ventas, inicio, fin, alpha, umbral_intermitencia, calculables
+        )
+        unidades, dias = reales_por_origen_panel(ventas, con_stock[a:b], calculables, horizonte)
+        evaluable = ventanas_evaluables(inicio, fin, dias, calculables, horizonte, historia_minima)
+        pronostico, grupos = _pronostico_elegido(
+            pronosticos, indice[a:b], [familia for familia, _ in definiciones], base, es_intermitente
+        )
+        partes.append(metricas_ventanas(pronostico, unidades, dias, evaluable, grupos))
+
+    return resultado_desde_partes(matriz, origenes, horizonte, partes, FAMILIAS)
@@ -0,0 +1,17 @@
+-- =====================================================
+-- Métricas del modelo: backtesting rolling-origin
+-- Fecha: 2026-10-17
+-- =====================================================
+-- El forecast diario reproduce los modelos EWMA/Croston en varios orígenes
+-- del pasado y compara con la venta real del horizonte siguiente. mape, mae,
+-- rmse, bias y mape_abc_a/b/c pasan a guardar ese error real (antes nulos o
+-- el CV como proxy); el detalle va en la nueva columna backtesting:
+-- orígenes, horizonte, error global, por clase ABC, por modelo y peores SKUs.
+
+ALTER TABLE metricas_modelo ADD COLUMN IF NOT EXISTS backtesting JSONB;
+
+-- Consultar:
+-- SELECT fecha_calculo, mape, mae, backtesting->'por_abc'->'A'->>'mae' AS mae_a,
+--        backtesting->'por_modelo'->'croston'->>'mape' AS mape_croston
+-- FROM metricas_modelo
+-- ORDER BY fecha_calculo DESC;
@@ -0,0 +1,15 @@
+-- =====================================================
+-- Métricas del modelo: mediciones por etapa del pipeline
+-- Fecha: 2026-10-17
+-- =====================================================
+-- El forecast diario guarda, junto con el tiempo total de ejecución, el
+-- tiempo de reloj, CPU, memoria y throughput de cada etapa (carga, expansión
+-- de packs, forecast, guardado, alertas, métricas) y el histograma de
+-- latencias por SKU con los SKUs más lentos.
+
+ALTER TABLE metricas_modelo ADD COLUMN IF NOT EXISTS etapas JSONB;
+
+-- Consultar:
+-- SELECT fecha_calculo, tiempo_ejecucion_segundos, e->>'nombre', e->>'segundos'
+-- FROM metricas_modelo, jsonb_array_elements(etapas->'etapas') e
+-- ORDER BY fecha_calculo DESC;
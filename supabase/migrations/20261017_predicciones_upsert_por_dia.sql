@@ -0,0 +1,33 @@
+-- =====================================================
+-- Predicciones: clave única (sku, día de cálculo) para upsert
+-- Fecha: 2026-10-17
+-- =====================================================
+-- El forecast diario hace upsert sobre (sku, fecha_calculo::date) en vez de
+-- borrar las predicciones del día y volver a insertarlas. PostgREST solo
+-- resuelve `on_conflict` sobre columnas, así que el día va en su propia
+-- columna `dia_calculo`, que escribe el pipeline.
+
+-- 1. Columna con el día del cálculo
+ALTER TABLE predicciones ADD COLUMN IF NOT EXISTS dia_calculo DATE;
+
+UPDATE predicciones
+SET dia_calculo = fecha_calculo::date
+WHERE dia_calculo IS NULL;
+
+ALTER TABLE predicciones ALTER COLUMN dia_calculo SET DEFAULT CURRENT_DATE;
+ALTER TABLE predicciones ALTER COLUMN dia_calculo SET NOT NULL;
+
+-- 2. Dejar una sola predicción por SKU y día (la más reciente)
+DELETE FROM predicciones p
+USING predicciones q
+WHERE p.sku = q.sku
+  AND p.dia_calculo = q.dia_calculo
+  AND p.id < q.id;
+
+-- 3. Clave del upsert
+CREATE UNIQUE INDEX IF NOT EXISTS idx_predicciones_sku_dia
+ON predicciones(sku, dia_calculo);
+
+-- Verificar:
+-- SELECT sku, dia_calculo, COUNT(*) FROM predicciones
+-- GROUP BY sku, dia_calculo HAVING COUNT(*) > 1;
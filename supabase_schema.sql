@@ -107,6 +107,7 @@ CREATE TABLE IF NOT EXISTS predicciones (
     id BIGSERIAL PRIMARY KEY,
     sku TEXT NOT NULL,
     fecha_calculo TIMESTAMPTZ DEFAULT NOW(),
+    dia_calculo DATE NOT NULL DEFAULT CURRENT_DATE,  -- Clave del upsert diario
 
     -- Métricas de venta
     venta_diaria_promedio NUMERIC,
@@ -154,7 +155,8 @@ CREATE TABLE IF NOT EXISTS predicciones (
     observaciones TEXT,
     alertas TEXT[],
 
-    CONSTRAINT unique_prediccion_sku_fecha UNIQUE (sku, fecha_calculo)
+    CONSTRAINT unique_prediccion_sku_fecha UNIQUE (sku, fecha_calculo),
+    CONSTRAINT unique_prediccion_sku_dia UNIQUE (sku, dia_calculo)
 );
 
 CREATE INDEX idx_predicciones_sku ON predicciones(sku);
@@ -185,6 +187,8 @@ CREATE TABLE IF NOT EXISTS metricas_modelo (
 
     -- Tiempo de ejecución
     tiempo_ejecucion_segundos NUMERIC,
+    etapas JSONB,  -- Tiempo, CPU, memoria y throughput por etapa; latencias por SKU
+    backtesting JSONB,  -- Orígenes, horizonte, error por clase ABC y por modelo, peores SKUs
 
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
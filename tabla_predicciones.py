@@ -0,0 +1,148 @@
+"""
+Tabla Columnar de Predicciones
+Las predicciones del día como un DataFrame, para reglas y agregados vectorizados
+
+`tabla_predicciones` toma las columnas del PrediccionesBatch; las alertas
+de inventario, las métricas por clase ABC y las estadísticas del resumen
+se calculan después con máscaras sobre las columnas.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from predicciones_batch import PrediccionesBatch
+
+
+COLUMNAS = (
+    'sku',
+    'dias_stock_actual',
+    'tendencia',
+    'tasa_crecimiento_mensual',
+    'coeficiente_variacion',
+    'clasificacion_abc',
+    'sugerencia_reposicion',
+    'valor_total_sugerencia'
+)
+
+CLASES_ABC = ('A', 'B', 'C')
+
+
+def tabla_predicciones(predicciones: PrediccionesBatch) -> pd.DataFrame:
+    """
+    Columnas de `COLUMNAS` más `alerta_critica` (alguna alerta 'CRÍTICO'),
+    en el orden del lote (acepta también una lista de PrediccionAvanzada)
+    """
+    if not isinstance(predicciones, PrediccionesBatch):
+        predicciones = PrediccionesBatch.desde_predicciones(predicciones)
+
+    tabla = predicciones.a_dataframe(COLUMNAS)
+    tabla['alerta_critica'] = np.array(
+        [any('CRÍTICO' in a for a in alertas) for alertas in predicciones.columnas['alertas']], dtype=bool
+    )
+
+    return tabla
+
+
+def _finitos(valores: np.ndarray) -> np.ndarray:
+    """inf/NaN → 0.0, como `sanitize_float`"""
+    return np.where(np.isfinite(valores), valores, 0.0)
+
+
+def alertas_inventario(tabla: pd.DataFrame, dias_stock_deseado: float) -> List[dict]:
+    """
+    Registros de la tabla `alertas_inventario`
+
+    Reglas: stockout inminente (< 60 días, crítica bajo 30), exceso de
+    stock (> 180 días) y demanda en declive (tendencia decreciente y más de
+    10% de caída mensual). Los registros quedan en orden de SKU y, dentro de
+    un SKU, en el orden de las reglas.
+    """
+    dias = tabla['dias_stock_actual'].to_numpy()
+    tasa = tabla['tasa_crecimiento_mensual'].to_numpy()
+    skus = tabla['sku'].to_numpy()
+    esperado = float(_finitos(np.array([dias_stock_deseado], dtype=float))[0])
+
+    stockout = np.flatnonzero(dias < 60)
+    exceso = np.flatnonzero(dias > 180)
+    declive = np.flatnonzero((tabla['tendencia'].to_numpy() == 'decreciente') & (tasa < -10))
+
+    # (posiciones, tipo, severidades, mensajes, valores actuales, valor esperado) por regla
+    reglas = [
+        (
+            stockout, 'stockout_inminente',
+            np.where(dias[stockout] < 30, 'critica', 'alta').tolist(),
+            [f'Solo {d:.0f} días de stock restantes' for d in dias[stockout]],
+            _finitos(dias[stockout]).tolist(), esperado
+        ),
+        (
+            exceso, 'exceso_stock',
+            ['media'] * len(exceso),
+            [f'{d:.0f} días de stock (exceso)' for d in dias[exceso]],
+            _finitos(dias[exceso]).tolist(), esperado
+        ),
+        (
+            declive, 'demanda_anomala',
+            ['media'] * len(declive),
+            [f'Demanda cayendo {abs(t):.1f}% mensual' for t in tasa[declive]],
+            _finitos(tasa[declive]).tolist(), 0.0
+        )
+    ]
+
+    posiciones = np.concatenate([regla[0] for regla in reglas])
+    numero_regla = np.repeat(np.arange(len(reglas)), [len(regla[0]) for regla in reglas])
+    orden = np.lexsort((numero_regla, posiciones))
+
+    registros = [
+        {
+            'sku': skus[posicion],
+            'tipo_alerta': tipo,
+            'severidad': severidad,
+            'mensaje': mensaje,
+            'valor_actual': valor,
+            'valor_esperado': valor_esperado,
+            'estado': 'activa'
+        }
+        for posiciones_regla, tipo, severidades, mensajes, valores, valor_esperado in reglas
+        for posicion, severidad, mensaje, valor in zip(
+            posiciones_regla.tolist(), severidades, mensajes, valores
+        )
+    ]
+
+    return [registros[k] for k in orden]
+
+
+def agregados_por_abc(tabla: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """SKUs y CV promedio de cada clase ABC (CV 0 si la clase está vacía)"""
+    clase = pd.Categorical(tabla['clasificacion_abc'], categories=CLASES_ABC)
+    codigos = clase.codes
+    validos = codigos >= 0
+
+    conteos = np.bincount(codigos[validos], minlength=len(CLASES_ABC))
+    sumas_cv = np.bincount(
+        codigos[validos],
+        weights=tabla['coeficiente_variacion'].to_numpy()[validos],
+        minlength=len(CLASES_ABC)
+    )
+
+    return {
+        nombre: {
+            'skus': int(conteos[k]),
+            'cv_promedio': float(sumas_cv[k] / conteos[k]) if conteos[k] else 0.0
+        }
+        for k, nombre in enumerate(CLASES_ABC)
+    }
+
+
+def estadisticas_resumen(tabla: pd.DataFrame) -> Dict:
+    """Totales del resumen del forecasting"""
+    return {
+        'total_skus': len(tabla),
+        'total_unidades': float(tabla['sugerencia_reposicion'].sum()),
+        'total_valor': float(tabla['valor_total_sugerencia'].sum()),
+        'skus_por_abc': {
+            clase: datos['skus'] for clase, datos in agregados_por_abc(tabla).items()
+        },
+        'alertas_criticas': int(tabla['alerta_critica'].sum())
+    }
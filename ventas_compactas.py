@@ -0,0 +1,241 @@
+"""
+Ventas Compactas
+Historial de ventas en arrays tipados de 16 bytes por fila
+
+`VentasCompactas` guarda cada venta como código de SKU (int32), día desde
+`fecha_base` (int32), unidades (float32) y precio (float32), sin strings
+ni timestamps por fila. Es el formato en que el pipeline mantiene las
+ventas en memoria: la expansión de packs (`expandir_packs_compactas`)
+trabaja sobre los códigos sin copiar un DataFrame.
+
+Conversiones:
+- `compactar_ventas(df)`: desde el DataFrame de la carga
+- `.registros()`: RegistrosSKU para AlgoritmoMLAvanzado
+- `.registros_venta()`: VentaRecord para AlgoritmoPrediccionReposicion
+- `.a_dataframe()`: DataFrame (sku categórico) para el resto, ej. Prophet
+
+Los precios en float32 son exactos para enteros hasta 16.777.216.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from algoritmo_prediccion_reposicion import VentaRecord
+from panel_demanda import RegistrosSKU, registros_desde_df
+
+
+@dataclass
+class VentasCompactas:
+    """Ventas como arrays paralelos; los SKUs en orden de primera aparición"""
+    skus: np.ndarray            # object (n_skus,)
+    fecha_base: pd.Timestamp    # Día 0
+    codigos: np.ndarray         # int32 (n_filas,)
+    dias: np.ndarray            # int32 (n_filas,)
+    unidades: np.ndarray        # float32 (n_filas,)
+    precios: np.ndarray         # float32 (n_filas,)
+
+    @property
+    def n_skus(self) -> int:
+        return len(self.skus)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.codigos) == 0
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes de los arrays por fila (sin contar los SKUs)"""
+        return self.codigos.nbytes + self.dias.nbytes + self.unidades.nbytes + self.precios.nbytes
+
+    def seleccionar_filas(self, mascara: np.ndarray) -> 'VentasCompactas':
+        """Filas de `mascara`; los SKUs que quedan sin filas se descartan"""
+        codigos, usados = pd.factorize(self.codigos[mascara], sort=False)
+        return VentasCompactas(
+            skus=self.skus[usados],
+            fecha_base=self.fecha_base,
+            codigos=codigos.astype(np.int32),
+            dias=self.dias[mascara],
+            unidades=self.unidades[mascara],
+            precios=self.precios[mascara]
+        )
+
+    def sin_skus(self, excluidos: Iterable[str]) -> 'VentasCompactas':
+        excluir = pd.Index(self.skus).isin(list(excluidos))
+        return self.seleccionar_filas(~excluir[self.codigos])
+
+    def registros(self, skus: np.ndarray = None, fecha_base: pd.Timestamp = None) -> RegistrosSKU:
+        """
+        Unidades como RegistrosSKU (int64/float64, como `registros_desde_df`)
+
+        Args:
+            skus: SKUs de referencia (default: los propios); las filas de
+                SKUs fuera de la lista se descartan
+            fecha_base: Día 0 (default: el propio)
+        """
+        codigos = self.codigos.astype(np.int64)
+        if skus is None:
+            skus = self.skus
+        else:
+            codigos = pd.Index(skus).get_indexer(self.skus)[codigos]
+
+        desplazamiento = 0 if fecha_base is None else (self.fecha_base - fecha_base).days
+        validos = codigos >= 0
+        return RegistrosSKU(
+            skus=np.asarray(skus, dtype=object),
+            fecha_base=self.fecha_base if fecha_base is None else fecha_base,
+            codigos=codigos[validos],
+            dias=self.dias.astype(np.int64)[validos] + desplazamiento,
+            valores=self.unidades.astype(np.float64)[validos]
+        )
+
+    def ultimo_precio(self) -> Dict[str, float]:
+        """Último precio no nulo de cada SKU, en orden de filas"""
+        validos = ~np.isnan(self.precios)
+        ultimos = pd.Series(self.precios[validos].astype(np.float64)).groupby(self.codigos[validos]).last()
+        return dict(zip(self.skus[ultimos.index.to_numpy()], ultimos.to_numpy().tolist()))
+
+    def fechas(self) -> np.ndarray:
+        """Fecha de cada fila (datetime64[ns])"""
+        base = np.datetime64(self.fecha_base.normalize(), 'D')
+        return (base + self.dias.astype('timedelta64[D]')).astype('datetime64[ns]')
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """DataFrame con las columnas y tipos de `ESQUEMA_VENTAS`"""
+        return pd.DataFrame({
+            'sku': pd.Categorical.from_codes(self.codigos, categories=self.skus),
+            'fecha': self.fechas(),
+            'unidades': self.unidades,
+            'precio': self.precios.astype(np.float64)
+        })
+
+    def registros_venta(self) -> List[VentaRecord]:
+        """Filas como VentaRecord (entrada de AlgoritmoPrediccionReposicion)"""
+        return list(map(
+            VentaRecord,
+            self.skus[self.codigos].tolist(),
+            self.fechas().astype('datetime64[us]').tolist(),
+            self.unidades.astype(np.float64).tolist(),
+            self.precios.astype(np.float64).tolist()
+        ))
+
+
+def compactar_ventas(df: pd.DataFrame, fecha_base: pd.Timestamp = None) -> VentasCompactas:
+    """
+    Ventas (sku, fecha, unidades, precio) en formato compacto
+
+    Las filas sin SKU o sin fecha se descartan. `fecha_base` por defecto es
+    la primera fecha.
+    """
+    codigos, skus = pd.factorize(df['sku'], sort=False)
+    fechas = pd.to_datetime(df['fecha']).to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    validos = (codigos >= 0) & ~np.isnat(fechas)
+
+    if fecha_base is None:
+        fecha_base = pd.Timestamp(fechas[validos].min()) if validos.any() else pd.Timestamp(0)
+    base = np.datetime64(fecha_base.normalize(), 'D')
+
+    ventas = VentasCompactas(
+        skus=np.asarray(skus, dtype=object),
+        fecha_base=fecha_base.normalize(),
+        codigos=codigos.astype(np.int32),
+        dias=(fechas - base).astype(np.int32),
+        unidades=df['unidades'].to_numpy(dtype=np.float32),
+        precios=df['precio'].to_numpy(dtype=np.float32)
+    )
+    return ventas if validos.all() else ventas.seleccionar_filas(validos)
+
+
+def expandir_packs_compactas(ventas: VentasCompactas, tabla: pd.DataFrame) -> Tuple[VentasCompactas, int]:
+    """
+    Como `expansion_packs.expandir_packs`, sobre ventas compactas
+
+    Cada venta de un pack se reemplaza, en su lugar, por una fila por
+    componente final (unidades del pack × cantidad); el resto queda igual.
+
+    Returns:
+        (ventas expandidas, filas de packs expandidas)
+    """
+    # Componentes de cada pack, contiguos: orden[inicio[p]:inicio[p] + n[p]]
+    codigo_pack, packs = pd.factorize(tabla['sku_pack'], sort=False)
+    orden = np.argsort(codigo_pack, kind='stable')
+    n_componentes = np.bincount(codigo_pack, minlength=len(packs))
+    inicio = np.concatenate([[0], np.cumsum(n_componentes)[:-1]])
+
+    pack_de_sku = pd.Index(packs).get_indexer(ventas.skus)
+    pack_de_fila = pack_de_sku[ventas.codigos]
+    es_pack = pack_de_fila >= 0
+    n_packs = int(es_pack.sum())
+    if n_packs == 0:
+        return ventas, 0
+
+    # Cada fila se repite una vez por componente (1 si no es pack), sin
+    # índices de largo completo: solo las filas de packs se indexan
+    filas_pack = np.flatnonzero(es_pack)
+    pack = pack_de_fila[filas_pack]
+    repeticiones = np.ones(len(ventas), dtype=np.int64)
+    repeticiones[filas_pack] = n_componentes[pack]
+    destino = (np.cumsum(repeticiones) - repeticiones)[filas_pack]
+
+    por_fila = n_componentes[pack]
+    salto = np.cumsum(por_fila) - por_fila
+    posicion = np.arange(int(por_fila.sum())) - np.repeat(salto, por_fila)
+    destino = np.repeat(destino, por_fila) + posicion
+    componente = orden[np.repeat(inicio[pack], por_fila) + posicion]
+
+    # SKUs en un universo común (los de las ventas + componentes nuevos)
+    universo = pd.Index(ventas.skus).append(
+        pd.Index(tabla['sku_componente'].unique()).difference(pd.Index(ventas.skus), sort=False)
+    )
+    codigo_componente = universo.get_indexer(tabla['sku_componente'].to_numpy())
+
+    codigos_universo = np.repeat(ventas.codigos, repeticiones)
+    codigos_universo[destino] = codigo_componente[componente]
+    unidades = np.repeat(ventas.unidades, repeticiones)
+    cantidad = tabla['cantidad'].to_numpy(dtype=np.float64)[componente]
+    unidades[destino] = unidades[destino].astype(np.float64) * cantidad
+
+    codigos, usados = pd.factorize(codigos_universo, sort=False)
+    resultado = VentasCompactas(
+        skus=np.asarray(universo[usados], dtype=object),
+        fecha_base=ventas.fecha_base,
+        codigos=codigos.astype(np.int32),
+        dias=np.repeat(ventas.dias, repeticiones),
+        unidades=unidades,
+        precios=np.repeat(ventas.precios, repeticiones)
+    )
+    return resultado, n_packs
+
+
+# =====================================================================
+# VENTAS EN CUALQUIERA DE LOS DOS FORMATOS
+# =====================================================================
+
+Ventas = Union[pd.DataFrame, VentasCompactas]
+
+
+def registros_de_ventas(ventas: Ventas, skus: np.ndarray = None, fecha_base: pd.Timestamp = None) -> RegistrosSKU:
+    """Unidades vendidas codificadas, desde un DataFrame o desde ventas compactas"""
+    if isinstance(ventas, VentasCompactas):
+        return ventas.registros(skus=skus, fecha_base=fecha_base)
+    return registros_desde_df(ventas, 'unidades', skus=skus, fecha_base=fecha_base)
+
+
+def skus_de_ventas(ventas: Ventas) -> np.ndarray:
+    """SKUs con ventas en orden de primera aparición"""
+    if isinstance(ventas, VentasCompactas):
+        return ventas.skus
+    return np.asarray(pd.unique(ventas['sku']), dtype=object)
+
+
+def ultimo_precio_por_sku(ventas: Ventas) -> Dict[str, float]:
+    if ventas.empty:
+        return {}
+    if isinstance(ventas, VentasCompactas):
+        return ventas.ultimo_precio()
+    return ventas.groupby('sku', observed=True)['precio'].last().to_dict()